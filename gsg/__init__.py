@@ -0,0 +1,22 @@
+"""Get Set Go scan engine: DMI/MACD states for portfolios across timeframes
+
+The Streamlit dashboard (GSG_Dashbaord.py) and the headless scanner
+(``python -m gsg scan``) both run on these modules.
+"""
+from .backtest import Backtest, Sweep, parameter_grid, run_backtest, run_sweep
+from .config import SCAN_TIMEFRAMES, TIMEFRAMES, default_stocks
+from .indicators import calculate_dmi, calculate_macd, calculate_indicators_batch, pine_ema, rma
+from .scanner import (ScanResult, fetch_timeframes, merge_scan_results, results_frame, run_scan,
+                      scan_portfolio)
+from .states import (AnalysisResult, analyze_history, analyze_symbol, calculate_total_trend,
+                     get_state_series, go_state_series, indicator_frame, set_state_series)
+from .timeframes import resample_frames
+
+__all__ = [
+    "AnalysisResult", "Backtest", "SCAN_TIMEFRAMES", "ScanResult", "Sweep", "TIMEFRAMES",
+    "analyze_history", "analyze_symbol", "calculate_dmi", "calculate_indicators_batch",
+    "calculate_macd", "calculate_total_trend", "default_stocks", "fetch_timeframes",
+    "get_state_series", "go_state_series", "indicator_frame", "merge_scan_results",
+    "parameter_grid", "pine_ema", "resample_frames", "results_frame", "rma", "run_backtest",
+    "run_scan", "run_sweep", "scan_portfolio", "set_state_series"
+]
@@ -0,0 +1,274 @@
+"""Command line entry point: ``python -m gsg scan --portfolio "HK Stocks" --out results.parquet``"""
+import argparse
+import json
+import logging
+import sys
+import time
+
+from .backtest import DEFAULT_PARAMETERS, HORIZONS, load_history, parameter_grid, run_backtest, run_sweep
+from .benchmark import SCAN_SIZES, compare_reports, load_report, run_benchmarks
+from .config import (ADAPTIVE_LOOKBACK, FETCH_BATCH_SIZE, FETCH_RATE, FETCH_RETRIES, FETCH_TIMEOUT,
+                     FETCH_WORKERS, HISTORY_WINDOWS, LOOKBACK_TOLERANCE, SCAN_TIMEFRAMES, SIGNAL_LOG_PATH,
+                     STORE_PATH, TIMEFRAME_NAMES, TIMEFRAMES, default_stocks)
+from .fetch import ResilientDownloader, TokenBucket, yf_download
+from .lookback import adaptive_windows, converged_bars
+from .parallel import analysis_pool
+from .diagnostics import timed
+from .scanner import SIGNAL_TYPES, load_states, results_frame, run_scan, save_states
+from .signals import SignalLog
+from .store import OHLCVStore
+from .synthetic import synthetic_download
+
+def write_results(frame, path):
+    """Write scan rows as Parquet, CSV or JSON depending on the extension; '-' is JSON to stdout"""
+    if path == '-':
+        frame.to_json(sys.stdout, orient='records', date_format='iso')
+        sys.stdout.write('\n')
+    elif path.endswith('.parquet'):
+        frame.to_parquet(path, index=False)
+    elif path.endswith('.csv'):
+        frame.to_csv(path, index=False)
+    elif path.endswith('.json'):
+        frame.to_json(path, orient='records', date_format='iso')
+    else:
+        raise ValueError(f"Unsupported output format for {path}; use .parquet, .csv or .json")
+
+def selected_portfolios(args):
+    if args.all:
+        portfolios = dict(default_stocks)
+    else:
+        portfolios = {name: default_stocks[name] for name in args.portfolio}
+    if args.symbols:
+        portfolios["Custom"] = [symbol.strip() for symbol in args.symbols.split(',') if symbol.strip()]
+    if not portfolios:
+        raise SystemExit("Nothing to scan: pass --portfolio, --all or --symbols")
+    return portfolios
+
+def add_selection_arguments(parser):
+    parser.add_argument("--portfolio", action="append", default=[], choices=list(default_stocks),
+                        help="Portfolio to scan; repeat for several")
+    parser.add_argument("--all", action="store_true", help="Scan every portfolio")
+    parser.add_argument("--symbols", help="Comma-separated symbols scanned as a 'Custom' portfolio")
+    parser.add_argument("--workers", type=int, default=FETCH_WORKERS, help="Concurrent downloads")
+    parser.add_argument("--batch-size", type=int, default=FETCH_BATCH_SIZE, help="Symbols per download")
+    parser.add_argument("--rate", type=float, default=FETCH_RATE, help="Download requests per second")
+    parser.add_argument("--synthetic", action="store_true",
+                        help="Use deterministic synthetic bars instead of downloading from Yahoo")
+
+def make_downloader(args):
+    if args.synthetic:
+        return synthetic_download
+    return ResilientDownloader(
+        yf_download, TokenBucket(args.rate), retries=FETCH_RETRIES, timeout=FETCH_TIMEOUT
+    )
+
+def scan_command(args):
+    portfolios = selected_portfolios(args)
+    
+    store = None if args.no_store else OHLCVStore(args.store)
+    downloader = make_downloader(args)
+    last_states = load_states(args.state) if args.state else {}
+    log = None if args.state or args.no_signal_log else SignalLog(args.signal_log)
+    pool = analysis_pool(args.processes) if args.processes else None
+    names = [name.strip() for name in args.timeframes.split(',') if name.strip()]
+    unknown = [name for name in names if name not in TIMEFRAME_NAMES]
+    if unknown:
+        print(f"Unknown timeframes: {', '.join(unknown)} (choose from {', '.join(TIMEFRAME_NAMES)})",
+              file=sys.stderr)
+        return 2
+    # Total Trend and the signals always need TIMEFRAMES
+    timeframes = {name: code for name, code in TIMEFRAME_NAMES.items() if name in TIMEFRAMES or name in names}
+    windows, min_bars = HISTORY_WINDOWS, None
+    if args.adaptive_lookback:
+        windows = adaptive_windows(args.lookback_tolerance)
+        min_bars = converged_bars(args.lookback_tolerance)
+        print(f"lookback     {min_bars} bars to converge; " + ", ".join(
+            f"{tf} {days} days" for tf, (_, days) in windows.items()
+        ), file=sys.stderr)
+    
+    start = time.perf_counter()
+    try:
+        results, timings = run_scan(
+            portfolios, store, downloader, args.batch_size, args.workers, last_states, pool, log,
+            args.screen, windows, min_bars, timeframes
+        )
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    with timed(timings, 'write'):
+        write_results(results_frame(results, timeframes), args.out)
+        if args.state:
+            save_states(last_states, args.state)
+    timings['total'] = time.perf_counter() - start
+    
+    for stage, seconds in timings.items():
+        print(f"{stage:<12} {seconds:8.3f}s", file=sys.stderr)
+    for name, n in timings.counters.items():
+        print(f"{name:<12} {n:8d}", file=sys.stderr)
+    if args.timings:
+        with open(args.timings, 'w') as f:
+            f.write(timings.to_json())
+    
+    loaded = sum(len(analyses) > 0 for result in results.values() for analyses in result.analyses.values())
+    return 0 if loaded else 1
+
+def backtest_command(args):
+    symbols = [symbol for symbols in selected_portfolios(args).values() for symbol in symbols]
+    downloader = make_downloader(args)
+    horizons = [int(h) for h in args.horizons.split(',')]
+    
+    timings = {}
+    with timed(timings, 'fetch'):
+        data, failures = load_history(symbols, args.years, downloader, args.batch_size, args.workers)
+    with timed(timings, 'backtest'):
+        backtest = run_backtest(data, horizons)
+    with timed(timings, 'write'):
+        write_results(backtest.events, args.out)
+        if args.stats:
+            write_results(backtest.stats, args.stats)
+    
+    for symbol, reason in failures.items():
+        print(f"{symbol}: {reason}", file=sys.stderr)
+    print(backtest.stats.to_string(index=False), file=sys.stderr)
+    for stage, seconds in timings.items():
+        print(f"{stage:<12} {seconds:8.3f}s", file=sys.stderr)
+    return 0 if data["Daily"] else 1
+
+def sweep_command(args):
+    symbols = [symbol for symbols in selected_portfolios(args).values() for symbol in symbols]
+    downloader = make_downloader(args)
+    horizons = [int(h) for h in args.horizons.split(',')]
+    combos = parameter_grid(**{
+        name: [int(value) for value in getattr(args, name).split(',')]
+        for name in DEFAULT_PARAMETERS if getattr(args, name)
+    })
+    
+    timings = {}
+    with timed(timings, 'fetch'):
+        data, failures = load_history(symbols, args.years, downloader, args.batch_size, args.workers)
+    with timed(timings, 'sweep'):
+        sweep = run_sweep(data, combos, horizons)
+    with timed(timings, 'write'):
+        write_results(sweep.stats, args.out)
+    
+    for symbol, reason in failures.items():
+        print(f"{symbol}: {reason}", file=sys.stderr)
+    print(sweep.baseline.to_string(index=False), file=sys.stderr)
+    # The combos with the best win rate per signal at the longest horizon
+    ranked = sweep.stats[(sweep.stats['horizon'] == horizons[-1]) & (sweep.stats['count'] >= args.min_count)]
+    ranked = ranked.sort_values('win_rate', ascending=False, kind='stable').groupby('signal').head(args.top)
+    print(ranked.sort_values(['signal', 'win_rate'], ascending=[True, False]).to_string(index=False),
+          file=sys.stderr)
+    print(f"{len(combos)} combos", file=sys.stderr)
+    for stage, seconds in timings.items():
+        print(f"{stage:<12} {seconds:8.3f}s", file=sys.stderr)
+    return 0 if data["Daily"] else 1
+
+def signals_command(args):
+    since = time.time() - args.days * 86400 if args.days else None
+    events = SignalLog(args.signal_log).events(args.symbol, args.signal, since, args.limit)
+    write_results(events, args.out)
+    return 0
+
+def bench_command(args):
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    report = run_benchmarks(sizes, args.repeat)
+    if args.out == '-':
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    else:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+    
+    for result in report["results"]:
+        print(f"{result['name']:<24} {result['size']:>6} {result['median'] * 1e3:12.3f} ms", file=sys.stderr)
+    if args.compare:
+        print("\nvs baseline:", file=sys.stderr)
+        for name, size, before, after, ratio in compare_reports(report, load_report(args.compare)):
+            print(f"{name:<24} {size:>6} {before * 1e3:12.3f} -> {after * 1e3:12.3f} ms  x{ratio:.2f}",
+                  file=sys.stderr)
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m gsg", description="Get Set Go scanner")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    scan = commands.add_parser("scan", help="Scan portfolios and write Get/Set/Go states")
+    add_selection_arguments(scan)
+    scan.add_argument("--out", default="-", help="Output file (.parquet, .csv, .json) or '-' for stdout")
+    scan.add_argument("--state", help="JSON file holding the previous scan's states, instead of the signal log")
+    scan.add_argument("--signal-log", default=SIGNAL_LOG_PATH,
+                      help="SQLite log the previous states are read from and signals written to")
+    scan.add_argument("--no-signal-log", action="store_true", help="Do not read or write the signal log")
+    scan.add_argument("--timings", help="Also write stage timings, counters and the slowest symbols to this JSON file")
+    scan.add_argument("--store", default=STORE_PATH, help="SQLite bar store used for incremental refresh")
+    scan.add_argument("--no-store", action="store_true", help="Download full history without the store")
+    scan.add_argument("--processes", type=int, default=0,
+                      help="Analyse on this many worker processes (0 analyses in this process)")
+    scan.add_argument("--screen", action="store_true",
+                      help="Only fetch Hourly bars (and the timeframes resampled from them) for symbols "
+                           "whose Weekly and Daily states can still give a Buy/Sell Total Trend or 3 Gets")
+    scan.add_argument("--timeframes", default=",".join(SCAN_TIMEFRAMES),
+                      help="Comma-separated timeframe columns, from " + ", ".join(TIMEFRAME_NAMES)
+                           + "; Weekly, Daily and Hourly are always scanned")
+    scan.add_argument("--adaptive-lookback", action="store_true", default=ADAPTIVE_LOOKBACK,
+                      help="Fetch as much history as the indicators need to forget their first bars, "
+                           "and warn about symbols with less")
+    scan.add_argument("--lookback-tolerance", type=float, default=LOOKBACK_TOLERANCE,
+                      help="Weight the first bars may keep in the latest indicator values")
+    
+    backtest = commands.add_parser(
+        "backtest", help="Find every historical 3 Gets and Total Trend signal with forward returns"
+    )
+    add_selection_arguments(backtest)
+    backtest.add_argument("--years", type=float, default=10, help="Years of daily history")
+    backtest.add_argument("--horizons", default=",".join(str(h) for h in HORIZONS),
+                          help="Comma-separated forward-return horizons in daily bars")
+    backtest.add_argument("--out", default="-", help="Signal events file (.parquet, .csv, .json) or '-'")
+    backtest.add_argument("--stats", help="Also write the per-signal statistics to this file")
+    
+    sweep = commands.add_parser(
+        "sweep", help="Backtest every combination of DMI/MACD settings and compare signal hit rates"
+    )
+    add_selection_arguments(sweep)
+    sweep.add_argument("--years", type=float, default=10, help="Years of daily history")
+    sweep.add_argument("--horizons", default=",".join(str(h) for h in HORIZONS),
+                       help="Comma-separated forward-return horizons in daily bars")
+    for name, default in DEFAULT_PARAMETERS.items():
+        sweep.add_argument(f"--{name.replace('_', '-')}", dest=name,
+                           help=f"Comma-separated values to try (default {default})")
+    sweep.add_argument("--min-count", type=int, default=30,
+                       help="Signals a combo needs before it is ranked")
+    sweep.add_argument("--top", type=int, default=5, help="Best combos printed per signal")
+    sweep.add_argument("--out", default="-", help="Per-combo statistics file (.parquet, .csv, .json) or '-'")
+    
+    signals = commands.add_parser("signals", help="Query the signal log")
+    signals.add_argument("--symbol", help="Only this symbol")
+    signals.add_argument("--signal", choices=SIGNAL_TYPES, help="Only this signal type")
+    signals.add_argument("--days", type=float, help="Only signals logged in the last N days")
+    signals.add_argument("--limit", type=int, default=200, help="Newest N signals")
+    signals.add_argument("--signal-log", default=SIGNAL_LOG_PATH, help="SQLite signal log")
+    signals.add_argument("--out", default="-", help="Output file (.parquet, .csv, .json) or '-' for stdout")
+    
+    bench = commands.add_parser("bench", help="Run the offline benchmarks on synthetic data")
+    bench.add_argument("--sizes", default=",".join(str(size) for size in SCAN_SIZES),
+                       help="Comma-separated portfolio sizes for the full-scan benchmark")
+    bench.add_argument("--repeat", type=int, default=5, help="Timing rounds per kernel benchmark")
+    bench.add_argument("--out", default="-", help="JSON report file or '-' for stdout")
+    bench.add_argument("--compare", help="Earlier JSON report to print ratios against")
+    
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(name)s: %(message)s")
+    if args.command == "scan":
+        return scan_command(args)
+    if args.command == "backtest":
+        return backtest_command(args)
+    if args.command == "sweep":
+        return sweep_command(args)
+    if args.command == "signals":
+        return signals_command(args)
+    if args.command == "bench":
+        return bench_command(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,314 @@
+"""Historical Get/Set/Go states and signal backtests across a portfolio"""
+import itertools
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from .config import TIMEFRAMES
+from .fetch import clean_history, download_bars, yf_download
+from .indicators import (align_ohlc, batch_ema, calculate_indicators_batch, directional_index,
+                         directional_movement, packed_ohlc, rma, unpack_bars)
+from .states import get_state_series, go_state_series, set_state_series, state_scores
+
+# How long after its timestamp a bar is final: daily bars are stamped with
+# their date and weekly (W-FRI) bars with their last day
+BAR_CLOSE = {
+    "1h": pd.Timedelta(hours=1),
+    "1d": pd.Timedelta(days=1),
+    "1wk": pd.Timedelta(days=1)
+}
+
+# Forward returns are measured this many bars of the finest timeframe ahead
+HORIZONS = (1, 5, 20)
+
+# The settings calculate_dmi and calculate_macd use unless told otherwise
+DEFAULT_PARAMETERS = {
+    "length": 14,
+    "smoothing": 14,
+    "fast_length": 12,
+    "slow_length": 26,
+    "signal_length": 9,
+    "alpha_adj": 19
+}
+
+STATS_COLUMNS = ['signal', 'horizon', 'count', 'mean', 'median', 'win_rate']
+
+class Backtest(NamedTuple):
+    """Every historical signal and the forward-return statistics per signal type"""
+    events: pd.DataFrame  # symbol, time, signal, total, fwd_<h> per horizon
+    stats: pd.DataFrame  # signal, horizon, count, mean, median, win_rate
+
+class Sweep(NamedTuple):
+    """Signal statistics for every parameter combination of a sweep"""
+    stats: pd.DataFrame  # the DEFAULT_PARAMETERS columns, then Backtest.stats' columns
+    baseline: pd.DataFrame  # Backtest.stats' all_bars rows: every bar's forward returns
+
+def timeframe_states(frames, parameters=None):
+    """Score matrices (bars x symbols) for one timeframe's frames
+    
+    Returns {'get', 'set', 'go', 'total', 'close'}; scores are NaN on bars a
+    symbol has no state for, i.e. before its second bar and on days it did
+    not trade. ``parameters`` overrides DEFAULT_PARAMETERS. Returns None if
+    the indicators could not be computed.
+    """
+    ohlc = align_ohlc(frames)
+    batch = calculate_indicators_batch(ohlc['High'], ohlc['Low'], ohlc['Close'], **(parameters or {}))
+    if batch is None:
+        return None
+    
+    bars = batch['valid'].to_numpy()
+    get_score, _ = get_state_series(batch['plus_di'], batch['minus_di'], batch['adx'], bars)
+    set_score, _ = set_state_series(batch['macd'], bars)
+    go_score, _ = go_state_series(batch['signal'], bars)
+    
+    # No real state scores zero, so zero marks N/A
+    states = {
+        name: score.where(batch['valid'] & (score != 0))
+        for name, score in [('get', get_score), ('set', set_score), ('go', go_score)]
+    }
+    states['total'] = states['get'] + states['set'] + states['go']
+    states['close'] = ohlc['Close']
+    return states
+
+def _as_of(states, timeframe, index, base_timeframe):
+    # The latest final state of a timeframe at the close of each base bar
+    closes = states.index + BAR_CLOSE[timeframe]
+    base_closes = index + BAR_CLOSE[base_timeframe]
+    rows = closes.searchsorted(base_closes, side='right') - 1
+    filled = states.ffill().to_numpy(dtype=float)
+    values = np.full((len(index), states.shape[1]), np.nan)
+    values[rows >= 0] = filled[rows[rows >= 0]]
+    return values
+
+def _previous_bar(values):
+    return np.concatenate([np.full((1,) + values.shape[1:], np.nan), values[:-1]])
+
+def _return_stats(signal_type, horizon, returns):
+    # A sell signal wins when the price falls
+    if not len(returns):
+        return (signal_type, horizon, 0, np.nan, np.nan, np.nan)
+    wins = returns < 0 if signal_type.endswith('_sell') else returns > 0
+    return (signal_type, horizon, len(returns), returns.mean(), np.median(returns), wins.mean())
+
+def _forward_returns(close, horizons):
+    prices = close.ffill()
+    return {h: (prices.shift(-h) / prices - 1).to_numpy() for h in horizons}
+
+def _baseline_stats(close, forward, horizons):
+    rows = []
+    for h in horizons:
+        baseline = forward[h][close.notna().to_numpy()]
+        rows.append(_return_stats('all_bars', h, baseline[~np.isnan(baseline)]))
+    return rows
+
+def _signal_masks(gets, total):
+    # The four signals at every base bar from as-of Get scores and the base total
+    prev_gets = _previous_bar(gets.transpose(1, 0, 2)).transpose(1, 0, 2)
+    prev_total = _previous_bar(total)
+    with np.errstate(invalid='ignore'):
+        return {
+            'get_buy': (prev_gets < 0).any(axis=0) & (gets > 0).all(axis=0),
+            'get_sell': (prev_gets > 0).any(axis=0) & (gets < 0).all(axis=0),
+            'trend_buy': (prev_total < 5) & (total >= 5),
+            'trend_sell': (prev_total > -5) & (total <= -5)
+        }
+
+def run_backtest(data, horizons=HORIZONS, timeframes=TIMEFRAMES, parameters=None):
+    """Find every historical signal in ``data`` and its forward returns
+    
+    ``data`` maps timeframe name to {symbol: frame} like scan_portfolio's
+    input; any subset of the timeframes may be given. Signals are evaluated
+    at the close of each bar of the finest timeframe, using only the coarser
+    bars that had closed by then:
+    
+    - 3 Gets Buy/Sell: every timeframe's Get turns positive/negative while
+      one of them was on the other side a bar earlier (check_dmi_signals)
+    - Total Trend Buy/Sell: the finest timeframe's Get+Set+Go crosses 5/-5
+      (check_trend_signals, which uses Hourly in the dashboard)
+    
+    Forward returns are close-to-close over ``horizons`` finest bars.
+    ``parameters`` overrides DEFAULT_PARAMETERS for the indicators.
+    """
+    available = [(name, tf) for name, tf in timeframes.items() if data.get(name)]
+    states = {name: timeframe_states(data[name], parameters) for name, _ in available}
+    available = [(name, tf) for name, tf in available if states[name] is not None]
+    if not available:
+        return Backtest(pd.DataFrame(), pd.DataFrame())
+    
+    # TIMEFRAMES runs from the coarsest to the finest timeframe
+    base_name, base_tf = available[-1]
+    close = states[base_name]['close']
+    index, symbols = close.index, close.columns
+    
+    gets = np.stack([
+        _as_of(states[name]['get'].reindex(columns=symbols), tf, index, base_tf)
+        for name, tf in available
+    ])
+    total = _as_of(states[base_name]['total'], base_tf, index, base_tf)
+    signals = _signal_masks(gets, total)
+    forward = _forward_returns(close, horizons)
+    
+    events = []
+    for signal_type, fired in signals.items():
+        rows, cols = np.nonzero(fired)
+        event = pd.DataFrame({
+            'symbol': symbols[cols],
+            'time': index[rows],
+            'signal': signal_type,
+            'total': total[rows, cols]
+        })
+        for h in horizons:
+            event[f'fwd_{h}'] = forward[h][rows, cols]
+        events.append(event)
+    events = pd.concat(events, ignore_index=True).sort_values(['time', 'symbol'], ignore_index=True)
+    
+    stats = []
+    baseline = _baseline_stats(close, forward, horizons)
+    for i, h in enumerate(horizons):
+        stats.append(baseline[i])
+        for signal_type in signals:
+            returns = events.loc[events['signal'] == signal_type, f'fwd_{h}'].dropna()
+            stats.append(_return_stats(signal_type, h, returns.to_numpy()))
+    return Backtest(events, pd.DataFrame(stats, columns=STATS_COLUMNS))
+
+def parameter_grid(**values):
+    """Every combination of the given parameter values, the others at their defaults
+    
+    Keys are DEFAULT_PARAMETERS names, e.g. ``parameter_grid(length=[10, 14],
+    alpha_adj=[0, 9, 19])`` gives six combinations.
+    """
+    unknown = set(values) - set(DEFAULT_PARAMETERS)
+    if unknown:
+        raise ValueError(f"Unknown parameters: {', '.join(sorted(unknown))}")
+    choices = [list(values.get(name, [default])) for name, default in DEFAULT_PARAMETERS.items()]
+    return [dict(zip(DEFAULT_PARAMETERS, combo)) for combo in itertools.product(*choices)]
+
+class _SweepTimeframe:
+    """One timeframe's packed bars and the indicator stages worked out so far
+    
+    True range and directional movement are computed once; DI/DX are kept
+    per DMI length and EMAs of the close per smoothing factor, so combos
+    sharing them do not compute them again.
+    """
+    
+    def __init__(self, frames):
+        ohlc = align_ohlc(frames)
+        self.close = ohlc['Close']
+        packed, self.mapping = packed_ohlc(ohlc['High'], ohlc['Low'], ohlc['Close'])
+        self.packed_close = packed['Close']
+        self.is_bar = self.packed_close.notna().to_numpy()
+        self.movement = directional_movement(packed['High'], packed['Low'], packed['Close'])
+        self._index = {}
+        self._emas = {}
+    
+    def aligned(self, scores):
+        # Packed scores, NaN off the symbol's bars, onto the aligned index
+        scores = pd.DataFrame(np.where(self.is_bar, scores, np.nan), columns=self.close.columns)
+        return unpack_bars(scores, self.mapping, self.close)
+    
+    def get_scores(self, length, smoothing):
+        if length not in self._index:
+            self._index[length] = directional_index(*self.movement, length)
+        plus_di, minus_di, dx = self._index[length]
+        get_scores, _, _ = state_scores(plus_di, minus_di, rma(dx, smoothing), bars=self.is_bar)
+        return self.aligned(get_scores)
+    
+    def ema(self, length, alpha_adj, values=None):
+        # EMAs of the close are kept, EMAs of a MACD line are not
+        if values is not None:
+            return batch_ema(values, length, alpha_adj)
+        key = length + alpha_adj
+        if key not in self._emas:
+            self._emas[key] = batch_ema(self.packed_close, length, alpha_adj)
+        return self._emas[key]
+
+def run_sweep(data, combos, horizons=HORIZONS, timeframes=TIMEFRAMES):
+    """Signal statistics of run_backtest for every combination of indicator settings
+    
+    ``combos`` are dicts of DEFAULT_PARAMETERS names, e.g. from
+    parameter_grid; missing names take their defaults. Every combo is
+    evaluated on the whole of ``data`` at once across symbols. The Get
+    scores of each (length, smoothing) and the Set+Go scores of each
+    (fast_length, slow_length, signal_length, alpha_adj) are worked out
+    once and combined per combo, so a sweep costs little more than its
+    distinct settings. The stats of each combo match run_backtest run with
+    those settings.
+    """
+    available = [(name, tf) for name, tf in timeframes.items() if data.get(name)]
+    if not available:
+        return Sweep(pd.DataFrame(columns=list(DEFAULT_PARAMETERS) + STATS_COLUMNS),
+                     pd.DataFrame(columns=STATS_COLUMNS))
+    sweep_frames = {name: _SweepTimeframe(data[name]) for name, _ in available}
+    
+    # TIMEFRAMES runs from the coarsest to the finest timeframe
+    base_name, base_tf = available[-1]
+    base = sweep_frames[base_name]
+    close = base.close
+    index, symbols = close.index, close.columns
+    forward = _forward_returns(close, horizons)
+    
+    combos = [{**DEFAULT_PARAMETERS, **combo} for combo in combos]
+    dmi_keys = ['length', 'smoothing']
+    macd_keys = ['fast_length', 'slow_length', 'signal_length', 'alpha_adj']
+    gets_by_dmi = {}
+    
+    def dmi_states(dmi):
+        # As-of Get scores of every timeframe and the base timeframe's own
+        if dmi not in gets_by_dmi:
+            scores = {name: sweep_frames[name].get_scores(*dmi) for name, _ in available}
+            gets_by_dmi[dmi] = (
+                np.stack([_as_of(scores[name].reindex(columns=symbols), tf, index, base_tf)
+                          for name, tf in available]),
+                scores[base_name].to_numpy()
+            )
+        return gets_by_dmi[dmi]
+    
+    # Combos sharing MACD settings run together; rows keep the order of ``combos``
+    rows = [None] * len(combos)
+    by_macd = {}
+    for i, combo in enumerate(combos):
+        by_macd.setdefault(tuple(combo[key] for key in macd_keys), []).append(i)
+    for (fast_length, slow_length, signal_length, alpha_adj), group in by_macd.items():
+        macd = base.ema(fast_length, alpha_adj) - base.ema(slow_length, alpha_adj)
+        signal = base.ema(signal_length, alpha_adj, macd)
+        _, set_scores, go_scores = state_scores(None, None, None, macd, signal, bars=base.is_bar)
+        set_go = base.aligned(set_scores + go_scores).to_numpy()
+        
+        for i in group:
+            combo = combos[i]
+            gets, base_get = dmi_states(tuple(combo[key] for key in dmi_keys))
+            total = _as_of(pd.DataFrame(base_get + set_go, index=index), base_tf, index, base_tf)
+            signals = _signal_masks(gets, total)
+            rows[i] = []
+            for h in horizons:
+                for signal_type, fired in signals.items():
+                    returns = forward[h][fired]
+                    rows[i].append((*combo.values(), *_return_stats(signal_type, h, returns[~np.isnan(returns)])))
+    
+    stats = pd.DataFrame([row for combo_rows in rows for row in combo_rows],
+                         columns=list(DEFAULT_PARAMETERS) + STATS_COLUMNS)
+    return Sweep(stats, pd.DataFrame(_baseline_stats(close, forward, horizons), columns=STATS_COLUMNS))
+
+def load_history(symbols, years, downloader=yf_download, batch_size=50, max_workers=1):
+    """Download ``years`` of daily bars and build the Weekly and Daily frames
+    
+    Yahoo only serves about two years of hourly bars, so long backtests run
+    on Weekly and Daily. Returns ({timeframe name: {symbol: frame}}, failures).
+    """
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=int(years * 365.25))
+    bars, failures = download_bars(
+        list(dict.fromkeys(symbols)), "1d", start_date, end_date, downloader, batch_size, max_workers
+    )
+    
+    data = {"Weekly": {}, "Daily": {}}
+    for symbol, daily in bars.items():
+        for tf_name in data:
+            frame = clean_history(daily.copy(), symbol, TIMEFRAMES[tf_name])
+            if frame is not None:
+                data[tf_name][symbol] = frame
+        if symbol not in data["Daily"]:
+            failures[symbol] = "insufficient data"
+    return data, failures
@@ -0,0 +1,159 @@
+"""Offline benchmarks of the indicator kernels, analysis and full scans"""
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from .config import BASE_DIR, FETCH_BATCH_SIZE, HISTORY_WINDOWS, TIMEFRAMES
+from .fetch import clean_history
+from .indicators import calculate_dmi, calculate_macd, pine_ema, rma
+from .live import LiveScanner, ReplaySource, replay_split
+from .scanner import run_scan
+from .states import analyze_symbol
+from .synthetic import synthetic_bars, synthetic_download, synthetic_symbols
+from .timeframes import resample_frames
+
+SCAN_SIZES = (100, 1000, 5000)
+
+# Live streaming should keep up with this many bar updates per second on one core
+LIVE_TARGET_RATE = 1000
+
+# Every run uses the same synthetic calendar so results compare across commits
+BENCH_END = datetime(2026, 1, 2, 16, 0)
+
+def measure(func, repeat=5, number=1):
+    """Seconds per call of ``func``: best, median and mean of ``repeat`` rounds"""
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        rounds.append((time.perf_counter() - start) / number)
+    return {
+        "best": min(rounds),
+        "median": statistics.median(rounds),
+        "mean": statistics.fmean(rounds),
+        "repeat": repeat,
+        "number": number
+    }
+
+def timeframe_frame(symbol, timeframe, seed=0):
+    """A cleaned synthetic frame of a timeframe, like those a scan analyzes"""
+    interval, days = HISTORY_WINDOWS[timeframe]
+    bars = synthetic_bars(symbol, interval, BENCH_END - timedelta(days=days), BENCH_END, seed)
+    return clean_history(bars.dropna(how="all"), symbol, timeframe)
+
+def kernel_benchmarks(repeat=5):
+    """Time the per-symbol building blocks on typical and long histories"""
+    results = []
+    long_bars = synthetic_bars("SYN0000", "1d", BENCH_END - timedelta(days=7300), BENCH_END).ffill().bfill()
+    daily = timeframe_frame("SYN0001", "1d")
+    hourly = timeframe_frame("0700.HK", "1h")
+    weekly = timeframe_frame("SYN0002", "1wk")
+    # Timeframes resampled for a batch of symbols at once, bypassing the cache
+    resample_symbols = synthetic_symbols(100)
+    daily_batch = {symbol: synthetic_bars(symbol, "1d", BENCH_END - timedelta(days=1000), BENCH_END)
+                   for symbol in resample_symbols}
+    hourly_batch = {symbol: synthetic_bars(symbol, "1h", BENCH_END - timedelta(days=45), BENCH_END)
+                    for symbol in resample_symbols}
+    
+    cases = [
+        ("rma", len(long_bars), lambda: rma(long_bars["Close"], 14), 20),
+        ("pine_ema", len(long_bars), lambda: pine_ema(long_bars["Close"], 12), 20),
+        ("calculate_dmi", len(long_bars), lambda: calculate_dmi(long_bars), 5),
+        ("calculate_macd", len(long_bars), lambda: calculate_macd(long_bars), 5),
+        ("analyze_symbol_hourly", len(hourly), lambda: analyze_symbol(hourly), 20),
+        ("analyze_symbol_daily", len(daily), lambda: analyze_symbol(daily), 20),
+        ("analyze_symbol_weekly", len(weekly), lambda: analyze_symbol(weekly), 20),
+        ("resample_weekly", sum(map(len, daily_batch.values())),
+         lambda: resample_frames(daily_batch, "1wk", cache=None), 10),
+        ("resample_4h", sum(map(len, hourly_batch.values())),
+         lambda: resample_frames(hourly_batch, "4h", cache=None), 10)
+    ]
+    for name, bars, func, number in cases:
+        func()  # warm up caches and lazy imports
+        results.append({"name": name, "size": bars, **measure(func, repeat, number)})
+    return results
+
+def scan_benchmarks(sizes=SCAN_SIZES, repeat=1):
+    """Time run_scan end to end over synthetic portfolios, downloads included"""
+    results = []
+    for size in sizes:
+        symbols = synthetic_symbols(size)
+        stages = []
+        
+        def scan():
+            _, timings = run_scan({"Benchmark": symbols}, downloader=synthetic_download,
+                                  batch_size=FETCH_BATCH_SIZE)
+            stages.append(timings)
+        
+        result = {"name": "run_scan", "size": size, **measure(scan, repeat)}
+        result["stages"] = {stage: statistics.median(t[stage] for t in stages) for stage in stages[0]}
+        results.append(result)
+    return results
+
+def live_benchmarks(size=100, days=2, steps=4, repeat=3):
+    """Seconds per bar update when replaying the last days of Hourly bars live
+    
+    ``rate`` is the updates per second that gives, against LIVE_TARGET_RATE.
+    """
+    symbols = synthetic_symbols(size)
+    data = {tf_name: {symbol: timeframe_frame(symbol, tf_code) for symbol in symbols}
+            for tf_name, tf_code in TIMEFRAMES.items()}
+    history, replay = replay_split(data, days)
+    source = ReplaySource(replay, steps)
+    
+    def stream():
+        live = LiveScanner(history, symbols)
+        for _ in live.run(source):
+            pass
+    
+    # Seeding the streams is timed separately from the updates
+    seed = measure(lambda: LiveScanner(history, symbols), repeat)
+    total = measure(stream, repeat)
+    per_update = {key: (total[key] - seed[key]) / len(source) for key in ["best", "median", "mean"]}
+    return [
+        {"name": "live_seed", "size": size, **seed},
+        {"name": "live_update", "size": size, **total, **per_update, "updates": len(source),
+         "rate": 1 / per_update["median"], "target_rate": LIVE_TARGET_RATE}
+    ]
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(sizes=SCAN_SIZES, repeat=5):
+    """Run every benchmark; returns a JSON-serialisable report"""
+    return {
+        "commit": _git_commit(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": kernel_benchmarks(repeat) + live_benchmarks() + scan_benchmarks(sizes)
+    }
+
+def compare_reports(report, baseline):
+    """Rows of (name, size, baseline median, median, ratio) for results in both"""
+    before = {(r["name"], r["size"]): r["median"] for r in baseline["results"]}
+    rows = []
+    for result in report["results"]:
+        key = (result["name"], result["size"])
+        if key in before:
+            rows.append((*key, before[key], result["median"], result["median"] / before[key]))
+    return rows
+
+def load_report(path):
+    with open(path) as f:
+        return json.load(f)
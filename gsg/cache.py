@@ -0,0 +1,352 @@
+"""Stale-while-revalidate cache of timeframe frames shared by dashboard sessions"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from .config import CACHE_MAX_BYTES, CACHE_TTLS, HISTORY_WINDOWS, OHLCV_COLUMNS, SCAN_TIMEFRAMES
+from .diagnostics import count, timed
+from .fetch import yf_download
+from .plan import iter_execute_plan, plan_fetches
+from .scanner import split_timeframes
+
+logger = logging.getLogger(__name__)
+
+class ColumnarFrame(NamedTuple):
+    """One frame's bars as read-only contiguous arrays"""
+    timestamps: np.ndarray  # bar times, shared by cached frames with the same bars
+    prices: np.ndarray  # float32 (4, bars): Open, High, Low, Close
+    volume: np.ndarray  # int64 (bars,)
+    
+    def frame(self):
+        """A DataFrame over the arrays themselves; nothing is copied"""
+        columns = dict(zip(OHLCV_COLUMNS[:4], self.prices))
+        columns['Volume'] = self.volume
+        return pd.DataFrame(columns, index=pd.DatetimeIndex(self.timestamps, copy=False), copy=False)
+
+def _index_key(tf_code, timestamps):
+    return tf_code, len(timestamps), hash(timestamps.tobytes())
+
+def _read_only(values):
+    values.flags.writeable = False
+    return values
+
+class CacheEntry(NamedTuple):
+    frame: object  # view of ``bars`` handed to callers; None until a frame has loaded
+    bars: ColumnarFrame  # the arrays ``frame`` is built on
+    nbytes: int  # bytes of ``bars`` not shared with other entries
+    fetched_at: float  # when ``frame`` was loaded
+    checked_at: float  # last load attempt, successful or not; drives the TTL
+    error: str  # why the last attempt failed, None if it succeeded
+
+class FrameCache:
+    """Cleaned frames keyed by (symbol, timeframe) that never block on a refresh
+    
+    A series seen for the first time is loaded before ``get`` returns. Once
+    cached it is always served straight away: when its timeframe's TTL has
+    passed the last good frame is returned and a background thread reloads
+    it, so the next caller sees fresh data. A failed refresh keeps serving
+    the previous frame.
+    
+    Frames are kept as float32 prices and int64 volumes, and frames of an
+    interval with identical bar times share one timestamp array. Once the
+    arrays pass ``max_bytes`` the least recently used series are evicted
+    and load again on their next ``get``. Callers get DataFrames viewing
+    the cached arrays, which are read-only. ``windows`` sets how much
+    history each timeframe loads (see plan_fetches).
+    """
+    
+    def __init__(self, store=None, downloader=yf_download, batch_size=50, max_workers=1,
+                 ttls=CACHE_TTLS, clock=time.time, max_bytes=CACHE_MAX_BYTES,
+                 windows=HISTORY_WINDOWS):
+        self.store = store
+        self.downloader = downloader
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.ttls = ttls
+        self.clock = clock
+        self.max_bytes = max_bytes
+        self.windows = windows
+        self._entries = OrderedDict()  # least recently used first
+        self._timestamps = {}  # (interval, bars, hash) -> [shared timestamps, entries using them]
+        self._bytes = 0
+        self._counters = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'evictions': 0}
+        self._pending = set()
+        self._lock = threading.Lock()
+        # One refresh at a time; the downloads inside it are already concurrent
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gsg-refresh")
+    
+    def get(self, symbols, timeframes=SCAN_TIMEFRAMES, timings=None):
+        """Return (data, failures, ages) for the symbols, scheduling stale refreshes
+        
+        ``data`` and ``failures`` are shaped like split_timeframes output and
+        ``ages`` maps each symbol to the age in seconds of its oldest frame.
+        Hits, stale hits and misses are counted per series in ``timings``.
+        """
+        for _, data, failures, ages in self.iter_get(symbols, timeframes, timings):
+            pass
+        return data, failures, ages
+    
+    def iter_get(self, symbols, timeframes=SCAN_TIMEFRAMES, timings=None):
+        """Like ``get`` but yields (ready, data, failures, ages) as loads land
+        
+        ``ready`` lists the symbols whose every timeframe became available
+        (loaded or failed) since the previous yield: cached symbols come
+        first, then each symbol as its last missing download batch lands.
+        Time spent loading counts towards the 'fetch' stage.
+        """
+        symbols = list(symbols)
+        with timed(timings, 'fetch'):
+            missing = self._schedule(symbols, timeframes, timings)
+        
+        # Symbols are viewed as they become ready, so evictions made by later
+        # loads cannot take their frames away
+        data = {tf_name: {} for tf_name in timeframes}
+        failures, ages = {}, {}
+        
+        def add(ready):
+            ready_data, ready_failures, ready_ages = self.view(ready, timeframes)
+            for tf_name, frames in ready_data.items():
+                data[tf_name].update(frames)
+            failures.update(ready_failures)
+            ages.update(ready_ages)
+            return ready, data, failures, ages
+        
+        waiting = {}
+        for symbol, tf_code in missing:
+            waiting.setdefault(symbol, set()).add(tf_code)
+        ready = [symbol for symbol in symbols if symbol not in waiting]
+        if ready or not missing:
+            yield add(ready)
+        
+        loads = self._iter_load(missing, timings)
+        while waiting:
+            with timed(timings, 'fetch'):
+                loaded = next(loads, None)
+            if loaded is None:
+                break
+            for symbol, tf_code in loaded:
+                waiting.get(symbol, set()).discard(tf_code)
+            ready = [symbol for symbol in symbols if symbol in waiting and not waiting[symbol]]
+            for symbol in ready:
+                del waiting[symbol]
+            if ready:
+                yield add(ready)
+    
+    def _schedule(self, symbols, timeframes, timings):
+        # Sort keys into cached, stale (refreshed in the background) and missing
+        now = self.clock()
+        missing, stale = [], []
+        with self._lock:
+            for tf_code in timeframes.values():
+                for symbol in symbols:
+                    key = (symbol, tf_code)
+                    entry = self._entries.get(key)
+                    if entry is None:
+                        missing.append(key)
+                        continue
+                    self._entries.move_to_end(key)
+                    if now - entry.checked_at >= self.ttls[tf_code]:
+                        if key not in self._pending:
+                            stale.append(key)
+                        self._counters['stale_hits'] += 1
+                        count(timings, 'cache_stale')
+                    else:
+                        self._counters['hits'] += 1
+                        count(timings, 'cache_hit')
+            self._pending.update(stale)
+            self._counters['misses'] += len(missing)
+        
+        count(timings, 'cache_miss', len(missing))
+        if stale:
+            self._executor.submit(self._refresh, stale)
+        return missing
+    
+    def view(self, symbols, timeframes=SCAN_TIMEFRAMES):
+        """Current cache contents for the symbols without loading anything"""
+        now = self.clock()
+        downloaded = {}
+        ages = {}
+        with self._lock:
+            for tf_code in timeframes.values():
+                frames, failures = downloaded.setdefault(tf_code, ({}, {}))
+                for symbol in symbols:
+                    entry = self._entries.get((symbol, tf_code))
+                    if entry is None:
+                        continue
+                    self._entries.move_to_end((symbol, tf_code))
+                    if entry.frame is not None:
+                        frames[symbol] = entry.frame
+                        age = now - entry.fetched_at
+                        ages[symbol] = max(ages.get(symbol, 0.0), age)
+                    else:
+                        failures[symbol] = entry.error
+        data, failures = split_timeframes(downloaded, timeframes)
+        return data, failures, ages
+    
+    def version(self, symbols, timeframes=SCAN_TIMEFRAMES):
+        """When each of the symbols' series was last loaded, None where not cached
+        
+        Changes whenever one of the series is reloaded, evicted or loaded for
+        the first time, so equal versions mean the same frames.
+        """
+        with self._lock:
+            return tuple(
+                entry.fetched_at if entry is not None else None
+                for tf_code in timeframes.values() for symbol in symbols
+                for entry in [self._entries.get((symbol, tf_code))]
+            )
+    
+    def refresh_stale(self, symbols, timeframes=SCAN_TIMEFRAMES):
+        """Refresh expired series in the background without loading missing ones"""
+        now = self.clock()
+        with self._lock:
+            stale = [
+                (symbol, tf_code) for tf_code in timeframes.values() for symbol in symbols
+                if (symbol, tf_code) in self._entries and (symbol, tf_code) not in self._pending
+                and now - self._entries[(symbol, tf_code)].checked_at >= self.ttls[tf_code]
+            ]
+            self._pending.update(stale)
+        if stale:
+            self._executor.submit(self._refresh, stale)
+        return len(stale)
+    
+    def stats(self):
+        """Hit, stale hit, miss and eviction counts plus the memory in use"""
+        with self._lock:
+            return {
+                **self._counters,
+                'entries': len(self._entries),
+                'shared_indexes': len(self._timestamps),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes
+            }
+    
+    @property
+    def refreshing(self):
+        """Number of series currently being reloaded in the background"""
+        with self._lock:
+            return len(self._pending)
+    
+    def expire(self, symbols=None):
+        """Mark series stale so the next ``get`` refreshes them in the background"""
+        with self._lock:
+            for key, entry in self._entries.items():
+                if symbols is None or key[0] in symbols:
+                    self._entries[key] = entry._replace(checked_at=float('-inf'))
+    
+    def invalidate(self, symbols):
+        """Drop the symbols' frames so the next ``get`` reloads them before returning"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] in symbols]:
+                self._release(key, self._entries.pop(key))
+    
+    def _iter_load(self, keys, timings=None):
+        # Load keys batch by batch, yielding the keys each landed batch settled.
+        # Symbols are planned a round of batches at a time so the first ones
+        # get every timeframe before later symbols start downloading
+        symbols = list(dict.fromkeys(symbol for symbol, _ in keys))
+        group_size = self.batch_size * self.max_workers
+        unsettled = set(keys)
+        for i in range(0, len(symbols), group_size):
+            group = set(symbols[i:i + group_size])
+            by_timeframe = {}
+            for symbol, tf_code in keys:
+                if symbol in group:
+                    by_timeframe.setdefault(tf_code, []).append(symbol)
+            plan = plan_fetches([(tf_symbols, [tf_code]) for tf_code, tf_symbols in by_timeframe.items()],
+                                self.windows)
+            
+            for tf_code, frames, failures in iter_execute_plan(
+                plan, self.store, self.downloader, self.batch_size, self.max_workers, timings
+            ):
+                settled = [(symbol, tf_code) for symbol in list(frames) + list(failures)
+                           if (symbol, tf_code) in unsettled]
+                self._settle(settled, frames, failures, timings)
+                unsettled.difference_update(settled)
+                yield settled
+        if unsettled:
+            self._settle(list(unsettled), {}, {}, timings)
+            yield list(unsettled)
+    
+    def _load(self, keys, timings=None):
+        for _ in self._iter_load(keys, timings):
+            pass
+    
+    def _settle(self, keys, frames, failures, timings=None):
+        now = self.clock()
+        with self._lock:
+            for symbol, tf_code in keys:
+                key = (symbol, tf_code)
+                if symbol in frames:
+                    entry = self._pack(tf_code, frames[symbol], now)
+                elif self._entries.get(key) is not None and self._entries[key].frame is not None:
+                    entry = self._entries[key]._replace(
+                        checked_at=now, error=failures.get(symbol, "no data returned")
+                    )
+                else:
+                    entry = CacheEntry(None, None, 0, now, now, failures.get(symbol, "no data returned"))
+                previous = self._entries.pop(key, None)
+                if previous is not None and previous.bars is not entry.bars:
+                    self._release(key, previous)
+                self._entries[key] = entry
+            
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                key, entry = self._entries.popitem(last=False)
+                self._release(key, entry)
+                self._counters['evictions'] += 1
+                count(timings, 'cache_evict')
+    
+    def _pack(self, tf_code, frame, now):
+        # Copy a loaded frame into compact arrays, sharing an identical index
+        timestamps = frame.index.to_numpy()
+        key = _index_key(tf_code, timestamps)
+        shared = self._timestamps.get(key)
+        nbytes = 0
+        if shared is not None and np.array_equal(shared[0], timestamps):
+            shared[1] += 1
+            timestamps = shared[0]
+        elif shared is None:
+            timestamps = _read_only(timestamps.copy())
+            self._timestamps[key] = [timestamps, 1]
+            self._bytes += timestamps.nbytes
+        else:
+            # A hash collision with different bars: keep a private copy
+            timestamps = _read_only(timestamps.copy())
+            nbytes += timestamps.nbytes
+        
+        prices = _read_only(np.ascontiguousarray(frame[OHLCV_COLUMNS[:4]].to_numpy(dtype=np.float32).T))
+        volume = _read_only(np.rint(frame['Volume'].fillna(0).to_numpy(dtype=float)).astype(np.int64))
+        bars = ColumnarFrame(timestamps, prices, volume)
+        nbytes += prices.nbytes + volume.nbytes
+        self._bytes += nbytes
+        return CacheEntry(bars.frame(), bars, nbytes, now, now, None)
+    
+    def _release(self, key, entry):
+        # Give back an entry's memory; a shared index goes with its last user
+        if entry.bars is None:
+            return
+        self._bytes -= entry.nbytes
+        timestamps = entry.bars.timestamps
+        index_key = _index_key(key[1], timestamps)
+        shared = self._timestamps.get(index_key)
+        if shared is not None and shared[0] is timestamps:
+            shared[1] -= 1
+            if shared[1] == 0:
+                del self._timestamps[index_key]
+                self._bytes -= timestamps.nbytes
+    
+    def _refresh(self, keys):
+        try:
+            self._load(keys)
+        except Exception as e:
+            # Logged below ERROR: the stale frames are still being served
+            logger.warning(f"Background refresh of {len(keys)} series failed: {str(e)}")
+        finally:
+            with self._lock:
+                self._pending.difference_update(keys)
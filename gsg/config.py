@@ -0,0 +1,160 @@
+"""Portfolios, timeframes and runtime settings shared by the scanner and dashboard"""
+import os
+
+# Repository root; local data files live next to the dashboard
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Define portfolios
+default_stocks = {
+    "HK Stocks": ["^HSI"] + [
+        "0001.HK", "0003.HK", "0005.HK", "0006.HK", "0011.HK", "0012.HK", "0016.HK", "0017.HK",
+        "0019.HK", "0020.HK", "0027.HK", "0066.HK", "0175.HK", "0241.HK", "0267.HK", "0268.HK",
+        "0285.HK", "0288.HK", "0291.HK", "0293.HK", "0358.HK", "0386.HK", "0388.HK", "0522.HK",
+        "0669.HK", "0688.HK", "0700.HK", "0762.HK", "0772.HK", "0799.HK", "0823.HK", "0836.HK",
+        "0853.HK", "0857.HK", "0868.HK", "0883.HK", "0909.HK", "0914.HK", "0916.HK", "0939.HK",
+        "0941.HK", "0960.HK", "0968.HK", "0981.HK", "0992.HK", "1024.HK", "1038.HK", "1044.HK",
+        "1093.HK", "1109.HK", "1113.HK", "1177.HK", "1211.HK", "1299.HK", "1347.HK", "1398.HK",
+        "1772.HK", "1776.HK", "1787.HK", "1801.HK", "1810.HK", "1818.HK", "1833.HK", "1876.HK",
+        "1898.HK", "1928.HK", "1929.HK", "1997.HK", "2007.HK", "2013.HK", "2015.HK", "2018.HK",
+        "2269.HK", "2313.HK", "2318.HK", "2319.HK", "2331.HK", "2333.HK", "2382.HK", "2388.HK",
+        "2518.HK", "2628.HK", "3690.HK", "3618.HK", "3888.HK", "3968.HK", "6060.HK", "6078.HK",
+        "6098.HK", "6618.HK", "6690.HK", "6862.HK", "9618.HK", "9626.HK", "9698.HK", "9888.HK",
+        "9961.HK", "9988.HK", "9999.HK"
+    ],
+    "US Stocks": ["^NDX", "^SPX"] + [        
+        "XLB", "XLE", "XLF", "XLI", "XLK", "XLP", "XLU", "XLV", "XLRE", "XLY",
+        "AAPL", "ABBV", "ABNB", "ACN", "ADBE", "AMD", "AMGN", "AMZN", "AMT", "ASML",
+        "AVGO", "BA", "BKNG", "BLK", "CAT", "CCL", "CDNS", "CEG", "CHTR", "COST", "CB",
+        "CRM", "CRWD", "CVS", "CVX", "DDOG", "DE", "DIS", "EQIX", "FTNT", "GE",
+        "GILD", "GOOG", "GS", "HD", "IBM", "ICE", "IDXX", "INTC", "INTU", "ISRG",
+        "JNJ", "JPM", "KO", "LEN", "LLY", "LRCX", "MA", "META", "MMM", "MRK", 
+        "MS", "MSFT", "MU", "NEE", "NFLX", "NRG", "NVO", "NVDA", "OXY", "PANW",
+        "PFE", "PG", "PGR", "PLTR", "PYPL", "QCOM", "REGN", "SBUX", "SMH", "SNOW",
+        "SPGI", "TEAM", "TJX", "TSM", "TSLA", "TTD", "TXN", "UNH", "UPS",
+        "V", "VST", "VZ", "WMT", "XOM", "ZS"
+    ],
+    "World Index": [
+        "^SPX", "^NDX", "^RUT", "^SOX", "^TNX", "^DJI", "^HSI", "3032.HK", 
+        "^N225", "^BSESN", "^KS11", "^TWII", "^GDAXI", "^FTSE", "^FCHI", "^BVSP", "EEMA", 
+        "EEM", "^HUI", "CL=F", "GC=F", "HG=F", "SI=F", "DX-Y.NYB", "BTC=F", "ETH=F"
+    ]
+}
+
+# The timeframes Total Trend and the signals are built on, coarsest first
+TIMEFRAMES = {
+    "Weekly": "1wk",
+    "Daily": "1d",
+    "Hourly": "1h"
+}
+
+# Every timeframe a scan can show, coarsest first
+TIMEFRAME_NAMES = {
+    "Monthly": "1mo",
+    "Weekly": "1wk",
+    "Daily": "1d",
+    "4-Hour": "4h",
+    "2-Hour": "2h",
+    "Hourly": "1h"
+}
+
+# Columns of a scan: TIMEFRAMES plus the extra timeframes named in
+# GSG_EXTRA_TIMEFRAMES (comma separated, none by default), e.g.
+# "Monthly,4-Hour,2-Hour"
+EXTRA_TIMEFRAMES = [
+    name for name in os.environ.get("GSG_EXTRA_TIMEFRAMES", "").split(",")
+    if name in TIMEFRAME_NAMES
+]
+SCAN_TIMEFRAMES = {name: code for name, code in TIMEFRAME_NAMES.items()
+                   if name in TIMEFRAMES or name in EXTRA_TIMEFRAMES}
+
+# timeframe -> (download interval, days of history). The resampled ones
+# share their interval's download and get about MIN_BARS bars out of it:
+# four 2-hour and two 4-hour slots a session day (4-Hour with room for a
+# holiday), and the months of the Weekly window
+HISTORY_WINDOWS = {
+    "1h": ("1h", 20),
+    "2h": ("1h", 20),
+    "4h": ("1h", 23),
+    "1d": ("1d", 250),
+    "1wk": ("1d", 1000),
+    "1mo": ("1d", 1000)
+}
+
+# How each timeframe is built from its download interval's bars: None keeps
+# them as downloaded, a pandas rule aggregates them (gsg.timeframes), within
+# each trading session for intraday rules. Resampled timeframes share their
+# interval's download, so they cost no requests of their own
+TIMEFRAME_RULES = {
+    "1h": None,
+    "2h": "2h",
+    "4h": "4h",
+    "1d": None,
+    "1wk": "W-FRI",
+    "1mo": "ME"
+}
+
+# Regular sessions in exchange time; Hong Kong breaks for lunch. ".HK"
+# listings and US tickers (no suffix) follow these, as do the indices in
+# INDEX_MARKETS; other symbols (other exchanges, futures, currencies) are
+# bucketed on the clock
+MARKET_SESSIONS = {
+    "HK": [("09:30", "12:00"), ("13:00", "16:00")],
+    "US": [("09:30", "16:00")]
+}
+INDEX_MARKETS = {
+    "^HSI": "HK",
+    "^SPX": "US", "^GSPC": "US", "^NDX": "US", "^IXIC": "US", "^DJI": "US",
+    "^RUT": "US", "^SOX": "US", "^HUI": "US"
+}
+
+# Seconds a cached timeframe is served before it is refreshed in the
+# background; hourly bars go stale far sooner than weekly ones
+CACHE_TTLS = {
+    "1h": 300,
+    "2h": 300,
+    "4h": 300,
+    "1d": 1800,
+    "1wk": 3600,
+    "1mo": 3600
+}
+
+# Memory the frame cache may hold before it evicts the least recently used
+# series; frames are kept as float32 prices and int64 volumes
+CACHE_MAX_BYTES = int(float(os.environ.get("GSG_CACHE_MAX_MB", 256)) * 2 ** 20)
+
+MIN_BARS = 30
+
+# Adaptive lookback (gsg.lookback) sizes the windows above so the first bars
+# weigh less than the tolerance in the latest indicator values, then adds a
+# margin share of bars
+ADAPTIVE_LOOKBACK = os.environ.get("GSG_ADAPTIVE_LOOKBACK", "0") == "1"
+LOOKBACK_TOLERANCE = float(os.environ.get("GSG_LOOKBACK_TOLERANCE", 0.01))
+LOOKBACK_MARGIN = float(os.environ.get("GSG_LOOKBACK_MARGIN", 0.25))
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Downloaded bars persist here between runs; refreshes only append new bars
+STORE_PATH = os.environ.get(
+    "GSG_STORE_PATH",
+    os.path.join(BASE_DIR, "gsg_store.sqlite")
+)
+
+# Logged signals and the last states each scan compares against
+SIGNAL_LOG_PATH = os.environ.get(
+    "GSG_SIGNAL_LOG_PATH",
+    os.path.join(BASE_DIR, "gsg_signals.sqlite")
+)
+
+# Snapshot of the incremental indicator accumulators
+STREAMS_PATH = os.environ.get(
+    "GSG_STREAMS_PATH",
+    os.path.join(BASE_DIR, "gsg_streams.json")
+)
+
+# Concurrent downloads: parallel requests, symbols per request, requests per
+# second allowed towards Yahoo, retries and seconds before a request is dropped
+FETCH_WORKERS = int(os.environ.get("GSG_FETCH_WORKERS", 4))
+FETCH_BATCH_SIZE = int(os.environ.get("GSG_FETCH_BATCH_SIZE", 25))
+FETCH_RATE = float(os.environ.get("GSG_FETCH_RATE", 2.0))
+FETCH_RETRIES = 3
+FETCH_TIMEOUT = 60.0
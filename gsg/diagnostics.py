@@ -0,0 +1,106 @@
+"""Low-overhead stage timers and counters for scans"""
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+class StageTimings(dict):
+    """Total seconds per stage, plus per-symbol samples and event counters
+    
+    Reads like the plain ``{stage: seconds}`` timings dict, so code that only
+    wants totals can keep using it that way. Updates take a lock because
+    downloads are timed from worker threads.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.symbols = {}  # stage -> {symbol: seconds}
+        self.counters = {}
+        self._lock = threading.Lock()
+    
+    def add(self, stage, seconds, symbol=None):
+        with self._lock:
+            self[stage] = self.get(stage, 0.0) + seconds
+            if symbol is not None:
+                per_symbol = self.symbols.setdefault(stage, {})
+                per_symbol[symbol] = per_symbol.get(symbol, 0.0) + seconds
+    
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+    
+    def summary(self, top=10):
+        """Per-stage totals with p50/p95 per symbol, counters and the slowest symbols"""
+        with self._lock:
+            totals = dict(self)
+            symbols = {stage: dict(per_symbol) for stage, per_symbol in self.symbols.items()}
+            counters = dict(self.counters)
+        
+        stages = {}
+        for stage, total in totals.items():
+            samples = np.fromiter(symbols.get(stage, {}).values(), dtype=float)
+            stages[stage] = {
+                'total': total,
+                'symbols': len(samples),
+                'p50': float(np.percentile(samples, 50)) if len(samples) else None,
+                'p95': float(np.percentile(samples, 95)) if len(samples) else None
+            }
+        
+        by_symbol = {}
+        for stage, per_symbol in symbols.items():
+            for symbol, seconds in per_symbol.items():
+                by_symbol.setdefault(symbol, {})[stage] = seconds
+        slowest = sorted(by_symbol.items(), key=lambda item: sum(item[1].values()), reverse=True)[:top]
+        return {
+            'stages': stages,
+            'counters': counters,
+            'slowest_symbols': [
+                {'symbol': symbol, 'seconds': sum(per_stage.values()), 'stages': per_stage}
+                for symbol, per_stage in slowest
+            ]
+        }
+    
+    def to_json(self, top=10):
+        return json.dumps(self.summary(top), indent=2)
+
+@contextmanager
+def timed(timings, stage, symbol=None):
+    """Add the wall time of the block to ``timings[stage]``
+    
+    With StageTimings the time is also recorded against ``symbol``; with
+    ``timings=None`` nothing is measured.
+    """
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if isinstance(timings, StageTimings):
+            timings.add(stage, elapsed, symbol)
+        else:
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+
+def count(timings, name, n=1):
+    """Bump a StageTimings counter; plain dicts and None ignore counters"""
+    if isinstance(timings, StageTimings):
+        timings.count(name, n)
+
+def timed_downloader(downloader, timings):
+    """Wrap a downloader so every call counts towards the 'download' stage
+    
+    Concurrent calls are summed, so the stage can exceed the wall time of
+    the fetch.
+    """
+    if timings is None:
+        return downloader
+    
+    def download(symbols, start, end, interval):
+        count(timings, 'download_calls')
+        with timed(timings, 'download'):
+            return downloader(symbols, start, end, interval)
+    return download
@@ -0,0 +1,239 @@
+"""Downloading and cleaning OHLCV bars from Yahoo Finance"""
+import contextlib
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+import yfinance as yf
+
+from .config import MIN_BARS, TIMEFRAME_RULES
+from .diagnostics import timed
+from .timeframes import resample_frames
+
+logger = logging.getLogger(__name__)
+
+def clean_bars(data):
+    """Fill gaps in downloaded or resampled bars; None when fewer than MIN_BARS"""
+    if data is None or len(data) < MIN_BARS:
+        return None
+    
+    # Fill any missing data
+    data = data.ffill().bfill()
+    
+    # Ensure index has no timezone info
+    data.index = data.index.tz_localize(None)
+    return data
+
+def clean_history(data, symbol, timeframe):
+    """Turn downloaded bars into the frame the indicators expect
+
+    Timeframes with a TIMEFRAME_RULES rule (Weekly, Monthly, 2-Hour...) are
+    resampled from their interval's bars; returns None when fewer than
+    MIN_BARS bars are available.
+    """
+    if data is None or data.empty:
+        return None
+    
+    if TIMEFRAME_RULES[timeframe]:
+        data = resample_frames({symbol: data}, timeframe, cache=None)[symbol]
+    return clean_bars(data)
+
+def clean_frames(bars, timeframe, timings=None):
+    """clean_history for many symbols, resampling them together
+
+    Returns ({symbol: frame, None with too few bars}, {symbol: error}).
+    Resampled frames are cached per symbol (timeframes.RESAMPLE_CACHE).
+    """
+    if TIMEFRAME_RULES[timeframe]:
+        try:
+            with timed(timings, 'resample'):
+                bars = resample_frames(bars, timeframe, timings=timings)
+        except Exception as e:
+            return {}, {symbol: str(e) for symbol in bars}
+    
+    frames, errors = {}, {}
+    for symbol, data in bars.items():
+        try:
+            with timed(timings, 'clean', symbol):
+                frames[symbol] = clean_bars(data)
+        except Exception as e:
+            errors[symbol] = str(e)
+    return frames, errors
+
+# Older yfinance releases keep every download's results in module-level
+# dicts (yfinance.shared), so their calls must not overlap; releases with
+# per-call state (multi._DownloadCtx) run side by side without the lock
+_YF_SHARED_STATE = not hasattr(getattr(yf, 'multi', None), '_DownloadCtx')
+_YF_DOWNLOAD_LOCK = threading.Lock()
+
+def yf_download(symbols, start, end, interval):
+    """Download several tickers in one request, columns keyed (symbol, field)
+    
+    yf.download does not raise for tickers it failed on (HTTP 429,
+    timeouts, delistings): it logs them and returns their columns empty,
+    so they look like tickers without bars; ResilientDownloader retries
+    those. Concurrent calls overlap unless the installed yfinance shares
+    state between them, in which case they queue on a lock.
+    """
+    with _YF_DOWNLOAD_LOCK if _YF_SHARED_STATE else contextlib.nullcontext():
+        return yf.download(
+            list(symbols),
+            start=start,
+            end=end,
+            interval=interval,
+            auto_adjust=True,
+            group_by='ticker',
+            ignore_tz=True,
+            threads=True,
+            progress=False
+        )
+
+class TokenBucket:
+    """Thread-safe token bucket allowing ``rate`` requests per second on average"""
+    
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+def _call_with_timeout(func, args, timeout):
+    if timeout is None:
+        return func(*args)
+    
+    outcome = {}
+    def target():
+        try:
+            outcome['value'] = func(*args)
+        except Exception as e:
+            outcome['error'] = e
+    
+    # A hung request cannot be cancelled; its thread is left to finish on its own
+    worker = threading.Thread(target=target, daemon=True)
+    worker.start()
+    worker.join(timeout)
+    if worker.is_alive():
+        raise TimeoutError(f"request timed out after {timeout}s")
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome['value']
+
+class ResilientDownloader:
+    """Wrap a downloader with rate limiting, per-request timeouts and retries
+
+    Keeps the ``downloader(symbols, start, end, interval)`` contract. Failed
+    calls (e.g. a timeout or connection error) are retried with exponential
+    backoff and full jitter, and so are the tickers a call came back
+    without, since yf.download reports throttled tickers (HTTP 429) only
+    as empty columns. Tickers still without bars after the last retry are
+    left out of the result; every attempt first takes a token from the
+    shared limiter.
+    """
+    
+    def __init__(self, downloader=yf_download, limiter=None, retries=3, backoff=1.0,
+                 timeout=30.0, sleep=time.sleep):
+        self.downloader = downloader
+        self.limiter = limiter
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.sleep = sleep
+    
+    def __call__(self, symbols, start, end, interval):
+        pending = list(symbols)
+        bars = {}
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.sleep(random.uniform(0, self.backoff * 2 ** (attempt - 1)))
+            if self.limiter is not None:
+                self.limiter.acquire()
+            try:
+                raw = _call_with_timeout(self.downloader, (pending, start, end, interval), self.timeout)
+            except Exception:
+                if attempt == self.retries and not bars:
+                    raise
+                continue
+            downloaded, missing = _split_batch(raw, pending)
+            bars.update(downloaded)
+            pending = list(missing)
+            if not pending:
+                break
+        return pd.concat(bars, axis=1) if bars else pd.DataFrame()
+
+def _split_batch(raw, batch):
+    bars = {}
+    failures = {}
+    for symbol in batch:
+        if isinstance(raw.columns, pd.MultiIndex):
+            if symbol not in raw.columns.get_level_values(0):
+                failures[symbol] = "no data"
+                continue
+            data = raw[symbol]
+        elif len(batch) == 1:
+            data = raw
+        else:
+            failures[symbol] = "no data"
+            continue
+        
+        # Rows other tickers traded but this one did not are all NaN
+        data = data.dropna(how='all')
+        if data.empty:
+            failures[symbol] = "no data"
+        else:
+            bars[symbol] = data
+    return bars, failures
+
+def iter_download_bars(symbols, interval, start, end, downloader=yf_download, batch_size=50, max_workers=1):
+    """Download batches concurrently and yield (bars, failures) as each completes
+
+    At most ``max_workers`` downloader calls run at once; a failing batch
+    only marks its own symbols as failed.
+    """
+    symbols = list(symbols)
+    batches = [symbols[i:i + batch_size] for i in range(0, len(symbols), batch_size)]
+    if not batches:
+        return
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(batches)))) as pool:
+        futures = {pool.submit(downloader, batch, start, end, interval): batch for batch in batches}
+        for future in as_completed(futures):
+            batch = futures[future]
+            try:
+                raw = future.result()
+            except Exception as e:
+                yield {}, {symbol: f"download failed: {str(e)}" for symbol in batch}
+                continue
+            yield _split_batch(raw, batch)
+
+def download_bars(symbols, interval, start, end, downloader=yf_download, batch_size=50, max_workers=1):
+    """Download raw bars for many symbols with one request per batch
+
+    ``downloader(symbols, start, end, interval)`` must return a frame whose
+    columns are keyed (symbol, field) like ``yf.download(group_by='ticker')``;
+    pass a local stand-in to run without the network. Returns a dict of
+    uncleaned OHLCV frames and a dict of per-symbol failure reasons.
+    """
+    bars = {}
+    failures = {}
+    for batch_bars, batch_failures in iter_download_bars(
+        symbols, interval, start, end, downloader, batch_size, max_workers
+    ):
+        bars.update(batch_bars)
+        failures.update(batch_failures)
+    return bars, failures
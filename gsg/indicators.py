@@ -0,0 +1,215 @@
+"""DMI and MACD indicators replicating TradingView, per symbol and batched"""
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+def rma(series, length):
+    """Replicate TradingView's ta.rma function exactly
+    
+    Bars before the first valid value are 0.0 and NaN bars carry the
+    previous value forward, which is what ``ewm(ignore_na=True)`` does.
+    """
+    alpha = 1.0 / length
+    series = series.astype(float)
+    result = series.ewm(alpha=alpha, adjust=False, ignore_na=True).mean()
+    
+    # Leading bars (and all-NaN input) stay at zero like the original loop
+    return result.fillna(0.0)
+
+def calculate_dmi(df, length=14, smoothing=14):
+    try:
+        df = df.copy()
+        
+        # Calculate directional movement exactly like TradingView
+        up = df['High'] - df['High'].shift(1)  # ta.change(high)
+        down = -(df['Low'] - df['Low'].shift(1))  # -ta.change(low)
+        
+        # Calculate DM exactly like TradingView
+        plus_dm = pd.Series(0.0, index=df.index)
+        minus_dm = pd.Series(0.0, index=df.index)
+        
+        plus_dm[(up > down) & (up > 0)] = up
+        minus_dm[(down > up) & (down > 0)] = down
+        
+        # Calculate True Range
+        tr = pd.DataFrame({
+            'hl': df['High'] - df['Low'],
+            'hc': abs(df['High'] - df['Close'].shift(1)),
+            'lc': abs(df['Low'] - df['Close'].shift(1))
+        }).max(axis=1)
+        
+        # Use RMA for smoothing
+        tr_rma = rma(tr, length)
+        plus_di = 100 * rma(plus_dm, length) / tr_rma
+        minus_di = 100 * rma(minus_dm, length) / tr_rma
+        
+        # Calculate ADX
+        dx = 100 * abs(plus_di - minus_di) / (plus_di + minus_di).replace(0, 1)
+        adx = rma(dx, smoothing)
+        
+        return plus_di, minus_di, adx
+    
+    except Exception as e:
+        logger.error(f"Error in DMI calculation: {str(e)}")
+        return None, None, None
+
+def pine_ema(series, length, alpha_adj=19):
+    """Replicate TradingView's pine_ema function exactly
+    
+    sum := na(sum[1]) ? src : alpha * src + (1 - alpha) * nz(sum[1])
+    
+    A NaN source bar yields NaN and the next bar re-seeds the recursion,
+    so every unbroken run of values is smoothed independently.
+    """
+    alpha = 2.0 / (length + alpha_adj)
+    values = series.to_numpy(dtype=float)
+    result = np.full(len(values), np.nan)
+    
+    valid = ~np.isnan(values)
+    starts = np.flatnonzero(valid & ~np.r_[False, valid[:-1]])
+    ends = np.flatnonzero(valid & ~np.r_[valid[1:], False]) + 1
+    for start, end in zip(starts, ends):
+        run = pd.Series(values[start:end])
+        result[start:end] = run.ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    
+    return pd.Series(result, index=series.index)
+
+def calculate_macd(df, fast_length=12, slow_length=26, signal_length=9, alpha_adj=19):
+    try:
+        # Use Close price
+        close = df['Close'].copy()
+        
+        # Calculate MACD using pine_ema exactly like TradingView
+        fast_ma = pine_ema(close, fast_length, alpha_adj)
+        slow_ma = pine_ema(close, slow_length, alpha_adj)
+        macd = fast_ma - slow_ma
+        signal = pine_ema(macd, signal_length, alpha_adj)
+        
+        return macd, signal
+    
+    except Exception as e:
+        logger.error(f"Error in MACD calculation: {str(e)}")
+        return None, None
+
+def align_ohlc(frames):
+    """Align per-symbol OHLC frames into (bars x symbols) matrices
+    
+    Symbols without data are dropped; bars a symbol did not trade are NaN.
+    """
+    frames = {symbol: df for symbol, df in frames.items() if df is not None and not df.empty}
+    columns = ['Open', 'High', 'Low', 'Close', 'Volume']
+    if not frames:
+        return {col: pd.DataFrame() for col in columns}
+    
+    # Build the union index once and scatter each symbol's bars into it
+    index = frames[next(iter(frames))].index
+    for df in frames.values():
+        if not df.index.equals(index):
+            index = index.union(df.index)
+    values = np.full((len(columns), len(index), len(frames)), np.nan)
+    for i, df in enumerate(frames.values()):
+        values[:, index.get_indexer(df.index), i] = df[columns].to_numpy(dtype=float).T
+    return {
+        col: pd.DataFrame(values[j], index=index, columns=list(frames))
+        for j, col in enumerate(columns)
+    }
+
+def _pack_bars(values, valid):
+    """Right-align each column's valid bars so every column ends on the last row
+    
+    Returns the packed matrix and the (rows, cols, packed_rows) mapping used
+    to scatter results back onto the aligned index.
+    """
+    n_bars = values.shape[0]
+    counts = valid.sum(axis=0)
+    packed_row = np.cumsum(valid, axis=0) - 1 + (n_bars - counts)
+    rows, cols = np.nonzero(valid)
+    packed = np.full(values.shape, np.nan)
+    packed[packed_row[rows, cols], cols] = values[rows, cols]
+    return packed, (rows, cols, packed_row[rows, cols])
+
+def packed_ohlc(high, low, close):
+    """Right-aligned High/Low/Close frames of aligned (bars x symbols) frames
+    
+    Returns ({'High', 'Low', 'Close'} packed frames, mapping) where the
+    mapping scatters packed results back with unpack_bars.
+    """
+    valid = close.notna().to_numpy()
+    mapping = None
+    packed = {}
+    for name, frame in [('High', high), ('Low', low), ('Close', close)]:
+        values, mapping = _pack_bars(frame.reindex_like(close).to_numpy(dtype=float), valid)
+        packed[name] = pd.DataFrame(values, columns=close.columns)
+    return packed, mapping
+
+def unpack_bars(frame, mapping, like):
+    """Scatter a packed frame back onto the index and columns of ``like``"""
+    rows, cols, packed_rows = mapping
+    values = np.full(like.shape, np.nan)
+    values[rows, cols] = frame.to_numpy()[packed_rows, cols]
+    return pd.DataFrame(values, index=like.index, columns=like.columns)
+
+def directional_movement(h, l, c):
+    """+DM, -DM and true range of packed bars, shared by every DMI length
+    
+    Matches calculate_dmi; padding rows stay NaN.
+    """
+    is_bar = c.notna()
+    up = h - h.shift(1)
+    down = -(l - l.shift(1))
+    plus_dm = pd.DataFrame(np.where((up > down) & (up > 0), up, 0.0), columns=c.columns)
+    minus_dm = pd.DataFrame(np.where((down > up) & (down > 0), down, 0.0), columns=c.columns)
+    plus_dm = plus_dm.where(is_bar)
+    minus_dm = minus_dm.where(is_bar)
+    
+    tr = np.fmax(h - l, np.fmax((h - c.shift(1)).abs(), (l - c.shift(1)).abs()))
+    return plus_dm, minus_dm, tr
+
+def directional_index(plus_dm, minus_dm, tr, length=14):
+    """+DI, -DI and DX for one DMI length; ADX is rma(dx, smoothing)"""
+    tr_rma = rma(tr, length)
+    plus_di = 100 * rma(plus_dm, length) / tr_rma
+    minus_di = 100 * rma(minus_dm, length) / tr_rma
+    dx = 100 * (plus_di - minus_di).abs() / (plus_di + minus_di).replace(0, 1)
+    return plus_di, minus_di, dx
+
+def batch_ema(frame, length, alpha_adj=19):
+    """pine_ema of every column of a packed frame
+    
+    Padding only ever leads a column, so a plain EMA seeds like pine_ema.
+    """
+    return frame.ewm(alpha=2.0 / (length + alpha_adj), adjust=False).mean()
+
+def calculate_indicators_batch(high, low, close, length=14, smoothing=14,
+                               fast_length=12, slow_length=26, signal_length=9, alpha_adj=19):
+    """Compute DMI and MACD for every column of aligned (bars x symbols) frames
+    
+    Each symbol is evaluated on its own bars only (rows where its Close is
+    NaN are skipped), so ragged histories seed from their first valid bar and
+    the results match calculate_dmi/calculate_macd run per symbol.
+    Returns a dict of frames aligned to ``close``.
+    """
+    try:
+        packed, mapping = packed_ohlc(high, low, close)
+        h, l, c = packed['High'], packed['Low'], packed['Close']
+        
+        plus_di, minus_di, dx = directional_index(*directional_movement(h, l, c), length)
+        adx = rma(dx, smoothing)
+        
+        macd = batch_ema(c, fast_length, alpha_adj) - batch_ema(c, slow_length, alpha_adj)
+        signal = batch_ema(macd, signal_length, alpha_adj)
+        
+        results = {
+            name: unpack_bars(frame, mapping, close)
+            for name, frame in [('plus_di', plus_di), ('minus_di', minus_di), ('adx', adx),
+                                ('macd', macd), ('signal', signal)]
+        }
+        results['valid'] = close.notna()
+        return results
+    
+    except Exception as e:
+        logger.error(f"Error in batch indicator calculation: {str(e)}")
+        return None
@@ -0,0 +1,267 @@
+"""Live bar streaming: in-progress bars folded into each symbol's states as they arrive"""
+import time
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from .config import HISTORY_WINDOWS, SCAN_TIMEFRAMES, TIMEFRAME_NAMES, TIMEFRAME_RULES, TIMEFRAMES
+from .diagnostics import count
+from .scanner import SIGNAL_TYPES, ScanResult
+from .states import calculate_total_trend, check_dmi_signals, check_trend_signals
+from .streaming import IndicatorStream
+from .timeframes import bucket_label, resample_frames
+
+class BarUpdate(NamedTuple):
+    """The latest state of one symbol's still-open Hourly bar
+    
+    A source sends a bar again with the same timestamp each time it
+    changes; its high and low are the running extremes of the bar so far.
+    """
+    symbol: str
+    timestamp: pd.Timestamp
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+
+def bar_label(timeframe, timestamp, symbol=""):
+    """Timestamp of the bar an Hourly bar belongs to, as fetch labels them
+    
+    Daily bars are labelled with their day, and resampled timeframes as
+    timeframes.resample_frames labels them: Weekly bars with the Friday
+    that ends the week, 2-Hour bars with the start of their session slot.
+    """
+    code = TIMEFRAME_NAMES[timeframe]
+    if HISTORY_WINDOWS[code][0] == "1d":
+        timestamp = timestamp.normalize()
+    return bucket_label(timestamp, code, symbol)
+
+class ReplaySource:
+    """Stored Hourly bars played back as BarUpdates, oldest first across symbols
+    
+    Stands in for a live feed. Each bar is sent as ``steps`` updates of the
+    open bar whose close walks from the open to the final close, the last
+    one being the stored bar; bars without a close are skipped. ``speed`` is how many bar times (all symbols'
+    bars at one timestamp) are played per second; None plays them as fast
+    as they are consumed.
+    """
+    
+    def __init__(self, frames, steps=1, speed=None, clock=time.monotonic, sleep=time.sleep):
+        self.steps = steps
+        self.speed = speed
+        self.clock = clock
+        self.sleep = sleep
+        
+        parts = [frame[['Open', 'High', 'Low', 'Close', 'Volume']].dropna(subset=['Close']).assign(symbol=symbol)
+                 for symbol, frame in frames.items() if frame is not None and len(frame)]
+        bars = pd.concat(parts) if parts else pd.DataFrame(columns=['Open', 'High', 'Low', 'Close', 'Volume', 'symbol'])
+        order = np.argsort(bars.index.to_numpy(), kind='stable')
+        self._times = bars.index.to_numpy()[order]
+        self._symbols = bars['symbol'].to_numpy()[order]
+        self._prices = bars[['Open', 'High', 'Low', 'Close', 'Volume']].to_numpy(dtype=float)[order]
+    
+    def __len__(self):
+        return len(self._times) * self.steps
+    
+    def __iter__(self):
+        start = self.clock()
+        bar_times = 0
+        for i, value in enumerate(self._times):
+            if i == 0 or value != self._times[i - 1]:
+                timestamp = pd.Timestamp(value)
+                if self.speed:
+                    # Hold each bar time back until its turn
+                    delay = start + bar_times / self.speed - self.clock()
+                    if delay > 0:
+                        self.sleep(delay)
+                bar_times += 1
+            yield from self._bar_steps(self._symbols[i], timestamp, *self._prices[i])
+    
+    def _bar_steps(self, symbol, timestamp, open_, high, low, close, volume):
+        open_ = close if np.isnan(open_) else open_
+        for step in range(1, self.steps):
+            fraction = step / self.steps
+            price = open_ + (close - open_) * fraction
+            yield BarUpdate(symbol, timestamp, open_, max(open_, price), min(open_, price), price,
+                            volume * fraction)
+        yield BarUpdate(symbol, timestamp, open_, high, low, close, volume)
+
+def replay_split(data, days):
+    """Hold back the last ``days`` trading days of Hourly bars to replay over the rest
+    
+    Returns (history, replay): ``history`` is ``data`` ({timeframe name:
+    {symbol: frame}}) as it stood before each symbol's first replayed day,
+    with the bar of a resampled timeframe (Weekly, Monthly...) still open
+    then rebuilt from the Daily or Hourly bars before it, and ``replay``
+    the held back {symbol: Hourly frame} for a ReplaySource.
+    """
+    history = {tf_name: {} for tf_name in data}
+    replay = {}
+    # The timeframe each interval's download is kept as (Daily, Hourly)
+    native = {HISTORY_WINDOWS[code][0]: tf_name for tf_name, code in TIMEFRAME_NAMES.items()
+              if TIMEFRAME_RULES[code] is None}
+    for symbol, hourly in data.get("Hourly", {}).items():
+        replay_days = hourly.index.normalize().unique()[-days:]
+        if len(replay_days) == 0:
+            continue
+        start = replay_days[0]
+        replay[symbol] = hourly[hourly.index >= start]
+        resampled = []
+        for tf_name, frames in data.items():
+            frame = frames.get(symbol)
+            if frame is None:
+                continue
+            if TIMEFRAME_RULES[TIMEFRAME_NAMES[tf_name]] is None:
+                history[tf_name][symbol] = frame[frame.index < start]
+            else:
+                resampled.append((tf_name, frame))
+        for tf_name, frame in resampled:
+            code = TIMEFRAME_NAMES[tf_name]
+            label = bar_label(tf_name, start, symbol)
+            frame = frame[frame.index < label]
+            base = history.get(native[HISTORY_WINDOWS[code][0]], {}).get(symbol)
+            if base is not None and len(base):
+                open_bar = resample_frames({symbol: base}, code, cache=None)[symbol]
+                open_bar = open_bar[open_bar.index >= label].dropna(subset=['Close'])
+                if len(open_bar):
+                    frame = pd.concat([frame, open_bar.set_axis(open_bar.index.as_unit(frame.index.unit))])
+            history[tf_name][symbol] = frame
+    for tf_name, frames in data.items():
+        for symbol, frame in frames.items():
+            if symbol not in replay:
+                history[tf_name][symbol] = frame
+    return history, replay
+
+def _count_updates(timings, updates, seconds):
+    # Updates applied between two flushes and the time spent applying them
+    count(timings, 'live_updates', updates)
+    if timings is not None:
+        timings.add('live_apply', seconds)
+
+class LiveScanner:
+    """Each symbol's Get/Set/Go states and signals kept current from BarUpdates
+    
+    An update revises the open Hourly bar and the bar of every other
+    timeframe it falls in, stepping only that symbol's IndicatorStreams. Signals
+    compare against the symbol's states when its previous Hourly bar
+    closed, as an hourly scan compares against the scan before it.
+    """
+    
+    def __init__(self, data, symbols, timeframes=SCAN_TIMEFRAMES):
+        self.symbols = list(symbols)
+        self.timeframes = list(timeframes)
+        self._streams = {}
+        self._bars = {}  # (symbol, timeframe) -> [label, high, low] of the open bar
+        self.analyses = {}
+        self.total_trends = {}
+        self.last_update_times = {}
+        for symbol in self.symbols:
+            for tf_name in self.timeframes:
+                frame = data.get(tf_name, {}).get(symbol)
+                if frame is None or frame.empty:
+                    continue
+                self._streams[(symbol, tf_name)] = IndicatorStream.from_history(frame)
+                self._bars[(symbol, tf_name)] = [frame.index[-1], frame['High'].iloc[-1], frame['Low'].iloc[-1]]
+                self.last_update_times[tf_name] = max(self.last_update_times.get(tf_name, frame.index[-1]),
+                                                      frame.index[-1])
+            self._analyse(symbol)
+        self._last_states = dict(self.analyses)
+        self.signals = {signal_type: set() for signal_type in SIGNAL_TYPES}
+    
+    def _analyse(self, symbol):
+        # The symbol's states from its streams; True when a shown value changed
+        results = {}
+        for tf_name in self.timeframes:
+            stream = self._streams.get((symbol, tf_name))
+            result = stream.result() if stream is not None else None
+            if result is not None:
+                results[tf_name] = result
+        before = self.analyses.get(symbol, {})
+        self.analyses[symbol] = results
+        if all(tf_name in results for tf_name in TIMEFRAMES):
+            self.total_trends[symbol] = calculate_total_trend(
+                results['Weekly'].total, results['Daily'].total, results['Hourly'].total
+            )
+        else:
+            self.total_trends.pop(symbol, None)
+        return before.keys() != results.keys() or any(
+            before[tf_name] != result for tf_name, result in results.items()
+        )
+    
+    def apply(self, update):
+        """Fold one BarUpdate in; returns whether the symbol's row or signals changed"""
+        symbol = update.symbol
+        if symbol not in self.analyses:
+            return False
+        timestamp = pd.Timestamp(update.timestamp)
+        hourly = self._bars.get((symbol, "Hourly"))
+        if hourly is not None and timestamp > hourly[0]:
+            # A new Hourly bar: the closed one is what signals compare against
+            self._last_states[symbol] = self.analyses.get(symbol, {})
+        
+        for tf_name in self.timeframes:
+            stream = self._streams.get((symbol, tf_name))
+            if stream is None:
+                continue
+            label = bar_label(tf_name, timestamp, symbol)
+            bar = self._bars[(symbol, tf_name)]
+            if label == bar[0]:
+                bar[1], bar[2] = np.fmax(bar[1], update.high), np.fmin(bar[2], update.low)
+            else:
+                bar[:] = [label, update.high, update.low]
+            stream.update(label, bar[1], bar[2], update.close)
+            if label > self.last_update_times.get(tf_name, label):
+                self.last_update_times[tf_name] = label
+        
+        changed = self._analyse(symbol)
+        last = self._last_states.get(symbol, {})
+        current = self.analyses[symbol]
+        fired = check_dmi_signals(symbol, current, last) + check_trend_signals(symbol, current, last)
+        for signal_type, on in zip(SIGNAL_TYPES, fired):
+            if on != (symbol in self.signals[signal_type]):
+                changed = True
+                (self.signals[signal_type].add if on else self.signals[signal_type].discard)(symbol)
+        return changed
+    
+    def run(self, source, interval=0.5, timings=None):
+        """Apply a source's updates, yielding the symbols that changed every ``interval`` seconds
+        
+        Each yielded set covers the updates since the previous one; the last
+        is yielded when the source runs out, even if empty.
+        """
+        changed = set()
+        updates, busy = 0, 0.0
+        flushed = time.perf_counter()
+        for update in source:
+            start = time.perf_counter()
+            if self.apply(update):
+                changed.add(update.symbol)
+            updates += 1
+            now = time.perf_counter()
+            busy += now - start
+            if now - flushed >= interval:
+                _count_updates(timings, updates, busy)
+                yield changed
+                changed, updates, busy = set(), 0, 0.0
+                flushed = time.perf_counter()
+        _count_updates(timings, updates, busy)
+        yield changed
+    
+    def scan(self, symbols=None):
+        """ScanResult of the current states, for ``symbols`` or every symbol"""
+        if symbols is not None:
+            wanted = set(symbols)
+            symbols = [symbol for symbol in self.symbols if symbol in wanted]
+        else:
+            symbols = self.symbols
+        return ScanResult(
+            symbols,
+            {symbol: self.analyses.get(symbol, {}) for symbol in symbols},
+            {symbol: self.total_trends[symbol] for symbol in symbols if symbol in self.total_trends},
+            {signal_type: [symbol for symbol in symbols if symbol in fired]
+             for signal_type, fired in self.signals.items()},
+            dict(self.last_update_times),
+            {}
+        )
@@ -0,0 +1,77 @@
+"""History windows sized by how fast the indicator recursions forget their first bars"""
+import math
+
+from .config import HISTORY_WINDOWS, LOOKBACK_MARGIN, LOOKBACK_TOLERANCE, TIMEFRAMES
+
+# Bars each timeframe gets per calendar day, on the sparsest sessions: Hong
+# Kong's six hourly bars a day (four 2-hour and two 4-hour session slots),
+# about 250 trading days a year, and weekly and monthly bars resampled from
+# daily ones
+BARS_PER_DAY = {
+    "1h": 6 * 250 / 365,
+    "2h": 4 * 250 / 365,
+    "4h": 2 * 250 / 365,
+    "1d": 250 / 365,
+    "1wk": 1 / 7,
+    "1mo": 12 / 365
+}
+
+def seed_bars(alpha, tolerance=LOOKBACK_TOLERANCE):
+    """Bars after which an rma/pine_ema recursion's seed weighs less than ``tolerance``
+    
+    Both start from their first value and keep (1 - alpha) of it per bar.
+    """
+    return math.ceil(math.log(tolerance) / math.log(1 - alpha))
+
+def converged_bars(tolerance=LOOKBACK_TOLERANCE, length=14, smoothing=14, fast_length=12,
+                   slow_length=26, signal_length=9, alpha_adj=19):
+    """Bars of history after which Get, Set and Go no longer depend on where it starts
+    
+    Chained recursions add up: ADX smooths DX built from the smoothed DIs,
+    and the signal line smooths the MACD of two EMAs. One more bar gives the
+    previous state the classification compares against.
+    """
+    dmi = seed_bars(1.0 / length, tolerance) + seed_bars(1.0 / smoothing, tolerance)
+    macd = (max(seed_bars(2.0 / (fast_length + alpha_adj), tolerance),
+                seed_bars(2.0 / (slow_length + alpha_adj), tolerance))
+            + seed_bars(2.0 / (signal_length + alpha_adj), tolerance))
+    return max(dmi, macd) + 1
+
+def adaptive_windows(tolerance=LOOKBACK_TOLERANCE, margin=LOOKBACK_MARGIN, **parameters):
+    """HISTORY_WINDOWS holding converged_bars plus a ``margin`` share more, per timeframe
+    
+    Only the TIMEFRAMES converge: the other timeframes share their
+    interval's download and are capped at its longest TIMEFRAMES window
+    (Monthly would otherwise take 17 years of daily bars), keeping at least
+    their HISTORY_WINDOWS days. ``parameters`` are the indicator settings
+    converged_bars takes.
+    """
+    bars = converged_bars(tolerance, **parameters) * (1 + margin)
+    windows = {
+        timeframe: (interval, math.ceil(bars / BARS_PER_DAY[timeframe]))
+        for timeframe, (interval, _) in HISTORY_WINDOWS.items()
+    }
+    longest = {}
+    for timeframe in TIMEFRAMES.values():
+        interval, days = windows[timeframe]
+        longest[interval] = max(longest.get(interval, 0), days)
+    for timeframe, (interval, days) in HISTORY_WINDOWS.items():
+        if timeframe not in TIMEFRAMES.values():
+            windows[timeframe] = (interval, max(days, min(windows[timeframe][1], longest[interval])))
+    return windows
+
+def short_histories(data, bars, timeframes=TIMEFRAMES):
+    """Symbols with a frame of fewer than ``bars`` bars, whose states may not have converged
+    
+    ``data`` maps timeframe name to {symbol: frame}; only the ``timeframes``
+    adaptive_windows sizes to converge are checked. Returns {symbol:
+    ["Hourly: 120 of 166 bars", ...]} like a scan's failures.
+    """
+    short = {}
+    for tf_name, frames in data.items():
+        if tf_name not in timeframes:
+            continue
+        for symbol, frame in frames.items():
+            if frame is not None and len(frame) < bars:
+                short.setdefault(symbol, []).append(f"{tf_name}: {len(frame)} of {bars} bars")
+    return short
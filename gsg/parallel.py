@@ -0,0 +1,87 @@
+"""Process-pool analysis stage for universes too large for one core"""
+import math
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .states import AnalysisResult, analyze_symbol
+
+PRICE_COLUMNS = ['High', 'Low', 'Close']
+
+# Tasks per worker; enough to balance uneven chunks without paying the
+# per-task overhead for every symbol
+TASKS_PER_WORKER = 4
+
+def analysis_pool(max_workers=None):
+    """Process pool for analyze_parallel
+    
+    Workers are spawned rather than forked: the dashboard and the download
+    threads hold locks a forked child could inherit in a locked state.
+    """
+    return ProcessPoolExecutor(max_workers, mp_context=multiprocessing.get_context('spawn'))
+
+def pack_frames(frames, path):
+    """Write the High/Low/Close of every frame into one (3, bars) array at ``path``
+    
+    Returns [(key, start, end)] locating each frame's bars in the array.
+    """
+    frames = [(key, df) for key, df in frames.items() if df is not None]
+    ends = np.cumsum([len(df) for _, df in frames], dtype=np.int64)
+    array = np.lib.format.open_memmap(path, mode='w+', dtype=np.float64,
+                                      shape=(len(PRICE_COLUMNS), int(ends[-1]) if frames else 0))
+    locations = []
+    start = 0
+    for (key, df), end in zip(frames, ends):
+        array[:, start:end] = df[PRICE_COLUMNS].to_numpy(dtype=np.float64).T
+        locations.append((key, start, int(end)))
+        start = int(end)
+    array.flush()
+    del array
+    return locations
+
+def _analyze_chunk(path, locations):
+    # Runs in a worker: map the shared array and return compact records
+    array = np.load(path, mmap_mode='r')
+    records = []
+    for key, start, end in locations:
+        data = pd.DataFrame(array[:, start:end].T, columns=PRICE_COLUMNS)
+        result = analyze_symbol(data)
+        records.append((key, tuple(result) if result else None))
+    return records
+
+def analyze_parallel(frames, pool, chunk_size=None):
+    """Run analyze_symbol over many frames on a process pool
+    
+    ``frames`` maps any key (e.g. (symbol, timeframe)) to an OHLC frame. The
+    bars are written once to a memory-mapped file that workers read without
+    unpickling DataFrames, keys are sent in chunks, and each worker returns
+    only the score fields. Results come back in ``frames`` order as
+    AnalysisResults; frames that could not be analysed are left out.
+    """
+    if not frames:
+        return {}
+    
+    # /dev/shm keeps the "file" in memory where available
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else None
+    fd, path = tempfile.mkstemp(suffix='.npy', prefix='gsg-bars-', dir=directory)
+    os.close(fd)
+    try:
+        locations = pack_frames(frames, path)
+        if chunk_size is None:
+            chunk_size = max(1, math.ceil(len(locations) / ((os.cpu_count() or 1) * TASKS_PER_WORKER)))
+        chunks = [locations[i:i + chunk_size] for i in range(0, len(locations), chunk_size)]
+        
+        records = {}
+        for chunk_records in pool.map(_analyze_chunk, [path] * len(chunks), chunks):
+            records.update(chunk_records)
+    finally:
+        os.remove(path)
+    
+    return {
+        key: AnalysisResult(*records[key])
+        for key in frames if records.get(key) is not None
+    }
@@ -0,0 +1,102 @@
+"""Planning the fewest downloads for a set of portfolios and timeframes"""
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from .config import HISTORY_WINDOWS
+from .diagnostics import timed_downloader
+from .fetch import clean_frames, iter_download_bars, yf_download
+from .store import _to_epoch, iter_refresh_bars, load_timeframe
+
+class PlannedFetch(NamedTuple):
+    """One download covering several symbols and the timeframes built from it"""
+    interval: str
+    days: int
+    symbols: tuple
+    timeframes: tuple
+    windows: tuple  # days of history kept for each of the timeframes
+
+def plan_fetches(requests, windows=HISTORY_WINDOWS):
+    """Work out the fewest downloads that cover a set of scan requests
+    
+    ``requests`` is an iterable of (symbols, timeframes) pairs, e.g. one per
+    portfolio. Timeframes sharing a base interval (Weekly and Daily both use
+    daily bars) come from one download over the longest window, and a symbol
+    listed in several portfolios is fetched once. ``windows`` maps each
+    timeframe to its (interval, days of history), e.g. from
+    lookback.adaptive_windows.
+    """
+    needs = {}
+    for symbols, timeframes in requests:
+        for symbol in symbols:
+            for timeframe in timeframes:
+                interval, days = windows[timeframe]
+                need = needs.setdefault((symbol, interval), [0, []])
+                need[0] = max(need[0], days)
+                if timeframe not in need[1]:
+                    need[1].append(timeframe)
+    
+    groups = {}
+    for (symbol, interval), (days, timeframes) in needs.items():
+        group = groups.setdefault((interval, days), [[], []])
+        group[0].append(symbol)
+        group[1].extend(tf for tf in timeframes if tf not in group[1])
+    
+    return [
+        PlannedFetch(interval, days, tuple(symbols), tuple(timeframes),
+                     tuple(windows[tf][1] for tf in timeframes))
+        for (interval, days), (symbols, timeframes) in groups.items()
+    ]
+
+def _window_frames(bars, failures, timeframe, end_date, days, timings=None):
+    # Cut a timeframe's window out of in-memory bars and clean it
+    cutoff = int(_to_epoch([end_date - timedelta(days=days)])[0])
+    cleaned, errors = clean_frames(
+        {symbol: data[_to_epoch(data.index) >= cutoff] for symbol, data in bars.items()}, timeframe, timings
+    )
+    frames, failures = {}, {**failures, **errors}
+    for symbol, data in cleaned.items():
+        if data is None:
+            failures[symbol] = "insufficient data"
+        else:
+            frames[symbol] = data
+    return frames, failures
+
+def iter_execute_plan(plan, store=None, downloader=yf_download, batch_size=50, max_workers=1,
+                      timings=None):
+    """Run planned downloads, yielding (timeframe, frames, failures) per batch
+    
+    Every timeframe is derived from the shared bars as soon as a batch lands,
+    so analysis can start before the slowest download finishes. With a store
+    the bars are refreshed incrementally, otherwise each plan entry is
+    downloaded in full and kept in memory. ``timings`` (see diagnostics)
+    collects download, store, clean and resample times.
+    """
+    downloader = timed_downloader(downloader, timings)
+    for fetch in plan:
+        if store is not None:
+            for done, failures in iter_refresh_bars(
+                fetch.symbols, fetch.interval, fetch.days, store, downloader, batch_size, max_workers,
+                timings
+            ):
+                for tf, days in zip(fetch.timeframes, fetch.windows):
+                    yield (tf, *load_timeframe(done, tf, store, failures, timings, days))
+        else:
+            end_date = datetime.now()
+            for bars, failures in iter_download_bars(
+                fetch.symbols, fetch.interval, end_date - timedelta(days=fetch.days),
+                end_date, downloader, batch_size, max_workers
+            ):
+                for tf, days in zip(fetch.timeframes, fetch.windows):
+                    yield (tf, *_window_frames(bars, failures, tf, end_date, days, timings))
+
+def execute_plan(plan, store=None, downloader=yf_download, batch_size=50, max_workers=1,
+                 timings=None):
+    """Run iter_execute_plan to completion; returns {timeframe: (frames, failures)}"""
+    results = {}
+    for tf, frames, failures in iter_execute_plan(
+        plan, store, downloader, batch_size, max_workers, timings
+    ):
+        tf_frames, tf_failures = results.setdefault(tf, ({}, {}))
+        tf_frames.update(frames)
+        tf_failures.update(failures)
+    return results
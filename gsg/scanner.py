@@ -0,0 +1,356 @@
+"""Headless scan pipeline: fetch -> indicators -> Get/Set/Go -> total trend -> signals"""
+import json
+import logging
+import os
+from typing import NamedTuple
+
+import pandas as pd
+
+from .config import HISTORY_WINDOWS, SCAN_TIMEFRAMES, TIMEFRAMES
+from .diagnostics import StageTimings, count, timed
+from .fetch import yf_download
+from .lookback import short_histories
+from .parallel import analyze_parallel
+from .plan import execute_plan, plan_fetches
+from .states import (AnalysisResult, analyze_frames, calculate_total_trend, check_dmi_signals,
+                     check_trend_signals, total_trend_bounds)
+from .streaming import stream_analysis
+
+logger = logging.getLogger(__name__)
+
+SIGNAL_TYPES = ['get_buy', 'get_sell', 'trend_buy', 'trend_sell']
+
+class ScanResult(NamedTuple):
+    """Everything one portfolio scan produces, keyed by symbol"""
+    symbols: list
+    analyses: dict  # symbol -> {timeframe name: AnalysisResult}
+    total_trends: dict  # symbol -> weighted Total Trend, only when every timeframe has data
+    signals: dict  # signal type -> symbols
+    last_update_times: dict  # timeframe name -> last bar time
+    failures: dict  # symbol -> reasons its data could not be loaded
+
+def split_timeframes(downloaded, timeframes=SCAN_TIMEFRAMES):
+    """Turn execute_plan output into {timeframe name: {symbol: frame}} and failures"""
+    data = {}
+    failures = {}
+    for tf_name, tf_code in timeframes.items():
+        frames, tf_failures = downloaded.get(tf_code, ({}, {}))
+        data[tf_name] = frames
+        for symbol, reason in tf_failures.items():
+            failures.setdefault(symbol, []).append(f"{tf_name}: {reason}")
+    return data, failures
+
+def fetch_timeframes(symbol_lists, timeframes=SCAN_TIMEFRAMES, store=None, downloader=yf_download,
+                     batch_size=50, max_workers=1, timings=None, windows=HISTORY_WINDOWS):
+    """Download every timeframe for several symbol lists through one fetch plan"""
+    plan = plan_fetches([(symbols, list(timeframes.values())) for symbols in symbol_lists], windows)
+    return split_timeframes(
+        execute_plan(plan, store, downloader, batch_size, max_workers, timings), timeframes
+    )
+
+def _analyze_timeframes(symbols, data, timeframes, streams, timings, skip=()):
+    # {(symbol, timeframe name): AnalysisResult} for the frames not in
+    # ``skip``: incrementally when streams are kept, otherwise one batched
+    # pass per timeframe
+    analyses = {}
+    for tf_name in timeframes:
+        tf_frames = data.get(tf_name, {})
+        frames = {
+            symbol: tf_frames[symbol] for symbol in symbols
+            if tf_frames.get(symbol) is not None and (symbol, tf_name) not in skip
+        }
+        if streams is not None:
+            for symbol, frame in frames.items():
+                with timed(timings, 'indicators', symbol):
+                    analyses[(symbol, tf_name)] = stream_analysis(streams, (symbol, tf_name), frame)
+        else:
+            with timed(timings, 'indicators'):
+                analyses.update(
+                    ((symbol, tf_name), result) for symbol, result in analyze_frames(frames).items()
+                )
+    return analyses
+
+def scan_portfolio(symbols, data, last_states=None, streams=None, failures=None, timings=None,
+                   on_symbol=None, pool=None, log=None, precomputed=None, timeframes=SCAN_TIMEFRAMES):
+    """Analyse one portfolio from already fetched frames
+    
+    ``data`` maps timeframe name to {symbol: frame} and ``last_states`` each
+    symbol's {timeframe: AnalysisResult} from the previous scan, which the
+    signal checks compare against. With ``streams`` the indicators are
+    updated incrementally, otherwise a process ``pool`` (see
+    parallel.analysis_pool) analyses every frame up front, or without one
+    each timeframe's frames go through one batched pass (analyze_frames).
+    ``on_symbol(index, symbol)`` is called before each symbol, e.g. to
+    drive a progress bar. With a SignalLog ``log`` the
+    previous states are read from it instead of ``last_states`` and the
+    scan's states and signals are written back. ``precomputed`` maps
+    (symbol, timeframe name) to an AnalysisResult already worked out, e.g.
+    by screen_portfolio, which is used as is. ``timeframes`` are analysed;
+    Total Trend and the signals only need the TIMEFRAMES among them. Stage
+    times go to ``timings``, per symbol when it is a StageTimings.
+    """
+    timings = timings if timings is not None else StageTimings()
+    if log is not None:
+        with timed(timings, 'signal_log'):
+            last_states = log.load_states(symbols)
+    last_states = last_states or {}
+    failures = failures or {}
+    
+    analyses = {}
+    total_trends = {}
+    signals = {signal_type: [] for signal_type in SIGNAL_TYPES}
+    last_update_times = {}
+    
+    precomputed = precomputed or {}
+    if pool is not None and streams is None:
+        with timed(timings, 'indicators'):
+            computed = analyze_parallel({
+                (symbol, tf_name): data[tf_name][symbol]
+                for symbol in symbols for tf_name in timeframes
+                if symbol in data.get(tf_name, {}) and (symbol, tf_name) not in precomputed
+            }, pool)
+    else:
+        computed = _analyze_timeframes(symbols, data, timeframes, streams, timings, precomputed)
+    
+    for i, symbol in enumerate(symbols):
+        if on_symbol is not None:
+            on_symbol(i, symbol)
+        
+        symbol_results = {}
+        for tf_name in timeframes:
+            frame = data.get(tf_name, {}).get(symbol)
+            if frame is None:
+                continue
+            if tf_name not in last_update_times:
+                last_update_times[tf_name] = frame.index[-1]
+            
+            if (symbol, tf_name) in precomputed:
+                analysis = precomputed[(symbol, tf_name)]
+            else:
+                analysis = computed.get((symbol, tf_name))
+            if analysis:
+                symbol_results[tf_name] = analysis
+        analyses[symbol] = symbol_results
+        
+        # Calculate Total Trend after collecting all timeframe data for this symbol
+        with timed(timings, 'total_trend', symbol):
+            if all(tf in symbol_results for tf in TIMEFRAMES):
+                total_trends[symbol] = calculate_total_trend(
+                    symbol_results['Weekly'].total,
+                    symbol_results['Daily'].total,
+                    symbol_results['Hourly'].total
+                )
+        
+        with timed(timings, 'signals', symbol):
+            last_data = last_states.get(symbol, {})
+            dmi_buy, dmi_sell = check_dmi_signals(symbol, symbol_results, last_data)
+            trend_buy, trend_sell = check_trend_signals(symbol, symbol_results, last_data)
+            for signal_type, fired in zip(SIGNAL_TYPES, [dmi_buy, dmi_sell, trend_buy, trend_sell]):
+                if fired:
+                    signals[signal_type].append(symbol)
+    
+    result = ScanResult(
+        list(symbols), analyses, total_trends, signals, last_update_times,
+        {symbol: failures[symbol] for symbol in symbols if symbol in failures}
+    )
+    if log is not None:
+        with timed(timings, 'signal_log'):
+            log.record(result)
+    return result
+
+def screening_timeframes(timeframes=SCAN_TIMEFRAMES):
+    """Split timeframes into (coarse, fine) for a screened scan
+    
+    The fine ones are built from the download of the finest TIMEFRAMES
+    timeframe (Hourly, 2-Hour, 4-Hour) and are only fetched for the
+    symbols screen_portfolio keeps.
+    """
+    fine_interval = HISTORY_WINDOWS[list(TIMEFRAMES.values())[-1]][0]
+    coarse = {name: code for name, code in timeframes.items() if HISTORY_WINDOWS[code][0] != fine_interval}
+    fine = {name: code for name, code in timeframes.items() if HISTORY_WINDOWS[code][0] == fine_interval}
+    return coarse, fine
+
+def screen_portfolio(symbols, data, last_states=None, streams=None, timings=None):
+    """Analyse the coarser timeframes and pick the symbols worth the finest one
+    
+    ``data`` holds every timeframe but the finest (Hourly). A symbol stays a
+    candidate while its Weekly and Daily totals can still give a Buy or Sell
+    Total Trend whatever its Hourly total is (total_trend_bounds), or while
+    its Weekly and Daily Gets agree against a previous Get of the other sign,
+    which a 3 Gets signal needs. The others get no Hourly state, so they
+    cannot give a Total Trend Buy/Sell signal this scan, and the next one
+    has no Hourly total to compare against. Returns ({(symbol, timeframe
+    name): AnalysisResult}, candidates) for scan_portfolio's ``precomputed``.
+    """
+    last_states = last_states or {}
+    coarse = list(TIMEFRAMES)[:-1]
+    analyses = _analyze_timeframes(symbols, data, coarse, streams, timings)
+    candidates = []
+    for symbol in symbols:
+        results = {
+            tf_name: analyses[(symbol, tf_name)] for tf_name in coarse if analyses.get((symbol, tf_name))
+        }
+        # Without every coarse timeframe there is no Total Trend and no 3 Gets
+        if len(results) < len(coarse):
+            continue
+        
+        low, high = total_trend_bounds(*(results[tf_name].total for tf_name in coarse))
+        gets = [results[tf_name].get_score for tf_name in coarse]
+        last = last_states.get(symbol, {})
+        last_gets = [last[tf_name].get_score for tf_name in TIMEFRAMES if tf_name in last]
+        three_gets = (
+            (all(score > 0 for score in gets) and any(score < 0 for score in last_gets))
+            or (all(score < 0 for score in gets) and any(score > 0 for score in last_gets))
+        )
+        if high >= 5 or low <= -5 or three_gets:
+            candidates.append(symbol)
+    return analyses, candidates
+
+def merge_scan_results(scans, symbols=None):
+    """Combine scans of symbol groups into one ScanResult
+    
+    Symbols and signal lists follow ``symbols`` when given (e.g. the
+    portfolio order), otherwise the order of the scans; a symbol in several
+    scans is listed once, with the last scan's analyses. Each timeframe's
+    last update time comes from the first scan that loaded it.
+    """
+    scans = list(scans)
+    scanned = list(dict.fromkeys(symbol for scan in scans for symbol in scan.symbols))
+    scanned_set = set(scanned)
+    order = [symbol for symbol in symbols if symbol in scanned_set] if symbols is not None else scanned
+    position = {symbol: i for i, symbol in enumerate(order)}
+    
+    analyses, total_trends, failures, last_update_times = {}, {}, {}, {}
+    signals = {signal_type: [] for signal_type in SIGNAL_TYPES}
+    for scan in scans:
+        analyses.update(scan.analyses)
+        total_trends.update(scan.total_trends)
+        failures.update(scan.failures)
+        for signal_type in SIGNAL_TYPES:
+            signals[signal_type].extend(scan.signals.get(signal_type, []))
+        for tf_name, last_update in scan.last_update_times.items():
+            last_update_times.setdefault(tf_name, last_update)
+    
+    return ScanResult(
+        order,
+        {symbol: analyses[symbol] for symbol in order if symbol in analyses},
+        {symbol: total_trends[symbol] for symbol in order if symbol in total_trends},
+        {signal_type: sorted({symbol for symbol in fired if symbol in position}, key=position.get)
+         for signal_type, fired in signals.items()},
+        last_update_times,
+        {symbol: failures[symbol] for symbol in order if symbol in failures}
+    )
+
+def run_scan(portfolios, store=None, downloader=yf_download, batch_size=50, max_workers=1,
+             last_states=None, pool=None, log=None, screening=False, windows=HISTORY_WINDOWS,
+             min_bars=None, timeframes=SCAN_TIMEFRAMES):
+    """Fetch and scan several portfolios; returns ({name: ScanResult}, timings)
+    
+    Symbols shared between portfolios are downloaded once, and every
+    portfolio's signals are checked against the states from before the
+    scan. ``last_states`` is updated in place with this scan's states once
+    every portfolio ran; with a SignalLog ``log`` the states are read from
+    it up front and written back, with the signals, once at the end. With
+    ``screening`` the finest timeframe is only fetched for the symbols
+    screen_portfolio keeps; the rest are scanned on the coarser timeframes
+    alone, so they get no Total Trend and cannot signal, and any states of
+    the finer timeframes stored for them are dropped. ``windows`` is
+    the history fetched per timeframe (see plan_fetches); with ``min_bars``,
+    e.g. lookback.converged_bars, symbols with a shorter frame are logged as
+    warnings and counted as 'short_history'. ``timeframes`` are the columns
+    scanned; the resampled ones come from the same downloads.
+    """
+    timings = StageTimings()
+    last_states = last_states if last_states is not None else {}
+    coarse, fine = screening_timeframes(timeframes) if screening else (timeframes, {})
+    with timed(timings, 'fetch'):
+        data, failures = fetch_timeframes(
+            portfolios.values(), coarse, store, downloader, batch_size, max_workers, timings,
+            windows
+        )
+    
+    # Every portfolio compares against the states from before this scan, so a
+    # symbol in several portfolios signals in each of them
+    symbols = list(dict.fromkeys(symbol for symbols in portfolios.values() for symbol in symbols))
+    previous = last_states
+    if log is not None:
+        with timed(timings, 'signal_log'):
+            previous = log.load_states(symbols)
+    
+    precomputed = {}
+    if screening:
+        with timed(timings, 'screening'):
+            precomputed, candidates = screen_portfolio(symbols, data, previous, timings=timings)
+        screened_out = sorted(set(symbols) - set(candidates))
+        count(timings, 'screened_out', len(screened_out))
+        
+        with timed(timings, 'fetch'):
+            fine_data, fine_failures = fetch_timeframes(
+                [candidates], fine, store, downloader, batch_size, max_workers, timings, windows
+            )
+        data.update(fine_data)
+        for symbol, reasons in fine_failures.items():
+            failures.setdefault(symbol, []).extend(reasons)
+    
+    if min_bars:
+        short = short_histories(data, min_bars)
+        count(timings, 'short_history', len(short))
+        for symbol, reasons in short.items():
+            logger.warning(f"{symbol}: too little history for converged states ({'; '.join(reasons)})")
+    
+    results = {
+        name: scan_portfolio(portfolio, data, previous, failures=failures, timings=timings,
+                             pool=pool, precomputed=precomputed, timeframes=timeframes)
+        for name, portfolio in portfolios.items()
+    }
+    if log is not None:
+        with timed(timings, 'signal_log'):
+            if screening:
+                log.forget(screened_out, fine)
+            log.record(merge_scan_results(results.values(), symbols))
+    else:
+        for result in results.values():
+            last_states.update(result.analyses)
+    return results, timings
+
+def results_frame(results, timeframes=SCAN_TIMEFRAMES):
+    """One row per portfolio and symbol with scores, labels and signal flags"""
+    rows = []
+    for portfolio, result in results.items():
+        for symbol in result.symbols:
+            row = {
+                'portfolio': portfolio,
+                'symbol': symbol,
+                'total_trend': result.total_trends.get(symbol)
+            }
+            for signal_type in SIGNAL_TYPES:
+                row[signal_type] = symbol in result.signals[signal_type]
+            for tf_name in timeframes:
+                analysis = result.analyses.get(symbol, {}).get(tf_name)
+                prefix = tf_name.lower()
+                for field in ['get', 'set', 'go']:
+                    row[f'{prefix}_{field}'] = getattr(analysis, f'{field}_score') if analysis else None
+                    row[f'{prefix}_{field}_label'] = getattr(analysis, f'{field}_label') if analysis else None
+                row[f'{prefix}_total'] = analysis.total if analysis else None
+            row['failures'] = '; '.join(result.failures.get(symbol, []))
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+def save_states(states, path):
+    """Persist {symbol: {timeframe: AnalysisResult}} so the next run can detect flips"""
+    payload = {
+        symbol: {tf: list(result) for tf, result in tf_results.items()}
+        for symbol, tf_results in states.items()
+    }
+    with open(path, 'w') as f:
+        json.dump(payload, f)
+
+def load_states(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        payload = json.load(f)
+    return {
+        symbol: {tf: AnalysisResult(*values) for tf, values in tf_results.items()}
+        for symbol, tf_results in payload.items()
+    }
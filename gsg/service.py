@@ -0,0 +1,80 @@
+"""Scans shared by every session in the process, computed once per data version"""
+import threading
+from concurrent.futures import Future
+
+from .diagnostics import count
+
+class ScanService:
+    """Single-flight scan results keyed by portfolio and scan options
+    
+    ``run`` hands back the last result for a key while its data version is
+    unchanged, so reruns that only change the view do not scan again.
+    Requests arriving while the same key is being computed wait for that
+    computation and share its result instead of starting their own. The
+    last result of every key is kept, so results should not hold the
+    frames they were computed from.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._results = {}  # key -> (version, result)
+        self._inflight = {}  # key -> Future of the running computation
+        self._counters = {'scans': 0, 'reused': 0, 'coalesced': 0, 'retried': 0}
+    
+    def run(self, key, version, compute, timings=None, on_wait=None):
+        """Return ``compute()``'s result for ``key``, computing it at most once at a time
+        
+        ``compute()`` returns the result and the version of the data it was
+        computed from; the last result is reused while ``version()`` still
+        equals that version. ``on_wait()``
+        is called before blocking on another caller's computation. If that
+        computation fails or is interrupted, the waiting caller runs it
+        itself. Returns (result, how) with how one of 'scanned', 'reused'
+        or 'coalesced'; counts go to ``timings`` too.
+        """
+        while True:
+            current = version()
+            with self._lock:
+                last = self._results.get(key)
+                if last is not None and last[0] == current:
+                    self._counters['reused'] += 1
+                    count(timings, 'scan_reused')
+                    return last[1], 'reused'
+                future = self._inflight.get(key)
+                leader = future is None
+                if leader:
+                    future = self._inflight[key] = Future()
+                    self._counters['scans'] += 1
+                else:
+                    self._counters['coalesced'] += 1
+            
+            if leader:
+                count(timings, 'scan_computed')
+                try:
+                    result, computed_version = compute()
+                except BaseException as e:
+                    # Streamlit interrupts a rerun with a BaseException too
+                    future.set_exception(e)
+                    raise
+                else:
+                    with self._lock:
+                        self._results[key] = (computed_version, result)
+                    future.set_result(result)
+                    return result, 'scanned'
+                finally:
+                    with self._lock:
+                        del self._inflight[key]
+            
+            count(timings, 'scan_coalesced')
+            if on_wait is not None:
+                on_wait()
+            try:
+                return future.result(), 'coalesced'
+            except BaseException:
+                with self._lock:
+                    self._counters['retried'] += 1
+    
+    def stats(self):
+        """Computed, reused, coalesced and retried request counts"""
+        with self._lock:
+            return {**self._counters, 'results': len(self._results), 'in_flight': len(self._inflight)}
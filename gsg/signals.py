@@ -0,0 +1,155 @@
+"""Persistent signal event log and last known states shared by every scan"""
+import sqlite3
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+from .config import SIGNAL_LOG_PATH, TIMEFRAMES
+from .states import AnalysisResult
+from .store import _to_epoch
+
+class SignalLog:
+    """SQLite log of fired signals plus each symbol's last Get/Set/Go states
+    
+    The states are what the next scan compares against, so signal memory
+    survives restarts and is the same for every dashboard session and CLI
+    run. Events are unique per (symbol, signal, bar), so scans of the same
+    data from several sessions log a flip once.
+    """
+    
+    def __init__(self, path=SIGNAL_LOG_PATH):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS signals (
+                    id INTEGER PRIMARY KEY,
+                    ts INTEGER NOT NULL,
+                    bar_ts INTEGER NOT NULL,
+                    symbol TEXT NOT NULL,
+                    signal TEXT NOT NULL,
+                    total_trend REAL,
+                    UNIQUE (symbol, signal, bar_ts)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS signals_symbol_ts ON signals (symbol, ts)")
+            conn.execute("CREATE INDEX IF NOT EXISTS signals_signal_ts ON signals (signal, ts)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS states (
+                    symbol TEXT NOT NULL,
+                    timeframe TEXT NOT NULL,
+                    get_score INTEGER, get_label TEXT,
+                    set_score INTEGER, set_label TEXT,
+                    go_score INTEGER, go_label TEXT,
+                    total INTEGER,
+                    ts INTEGER NOT NULL,
+                    PRIMARY KEY (symbol, timeframe)
+                ) WITHOUT ROWID
+            """)
+    
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+    
+    def load_states(self, symbols):
+        """Last recorded {symbol: {timeframe: AnalysisResult}} for the symbols"""
+        symbols = list(symbols)
+        states = {}
+        with self._connect() as conn:
+            for i in range(0, len(symbols), 500):
+                chunk = symbols[i:i + 500]
+                rows = conn.execute(
+                    "SELECT symbol, timeframe, get_score, get_label, set_score, set_label, "
+                    "go_score, go_label, total FROM states "
+                    f"WHERE symbol IN ({', '.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+                for symbol, timeframe, *values in rows:
+                    states.setdefault(symbol, {})[timeframe] = AnalysisResult(*values)
+        return states
+    
+    def record(self, scan, now=None):
+        """Store a ScanResult's states and log its signals in one transaction
+        
+        Events are stamped with the scan time and the last bar of the finest
+        timeframe that loaded.
+        """
+        now = int(now if now is not None else time.time())
+        bar_time = next(
+            (scan.last_update_times[tf] for tf in reversed(list(TIMEFRAMES)) if tf in scan.last_update_times),
+            None
+        )
+        bar_ts = int(_to_epoch([bar_time])[0]) if bar_time is not None else now
+        
+        states = [
+            (symbol, tf, *result, now)
+            for symbol, tf_results in scan.analyses.items()
+            for tf, result in tf_results.items()
+        ]
+        events = [
+            (now, bar_ts, symbol, signal_type, scan.total_trends.get(symbol))
+            for signal_type, symbols in scan.signals.items()
+            for symbol in symbols
+        ]
+        with self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO states VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", states)
+            conn.executemany(
+                "INSERT OR IGNORE INTO signals (ts, bar_ts, symbol, signal, total_trend) "
+                "VALUES (?, ?, ?, ?, ?)",
+                events
+            )
+    
+    def forget(self, symbols, timeframes):
+        """Drop the stored states of these timeframes for the symbols
+        
+        For symbols a screened scan skipped on those timeframes, so the next
+        scan does not compare against states left from older scans.
+        """
+        symbols, timeframes = list(symbols), list(timeframes)
+        if not timeframes:
+            return
+        with self._connect() as conn:
+            for i in range(0, len(symbols), 500):
+                chunk = symbols[i:i + 500]
+                conn.execute(
+                    f"DELETE FROM states WHERE symbol IN ({', '.join('?' * len(chunk))}) "
+                    f"AND timeframe IN ({', '.join('?' * len(timeframes))})",
+                    chunk + timeframes
+                )
+    
+    def events(self, symbol=None, signal=None, since=None, limit=200):
+        """Logged signals, newest first; ``since`` is a datetime or epoch seconds"""
+        query = "SELECT ts, bar_ts, symbol, signal, total_trend FROM signals"
+        clauses, params = [], []
+        if symbol is not None:
+            clauses.append("symbol = ?")
+            params.append(symbol)
+        if signal is not None:
+            clauses.append("signal = ?")
+            params.append(signal)
+        if since is not None:
+            if not isinstance(since, (int, float)):
+                since = pd.Timestamp(since).timestamp()
+            clauses.append("ts >= ?")
+            params.append(int(since))
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY ts DESC LIMIT ?"
+        params.append(limit)
+        
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        events = pd.DataFrame(rows, columns=['ts', 'bar_ts', 'symbol', 'signal', 'total_trend'])
+        events['time'] = pd.to_datetime(events.pop('ts'), unit='s')
+        events['bar_time'] = pd.to_datetime(events.pop('bar_ts'), unit='s')
+        return events[['time', 'symbol', 'signal', 'total_trend', 'bar_time']]
+    
+    def last_flip(self, symbol, signal=None):
+        """The most recent logged signal for a symbol as a row, or None"""
+        events = self.events(symbol=symbol, signal=signal, limit=1)
+        return events.iloc[0] if len(events) else None
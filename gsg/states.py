@@ -0,0 +1,402 @@
+"""Get/Set/Go state classification, trend scores and signal checks"""
+import logging
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from .config import TIMEFRAMES
+from .indicators import align_ohlc, calculate_dmi, calculate_indicators_batch, calculate_macd
+
+logger = logging.getLogger(__name__)
+
+def classify_get(prev_plus_di, prev_minus_di, prev_adx, plus_di, minus_di, adx):
+    """Get state from the last two bars of +DI/-DI/ADX"""
+    if prev_plus_di <= prev_minus_di and plus_di > minus_di:
+        return 4, "Bullish++"
+    elif prev_plus_di >= prev_minus_di and plus_di < minus_di:
+        return -4, "Bearish++"
+    elif plus_di > minus_di:
+        if adx > prev_adx:
+            return 4, "Bullish+"
+        else:
+            return 3, "Bullish-"
+    else:
+        if adx > prev_adx:
+            return -4, "Bearish+"
+        else:
+            return -3, "Bearish-"
+
+def _zero_line_state(prev_value, value, prefix):
+    if prev_value <= 0 and value > 0:
+        return 2, f"{prefix} Bullish++"
+    elif prev_value >= 0 and value < 0:
+        return -2, f"{prefix} Bearish++"
+    elif value > 0:
+        if value > prev_value:
+            return 2, "Bullish+"
+        else:
+            return 1, "Bullish-"
+    else:
+        if value < prev_value:
+            return -2, "Bearish+"
+        else:
+            return -1, "Bearish-"
+
+def classify_set(prev_macd, macd):
+    """Set state from the last two MACD values"""
+    return _zero_line_state(prev_macd, macd, "Set")
+
+def classify_go(prev_signal, signal):
+    """Go state from the last two signal line values"""
+    return _zero_line_state(prev_signal, signal, "Go")
+
+def get_state(plus_di, minus_di, adx):
+    if plus_di is None or minus_di is None or adx is None:
+        return 0, "N/A"
+    
+    try:
+        return classify_get(
+            plus_di.iloc[-2], minus_di.iloc[-2], adx.iloc[-2],
+            plus_di.iloc[-1], minus_di.iloc[-1], adx.iloc[-1]
+        )
+    except Exception as e:
+        logger.error(f"Error in get_state: {str(e)}")
+        return 0, "N/A"
+
+def set_state(macd):
+    if macd is None:
+        return 0, "N/A"
+    
+    try:
+        return classify_set(macd.iloc[-2], macd.iloc[-1])
+    except Exception as e:
+        logger.error(f"Error in set_state: {str(e)}")
+        return 0, "N/A"
+
+def go_state(signal):
+    if signal is None:
+        return 0, "N/A"
+    
+    try:
+        return classify_go(signal.iloc[-2], signal.iloc[-1])
+    except Exception as e:
+        logger.error(f"Error in go_state: {str(e)}")
+        return 0, "N/A"
+
+# Vectorized states: the same branches as classify_get/_zero_line_state in
+# order, with the fallback last. Missing values compare False as they do
+# there, so a bar is (0, "N/A") only without a previous bar, like the first
+# bar of a series, or off the bars of an aligned (bars x symbols) frame.
+GET_STATES = [(4, "Bullish++"), (-4, "Bearish++"), (4, "Bullish+"), (3, "Bullish-"),
+              (-4, "Bearish+"), (-3, "Bearish-")]
+
+def _zero_line_states(prefix):
+    return [(2, f"{prefix} Bullish++"), (-2, f"{prefix} Bearish++"), (2, "Bullish+"),
+            (1, "Bullish-"), (-2, "Bearish+"), (-1, "Bearish-")]
+
+def _bar_mask(series, bars):
+    # Every row of a Series is a bar; a frame has one where ``series`` is set
+    # (ADX for Get, which rma keeps defined on every bar) unless told
+    if bars is not None:
+        return np.asarray(bars, dtype=bool)
+    if isinstance(series, pd.Series):
+        return np.ones(len(series), dtype=bool)
+    return series.notna().to_numpy()
+
+def _previous_rows(bars):
+    # Row of each row's previous bar in its column, -1 where there is none
+    rows = np.arange(len(bars)).reshape((-1,) + (1,) * (bars.ndim - 1))
+    last_bar = np.maximum.accumulate(np.where(bars, rows, -1), axis=0)
+    return np.concatenate([np.full((1,) + bars.shape[1:], -1), last_bar[:-1]])
+
+def _previous(values, prev_rows):
+    # Values at the previous bar, so holes in an aligned frame are skipped
+    prev = np.take_along_axis(values, np.maximum(prev_rows, 0), axis=0)
+    return np.where(prev_rows >= 0, prev, np.nan)
+
+def _state_series(conditions, defined, states, like):
+    choice = np.select(conditions, range(len(states) - 1), len(states) - 1)
+    choice = np.where(defined, choice, len(states))
+    scores = np.array([score for score, _ in states] + [0])[choice]
+    labels = np.array([label for _, label in states] + ["N/A"], dtype=object)[choice]
+    if isinstance(like, pd.DataFrame):
+        return (pd.DataFrame(scores, index=like.index, columns=like.columns),
+                pd.DataFrame(labels, index=like.index, columns=like.columns))
+    return pd.Series(scores, index=like.index), pd.Series(labels, index=like.index)
+
+def _state_scores(conditions, defined, states):
+    # Scores alone as floats, NaN where _state_series says "N/A"
+    choice = np.select(conditions, range(len(states) - 1), len(states) - 1)
+    return np.where(defined, np.array([score for score, _ in states], dtype=float)[choice], np.nan)
+
+def _get_conditions(plus_di, minus_di, adx, bars=None):
+    bars = _bar_mask(adx, bars)
+    prev_rows = _previous_rows(bars)
+    values = [s.to_numpy(dtype=float) for s in [plus_di, minus_di, adx]]
+    p, m, a = values
+    pp, pm, pa = [_previous(v, prev_rows) for v in values]
+    with np.errstate(invalid='ignore'):
+        conditions = [
+            (pp <= pm) & (p > m),
+            (pp >= pm) & (p < m),
+            (p > m) & (a > pa),
+            p > m,
+            a > pa
+        ]
+    return conditions, bars & (prev_rows >= 0)
+
+def get_state_series(plus_di, minus_di, adx, bars=None):
+    """Get score and label for every bar of a Series or (bars x symbols) frame
+    
+    Each bar is classified like get_state on the series up to it. ``bars``
+    marks the rows of a frame that hold a bar, by default where ADX is set.
+    """
+    return _state_series(*_get_conditions(plus_di, minus_di, adx, bars), GET_STATES, plus_di)
+
+def _zero_line_conditions(series, bars=None):
+    bars = _bar_mask(series, bars)
+    prev_rows = _previous_rows(bars)
+    value = series.to_numpy(dtype=float)
+    prev = _previous(value, prev_rows)
+    with np.errstate(invalid='ignore'):
+        conditions = [
+            (prev <= 0) & (value > 0),
+            (prev >= 0) & (value < 0),
+            (value > 0) & (value > prev),
+            value > 0,
+            value < prev
+        ]
+    return conditions, bars & (prev_rows >= 0)
+
+def _zero_line_series(series, prefix, bars=None):
+    return _state_series(*_zero_line_conditions(series, bars), _zero_line_states(prefix), series)
+
+def set_state_series(macd, bars=None):
+    """Set score and label for every bar of a Series or (bars x symbols) frame"""
+    return _zero_line_series(macd, "Set", bars)
+
+def go_state_series(signal, bars=None):
+    """Go score and label for every bar of a Series or (bars x symbols) frame"""
+    return _zero_line_series(signal, "Go", bars)
+
+def state_scores(plus_di, minus_di, adx, macd=None, signal=None, bars=None):
+    """Get, Set and Go score arrays without labels, NaN where a state is N/A
+    
+    The scores of get_state_series/set_state_series/go_state_series as
+    floats, for sweeps that need many of them; Set and Go are None when
+    ``macd``/``signal`` are. Pass None for the DMI series to skip Get.
+    """
+    get_scores = None
+    if plus_di is not None:
+        get_scores = _state_scores(*_get_conditions(plus_di, minus_di, adx, bars), GET_STATES)
+    set_scores = go_scores = None
+    if macd is not None:
+        set_scores = _state_scores(*_zero_line_conditions(macd, bars), _zero_line_states(""))
+    if signal is not None:
+        go_scores = _state_scores(*_zero_line_conditions(signal, bars), _zero_line_states(""))
+    return get_scores, set_scores, go_scores
+
+class AnalysisResult(NamedTuple):
+    """Numeric Get/Set/Go states for one symbol and timeframe"""
+    get_score: int
+    get_label: str
+    set_score: int
+    set_label: str
+    go_score: int
+    go_label: str
+    total: int
+
+def score_color(score):
+    return "green" if score > 0 else "red" if score < 0 else "white"
+
+def get_trend(total_score):
+    if total_score >= 5:
+        return f"Buy ({total_score})", "green"
+    elif total_score <= -5:
+        return f"Sell ({total_score})", "red"
+    else:
+        return f"Hold ({total_score})", "gray"
+
+def get_total_trend(weighted_sum):
+    if weighted_sum >= 5:
+        return (f"Buy ({weighted_sum:.1f})", "green")
+    elif weighted_sum <= -5:
+        return (f"Sell ({weighted_sum:.1f})", "red")
+    else:
+        return (f"Hold ({weighted_sum:.1f})", "gray")
+
+def calculate_total_trend(weekly_score, daily_score, hourly_score):
+    """Weighted Total Trend from the per-timeframe Get+Set+Go totals"""
+    return (weekly_score * 2 + daily_score * 2 + hourly_score * 1) / 5
+
+# The largest Get+Set+Go total a timeframe can have: 4 + 2 + 2
+MAX_TIMEFRAME_TOTAL = max(score for score, _ in GET_STATES) + 2 * max(score for score, _ in _zero_line_states(""))
+
+def total_trend_bounds(weekly_score, daily_score):
+    """Lowest and highest Total Trend reachable whatever the Hourly total turns out to be"""
+    return (calculate_total_trend(weekly_score, daily_score, -MAX_TIMEFRAME_TOTAL),
+            calculate_total_trend(weekly_score, daily_score, MAX_TIMEFRAME_TOTAL))
+
+def analysis_cells(result):
+    """Format an AnalysisResult into the (text, color) cells of the table"""
+    if result is None:
+        return {col: ("N/A", "white") for col in ['Get', 'Set', 'Go', 'Trend']}
+    return {
+        "Get": (result.get_label, score_color(result.get_score)),
+        "Set": (result.set_label, score_color(result.set_score)),
+        "Go": (result.go_label, score_color(result.go_score)),
+        "Trend": get_trend(result.total)
+    }
+
+def analyze_indicators(plus_di, minus_di, adx, macd, signal):
+    """Classify already computed indicator series into an AnalysisResult"""
+    get_val, get_str = get_state(plus_di, minus_di, adx)
+    set_val, set_str = set_state(macd)
+    go_val, go_str = go_state(signal)
+    return AnalysisResult(get_val, get_str, set_val, set_str, go_val, go_str, get_val + set_val + go_val)
+
+def symbol_indicators(data):
+    """(plus_di, minus_di, adx, macd, signal) for a frame; None if short or broken"""
+    if data is None or len(data) < 30:
+        return None
+    
+    try:
+        # Calculate indicators
+        plus_di, minus_di, adx = calculate_dmi(data)
+        macd, signal = calculate_macd(data)
+        return plus_di, minus_di, adx, macd, signal
+    except Exception as e:
+        logger.error(f"Error in analysis: {str(e)}")
+        return None
+
+def analyze_symbol(data):
+    indicators = symbol_indicators(data)
+    if indicators is None:
+        return None
+    
+    try:
+        return analyze_indicators(*indicators)
+    except Exception as e:
+        logger.error(f"Error in analysis: {str(e)}")
+        return None
+
+def analyze_frames(frames):
+    """analyze_symbol for many frames of one timeframe, with one batched indicator pass
+    
+    The frames are aligned on their bar times for calculate_indicators_batch
+    and each symbol is classified at its own last bar, so the results equal
+    analyze_symbol's for frames without NaN closes, like the cleaned frames
+    a scan analyses. Returns {symbol: AnalysisResult, None for short or
+    broken data}.
+    """
+    results = {symbol: None for symbol in frames}
+    usable = {symbol: frame for symbol, frame in frames.items() if frame is not None and len(frame) >= 30}
+    if not usable:
+        return results
+    
+    ohlc = align_ohlc(usable)
+    batch = calculate_indicators_batch(ohlc['High'], ohlc['Low'], ohlc['Close'])
+    if batch is None:
+        results.update({symbol: analyze_symbol(frame) for symbol, frame in usable.items()})
+        return results
+    
+    bars = batch['valid'].to_numpy()
+    states = [
+        get_state_series(batch['plus_di'], batch['minus_di'], batch['adx'], bars),
+        set_state_series(batch['macd'], bars),
+        go_state_series(batch['signal'], bars)
+    ]
+    # Row of each symbol's last bar
+    last_rows = len(bars) - 1 - np.argmax(bars[::-1], axis=0)
+    for column, symbol in enumerate(batch['valid'].columns):
+        if not bars[:, column].any():
+            continue
+        (get_val, get_str), (set_val, set_str), (go_val, go_str) = [
+            (int(scores.iat[last_rows[column], column]), labels.iat[last_rows[column], column])
+            for scores, labels in states
+        ]
+        results[symbol] = AnalysisResult(
+            get_val, get_str, set_val, set_str, go_val, go_str, get_val + set_val + go_val
+        )
+    return results
+
+def analyze_history(data):
+    """Get/Set/Go scores and labels for every bar of one symbol's frame
+    
+    Each row matches analyze_symbol run on the bars up to it, flat and gapped
+    series included; returns None for short or broken data.
+    """
+    if data is None or len(data) < 30:
+        return None
+    
+    try:
+        plus_di, minus_di, adx = calculate_dmi(data)
+        macd, signal = calculate_macd(data)
+        get_score, get_label = get_state_series(plus_di, minus_di, adx)
+        set_score, set_label = set_state_series(macd)
+        go_score, go_label = go_state_series(signal)
+        return pd.DataFrame({
+            'get_score': get_score, 'get_label': get_label,
+            'set_score': set_score, 'set_label': set_label,
+            'go_score': go_score, 'go_label': go_label,
+            'total': get_score + set_score + go_score
+        })
+    except Exception as e:
+        logger.error(f"Error in history analysis: {str(e)}")
+        return None
+
+def indicator_frame(data):
+    """OHLCV bars with +DI, -DI, ADX, MACD and Signal over a frame's whole history
+    
+    For inspecting one symbol; returns None for short or broken data.
+    """
+    indicators = symbol_indicators(data)
+    if indicators is None:
+        return None
+    
+    frame = data[['Open', 'High', 'Low', 'Close', 'Volume']].copy()
+    for name, series in zip(['+DI', '-DI', 'ADX', 'MACD', 'Signal'], indicators):
+        frame[name] = series
+    return frame
+
+def check_dmi_signals(symbol, current_data, last_data):
+    """Check for DMI signal conditions
+    
+    Both arguments map timeframe name to AnalysisResult; a positive Get score
+    is a Bullish state and a negative one Bearish.
+    """
+    if not (current_data and last_data):
+        return False, False
+    
+    current = [current_data[tf].get_score if tf in current_data else 0 for tf in TIMEFRAMES]
+    last = [last_data[tf].get_score if tf in last_data else 0 for tf in TIMEFRAMES]
+    
+    # Check for buy signal
+    buy_signal = any(score < 0 for score in last) and all(score > 0 for score in current)
+    
+    # Check for sell signal
+    sell_signal = any(score > 0 for score in last) and all(score < 0 for score in current)
+    
+    return buy_signal, sell_signal
+
+def check_trend_signals(symbol, current_data, last_data):
+    """Check for trend signal conditions
+    
+    A crossing needs the Hourly total of both scans; a missing one (a failed
+    download, or a symbol screened out) is not taken for a neutral total.
+    """
+    if 'Hourly' not in current_data or 'Hourly' not in last_data:
+        return False, False
+    
+    # Get current and last total trends
+    current_value = current_data['Hourly'].total
+    last_value = last_data['Hourly'].total
+    
+    # Check for buy signal
+    buy_signal = last_value < 5 and current_value >= 5
+    
+    # Check for sell signal
+    sell_signal = last_value > -5 and current_value <= -5
+    
+    return buy_signal, sell_signal
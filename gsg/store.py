@@ -0,0 +1,214 @@
+"""Persistent SQLite store of downloaded bars with incremental refresh"""
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from .config import HISTORY_WINDOWS, OHLCV_COLUMNS, STORE_PATH
+from .diagnostics import timed
+from .fetch import clean_frames, iter_download_bars, yf_download
+
+def _to_epoch(index):
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return (index - pd.Timestamp(0)) // pd.Timedelta('1s')
+
+class OHLCVStore:
+    """On-disk SQLite store of downloaded bars keyed by symbol and interval
+    
+    Bars are kept exactly as downloaded (before resampling and cleaning) with
+    tz-naive exchange-local timestamps stored as epoch seconds.
+    """
+    
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS bars (
+                    symbol TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    ts INTEGER NOT NULL,
+                    open REAL, high REAL, low REAL, close REAL, volume REAL,
+                    PRIMARY KEY (symbol, interval, ts)
+                ) WITHOUT ROWID
+            """)
+    
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+    
+    def bounds(self, symbols, interval):
+        """Return {symbol: (first_ts, last_ts, anchor)} for the stored symbols
+        
+        ``anchor`` is (ts, close) of the newest bar before the last one with a
+        close, or None; bars stored with a NaN close are never anchors.
+        """
+        result = {}
+        with self._connect() as conn:
+            for symbol in symbols:
+                first_ts, last_ts = conn.execute(
+                    "SELECT MIN(ts), MAX(ts) FROM bars WHERE symbol = ? AND interval = ?",
+                    (symbol, interval)
+                ).fetchone()
+                if last_ts is None:
+                    continue
+                anchor = conn.execute(
+                    "SELECT ts, close FROM bars WHERE symbol = ? AND interval = ? AND ts < ? "
+                    "AND close IS NOT NULL ORDER BY ts DESC LIMIT 1",
+                    (symbol, interval, last_ts)
+                ).fetchone()
+                result[symbol] = (first_ts, last_ts, anchor)
+        return result
+    
+    def read(self, symbol, interval, start=None):
+        query = "SELECT ts, open, high, low, close, volume FROM bars WHERE symbol = ? AND interval = ?"
+        params = [symbol, interval]
+        if start is not None:
+            query += " AND ts >= ?"
+            params.append(int(_to_epoch([start])[0]))
+        with self._connect() as conn:
+            rows = conn.execute(query + " ORDER BY ts", params).fetchall()
+        
+        data = pd.DataFrame(rows, columns=['ts'] + OHLCV_COLUMNS)
+        data.index = pd.to_datetime(data.pop('ts'), unit='s').astype('datetime64[ns]')
+        data.index.name = None
+        return data
+    
+    def write(self, symbol, interval, data):
+        """Merge downloaded bars, replacing every stored bar from the first new one on"""
+        data = data.reindex(columns=OHLCV_COLUMNS)
+        ts = _to_epoch(data.index)
+        rows = [
+            (symbol, interval, int(t), *(None if pd.isna(v) else float(v) for v in values))
+            for t, values in zip(ts, data.itertuples(index=False))
+        ]
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM bars WHERE symbol = ? AND interval = ? AND ts >= ?",
+                (symbol, interval, int(ts.min()))
+            )
+            conn.executemany("INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    
+    def invalidate(self, symbol, interval=None):
+        """Drop a symbol's history so the next refresh downloads it in full"""
+        with self._connect() as conn:
+            if interval is None:
+                conn.execute("DELETE FROM bars WHERE symbol = ?", (symbol,))
+            else:
+                conn.execute("DELETE FROM bars WHERE symbol = ? AND interval = ?", (symbol, interval))
+    
+    def compact(self, margin_days=30, windows=HISTORY_WINDOWS):
+        """Delete bars older than any timeframe's window needs and reclaim the space"""
+        keep_days = {}
+        for interval, days in windows.values():
+            keep_days[interval] = max(keep_days.get(interval, 0), days + margin_days)
+        
+        with self._connect() as conn:
+            for interval, days in keep_days.items():
+                cutoff = int(_to_epoch([datetime.now() - timedelta(days=days)])[0])
+                conn.execute("DELETE FROM bars WHERE interval = ? AND ts < ?", (interval, cutoff))
+        
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+
+def iter_refresh_bars(symbols, interval, days, store, downloader=yf_download, batch_size=50,
+                      max_workers=1, timings=None):
+    """Bring the stored bars of an interval up to date over the last ``days``
+    
+    Symbols already stored only download bars from their last complete bar
+    with a close on, replacing the still-forming last bar. If that overlapping bar no
+    longer matches what is stored, a dividend or split has re-adjusted the
+    history and the symbol is downloaded again in full. Yields
+    (symbols, failures) as each batch lands, listing the symbols whose
+    stored bars are final.
+    """
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=days)
+    symbols = list(dict.fromkeys(symbols))
+    
+    # Weekly and Daily share daily bars, so the stored history must also reach
+    # back to this window (a week of slack for holidays)
+    covered_from = int(_to_epoch([start_date + timedelta(days=7)])[0])
+    with timed(timings, 'store_read'):
+        stored = store.bounds(symbols, interval)
+    warm = {
+        symbol: anchor for symbol, (first_ts, _, anchor) in stored.items()
+        if anchor is not None and first_ts <= covered_from
+    }
+    cold = [symbol for symbol in symbols if symbol not in warm]
+    
+    # Symbols sharing the same last complete bar go in the same downloads
+    by_anchor = {}
+    for symbol, anchor in warm.items():
+        by_anchor.setdefault(anchor[0], []).append(symbol)
+    
+    for anchor_ts, group in by_anchor.items():
+        anchor_start = pd.to_datetime(anchor_ts, unit='s')
+        for bars, failures in iter_download_bars(
+            group, interval, anchor_start, end_date, downloader, batch_size, max_workers
+        ):
+            done = list(failures)
+            for symbol, data in bars.items():
+                data = data[_to_epoch(data.index) >= anchor_ts]
+                stored_close = warm[symbol][1]
+                if (not data.empty and _to_epoch(data.index[:1])[0] == anchor_ts
+                        and not np.isnan(data['Close'].iloc[0])
+                        and not np.isclose(data['Close'].iloc[0], stored_close, rtol=1e-6)):
+                    store.invalidate(symbol, interval)
+                    cold.append(symbol)
+                    continue
+                if not data.empty:
+                    with timed(timings, 'store_write', symbol):
+                        store.write(symbol, interval, data)
+                done.append(symbol)
+            yield done, failures
+    
+    for bars, failures in iter_download_bars(
+        cold, interval, start_date, end_date, downloader, batch_size, max_workers
+    ):
+        for symbol, data in bars.items():
+            with timed(timings, 'store_write', symbol):
+                store.write(symbol, interval, data)
+        yield list(bars) + list(failures), failures
+
+def load_timeframe(symbols, timeframe, store, failures=None, timings=None, days=None):
+    """Read a timeframe's window from the store and clean it per symbol
+    
+    ``days`` overrides the HISTORY_WINDOWS window.
+    """
+    interval, default_days = HISTORY_WINDOWS[timeframe]
+    days = days or default_days
+    start_date = datetime.now() - timedelta(days=days)
+    failures = dict(failures or {})
+    
+    bars = {}
+    for symbol in symbols:
+        try:
+            with timed(timings, 'store_read', symbol):
+                bars[symbol] = store.read(symbol, interval, start=start_date)
+        except Exception as e:
+            failures[symbol] = str(e)
+    cleaned, errors = clean_frames(bars, timeframe, timings)
+    failures.update(errors)
+    
+    frames = {}
+    for symbol, data in cleaned.items():
+        if data is None:
+            failures.setdefault(symbol, "insufficient data")
+        else:
+            # Stored history covers a failed incremental download
+            failures.pop(symbol, None)
+            frames[symbol] = data
+    
+    return frames, failures
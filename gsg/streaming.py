@@ -0,0 +1,223 @@
+"""Incremental indicator state updated in constant time per bar"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from .config import MIN_BARS
+from .states import AnalysisResult, classify_get, classify_go, classify_set
+
+def _ewm_step(prev, value, alpha):
+    """One adjust=False ewm update using the same arithmetic as pandas
+
+    pandas turns alpha into a centre of mass and back, so do the same to
+    stay bit-identical with rma/pine_ema and the batched engine.
+    """
+    alpha = 1.0 / (1.0 + (1.0 - alpha) / alpha)
+    old_wt = 1.0 - alpha
+    if prev != value:
+        prev = (old_wt * prev + alpha * value) / (old_wt + alpha)
+    return prev
+
+def _rma_step(prev, value, alpha):
+    # None until the first valid value, then NaN values carry the previous one
+    if np.isnan(value):
+        return prev
+    if prev is None:
+        return value
+    return _ewm_step(prev, value, alpha)
+
+def _pine_ema_step(prev, value, alpha):
+    # A NaN value breaks the run and the next value re-seeds
+    if np.isnan(prev) or np.isnan(value):
+        return value
+    return _ewm_step(prev, value, alpha)
+
+class IndicatorStream:
+    """Incremental DMI/MACD and Get/Set/Go state for one symbol and timeframe
+
+    Each bar updates the RMA/EMA accumulators in constant time and gives the
+    same values as calculate_dmi/calculate_macd over the full history. A bar
+    with the same timestamp as the last one revises that still-open bar.
+    The accumulators are seeded by the first bar, so they only match a
+    history starting at ``first_timestamp``.
+    """
+    
+    def __init__(self, length=14, smoothing=14, fast_length=12, slow_length=26,
+                 signal_length=9, alpha_adj=19):
+        self.params = {
+            'length': length, 'smoothing': smoothing, 'fast_length': fast_length,
+            'slow_length': slow_length, 'signal_length': signal_length, 'alpha_adj': alpha_adj
+        }
+        self.first_timestamp = None
+        self.last_timestamp = None
+        # Accumulators after every closed bar, and after the latest bar
+        self._base = self._empty_state()
+        self._last = self._base
+    
+    @staticmethod
+    def _empty_state():
+        nan = float('nan')
+        return {
+            'bars': 0, 'high': nan, 'low': nan, 'close': nan,
+            'tr': None, 'plus_dm': None, 'minus_dm': None, 'dx': None,
+            'fast': nan, 'slow': nan, 'signal': nan,
+            'plus_di': nan, 'minus_di': nan, 'adx': 0.0, 'macd': nan
+        }
+    
+    @classmethod
+    def from_history(cls, df, **params):
+        stream = cls(**params)
+        for timestamp, high, low, close in zip(df.index, df['High'], df['Low'], df['Close']):
+            stream.update(timestamp, high, low, close)
+        return stream
+    
+    def _step(self, state, high, low, close):
+        p = self.params
+        dmi_alpha = 1.0 / p['length']
+        nan = float('nan')
+        
+        # Mirrors calculate_dmi bar by bar
+        up = high - state['high']
+        down = -(low - state['low'])
+        plus_dm = up if (up > down) and (up > 0) else 0.0
+        minus_dm = down if (down > up) and (down > 0) else 0.0
+        ranges = [r for r in (high - low, abs(high - state['close']), abs(low - state['close']))
+                  if not np.isnan(r)]
+        tr = max(ranges) if ranges else nan
+        
+        tr_rma = _rma_step(state['tr'], tr, dmi_alpha)
+        plus_rma = _rma_step(state['plus_dm'], plus_dm, dmi_alpha)
+        minus_rma = _rma_step(state['minus_dm'], minus_dm, dmi_alpha)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            tr_value = np.float64(0.0 if tr_rma is None else tr_rma)
+            plus_di = float(100 * np.float64(0.0 if plus_rma is None else plus_rma) / tr_value)
+            minus_di = float(100 * np.float64(0.0 if minus_rma is None else minus_rma) / tr_value)
+            di_sum = plus_di + minus_di
+            dx = float(100 * np.float64(abs(plus_di - minus_di)) / (1.0 if di_sum == 0 else di_sum))
+        adx_rma = _rma_step(state['dx'], dx, 1.0 / p['smoothing'])
+        
+        # Mirrors calculate_macd
+        fast = _pine_ema_step(state['fast'], close, 2.0 / (p['fast_length'] + p['alpha_adj']))
+        slow = _pine_ema_step(state['slow'], close, 2.0 / (p['slow_length'] + p['alpha_adj']))
+        macd = fast - slow
+        signal = _pine_ema_step(state['signal'], macd, 2.0 / (p['signal_length'] + p['alpha_adj']))
+        
+        return {
+            'bars': state['bars'] + 1, 'high': high, 'low': low, 'close': close,
+            'tr': tr_rma, 'plus_dm': plus_rma, 'minus_dm': minus_rma, 'dx': adx_rma,
+            'fast': fast, 'slow': slow, 'signal': signal,
+            'plus_di': plus_di, 'minus_di': minus_di,
+            'adx': 0.0 if adx_rma is None else adx_rma, 'macd': macd
+        }
+    
+    def update(self, timestamp, high, low, close):
+        """Append a bar, or revise the last one if the timestamp repeats"""
+        timestamp = pd.Timestamp(timestamp)
+        high, low, close = float(high), float(low), float(close)
+        if self.last_timestamp is not None and timestamp < self.last_timestamp:
+            raise ValueError(f"Bar at {timestamp} is older than the last bar {self.last_timestamp}")
+        
+        if self.first_timestamp is None:
+            self.first_timestamp = timestamp
+        if self.last_timestamp is None or timestamp > self.last_timestamp:
+            self._base = self._last
+        self._last = self._step(self._base, high, low, close)
+        self.last_timestamp = timestamp
+        return self.result()
+    
+    def sync(self, data):
+        """Feed the bars of ``data`` this stream has not seen yet
+
+        Returns False and leaves the stream untouched when ``data`` does not
+        continue its history (a gap, or prices re-adjusted since) or starts
+        at another bar, as a window sliding forward does; rebuild the stream
+        with from_history then.
+        """
+        if self.last_timestamp is None or self.last_timestamp not in data.index:
+            return False
+        if data.index[0] != self.first_timestamp:
+            return False
+        pos = data.index.get_loc(self.last_timestamp)
+        if not isinstance(pos, int) or pos == 0 or data['Close'].iloc[pos - 1] != self._base['close']:
+            return False
+        
+        new_bars = data.iloc[pos:]
+        for timestamp, high, low, close in zip(new_bars.index, new_bars['High'], new_bars['Low'], new_bars['Close']):
+            self.update(timestamp, high, low, close)
+        return True
+    
+    def indicators(self):
+        """Latest +DI/-DI/ADX/MACD/signal values"""
+        return {name: self._last[name] for name in ['plus_di', 'minus_di', 'adx', 'macd', 'signal']}
+    
+    def result(self):
+        """AnalysisResult for the latest bar, None until MIN_BARS bars were seen"""
+        if self._last['bars'] < MIN_BARS:
+            return None
+        
+        prev, last = self._base, self._last
+        get_val, get_str = classify_get(
+            prev['plus_di'], prev['minus_di'], prev['adx'],
+            last['plus_di'], last['minus_di'], last['adx']
+        )
+        set_val, set_str = classify_set(prev['macd'], last['macd'])
+        go_val, go_str = classify_go(prev['signal'], last['signal'])
+        return AnalysisResult(get_val, get_str, set_val, set_str, go_val, go_str, get_val + set_val + go_val)
+    
+    def snapshot(self):
+        """JSON-serialisable state; restore with IndicatorStream.restore"""
+        return {
+            'params': self.params,
+            'first_timestamp': None if self.first_timestamp is None else self.first_timestamp.isoformat(),
+            'last_timestamp': None if self.last_timestamp is None else self.last_timestamp.isoformat(),
+            'base': self._base,
+            'last': self._last
+        }
+    
+    @classmethod
+    def restore(cls, snapshot):
+        stream = cls(**snapshot['params'])
+        # Snapshots from before first_timestamp was kept never sync
+        if snapshot.get('first_timestamp') is not None:
+            stream.first_timestamp = pd.Timestamp(snapshot['first_timestamp'])
+        if snapshot['last_timestamp'] is not None:
+            stream.last_timestamp = pd.Timestamp(snapshot['last_timestamp'])
+        stream._base = dict(snapshot['base'])
+        stream._last = dict(snapshot['last'])
+        return stream
+
+def stream_analysis(streams, key, data):
+    """Analyse ``data`` through the stream stored under ``key``
+
+    Only bars newer than the stream's last one are processed; the stream is
+    rebuilt from ``data`` when it is missing or no longer lines up, which
+    includes ``data`` starting at a later bar than the stream did, so the
+    results match analyze_indicators over ``data``.
+    """
+    stream = streams.get(key)
+    if stream is None or not stream.sync(data):
+        stream = streams[key] = IndicatorStream.from_history(data)
+    return stream.result()
+
+def save_streams(streams, path):
+    """Write {(symbol, timeframe): IndicatorStream} to a JSON snapshot file"""
+    payload = [
+        {'symbol': symbol, 'timeframe': timeframe, 'state': stream.snapshot()}
+        for (symbol, timeframe), stream in streams.items()
+    ]
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+def load_streams(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        payload = json.load(f)
+    return {
+        (item['symbol'], item['timeframe']): IndicatorStream.restore(item['state'])
+        for item in payload
+    }
@@ -0,0 +1,111 @@
+"""Deterministic synthetic OHLCV bars for offline runs and benchmarks"""
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from .config import OHLCV_COLUMNS
+from .timeframes import symbol_market
+
+# Hourly bar start times per session; Hong Kong breaks for lunch, and
+# symbols without sessions get US hours
+SESSION_HOURS = {
+    "HK": ["09:30", "10:30", "11:30", "13:00", "14:00", "15:00"],
+    "US": ["09:30", "10:30", "11:30", "12:30", "13:30", "14:30", "15:30"]
+}
+
+# Daily volatility of the random walk; hourly bars scale it down
+DAILY_VOLATILITY = 0.02
+
+# Each symbol's log price at the start of every year from ORIGIN_YEAR on is
+# drawn once, with YEARLY_VOLATILITY around the symbol's base level; the
+# bars of a year walk from its level to the next year's
+ORIGIN_YEAR = 1970
+YEARS = 200
+YEARLY_VOLATILITY = 0.3
+
+def _rng(*key):
+    # hash() is salted per process, crc32 keeps runs reproducible
+    return np.random.default_rng(zlib.crc32(":".join(map(str, key)).encode()))
+
+def _year_levels(symbol, seed):
+    rng = _rng(seed, symbol)
+    base = np.log(10 ** rng.uniform(0.5, 3))
+    return base + YEARLY_VOLATILITY * rng.standard_normal(YEARS)
+
+def _bar_offsets(symbol, interval):
+    # Bar start times within a day: midnight for daily bars, session hours for 1h
+    hours = SESSION_HOURS[symbol_market(symbol) or "US"] if interval == "1h" else ["00:00"]
+    return pd.to_timedelta([f"{h}:00" for h in hours]).to_numpy().astype("timedelta64[us]")
+
+def synthetic_bars(symbol, interval, start, end, seed=0, gap_rate=0.02, nan_rate=0.002):
+    """Random-walk OHLCV bars for one symbol, the same for every window that has a bar
+    
+    Every bar is drawn from its calendar year, seeded by (seed, symbol,
+    interval, year), so overlapping windows agree bar for bar as an
+    incremental refresh expects. Like live downloads, a ``gap_rate`` share
+    of trading days is missing (holidays, halts; the same days for daily
+    and hourly bars) and NaN runs of 1-5 bars start at ``nan_rate`` of the
+    bars. Daily bars are what "1wk" timeframes are resampled from.
+    """
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    offsets = _bar_offsets(symbol, interval)
+    per_day = len(offsets)
+    bars_per_day = len(SESSION_HOURS["US"]) if interval == "1h" else 1
+    volatility = DAILY_VOLATILITY / np.sqrt(bars_per_day)
+    levels = _year_levels(symbol, seed)
+    
+    # NaN runs starting late in the year before can reach into the window
+    years = []
+    for year in range(start.year - 1, end.year + 1):
+        days = np.arange(np.datetime64(f"{year}-01-01"), np.datetime64(f"{year + 1}-01-01"))
+        weekday = (days.astype(np.int64) + 3) % 7 < 5  # 1970-01-01 was a Thursday
+        holiday = _rng(seed, symbol, year, "holidays").random(len(days)) < gap_rate
+        moves = np.repeat(weekday, per_day)
+        n = len(moves)
+        rng = _rng(seed, symbol, interval, year)
+        walk_noise, open_noise, high_noise, low_noise = rng.standard_normal((4, n))
+        
+        # Walk from this year's level to the next one's; weekends do not move
+        level, next_level = levels[year - ORIGIN_YEAR], levels[year + 1 - ORIGIN_YEAR]
+        walk = np.cumsum(volatility * walk_noise * moves)
+        share = np.cumsum(moves) / moves.sum()
+        log_close = level + walk + share * (next_level - level - walk[-1])
+        close = np.exp(log_close)
+        open_ = np.exp(np.r_[level, log_close[:-1]] + open_noise * volatility / 4)
+        years.append({
+            "times": (days.astype("datetime64[us]")[:, None] + offsets[None, :]).ravel(),
+            "trading": np.repeat(weekday & ~holiday, per_day),
+            "Open": open_,
+            "High": np.maximum(open_, close) * np.exp(np.abs(high_noise) * volatility / 2),
+            "Low": np.minimum(open_, close) * np.exp(-np.abs(low_noise) * volatility / 2),
+            "Close": close,
+            "Volume": np.round(rng.lognormal(13, 1, n)),
+            "nan_draw": rng.random(n),
+            "nan_length": rng.integers(1, 6, n)
+        })
+    columns = {key: np.concatenate([year[key] for year in years]) for key in years[0]}
+    
+    missing = np.zeros(len(columns["times"]), dtype=bool)
+    for run_start in np.flatnonzero(columns["nan_draw"] < nan_rate):
+        missing[run_start:run_start + columns["nan_length"][run_start]] = True
+    
+    # Daily bars are kept by day, hourly ones by start time
+    times = pd.DatetimeIndex(columns["times"])
+    first = start if interval == "1h" else start.normalize()
+    last = end if interval == "1h" else end.normalize()
+    keep = columns["trading"] & (times >= first) & (times <= last)
+    data = pd.DataFrame({column: columns[column] for column in OHLCV_COLUMNS}, index=times)
+    data.iloc[np.flatnonzero(missing), :4] = np.nan
+    return data[keep]
+
+def synthetic_download(symbols, start, end, interval, seed=0):
+    """Stand-in for yf_download returning synthetic bars in the same layout"""
+    return pd.concat(
+        {symbol: synthetic_bars(symbol, interval, start, end, seed) for symbol in symbols},
+        axis=1, sort=True
+    )
+
+def synthetic_symbols(count):
+    """Symbol names for ``count`` synthetic listings, a third of them in Hong Kong"""
+    return [f"{i:04d}.HK" if i % 3 == 0 else f"SYN{i:04d}" for i in range(count)]
@@ -0,0 +1,139 @@
+"""Columnar states table for the dashboard: sorting, state filters, paging and HTML"""
+import html
+
+import numpy as np
+import pandas as pd
+
+from .config import SCAN_TIMEFRAMES
+from .scanner import results_frame
+
+FIELDS = ['Get', 'Set', 'Go', 'Trend']
+
+# The Buy/Sell cut-offs of get_trend and get_total_trend
+STATE_FILTERS = {
+    "Buy": lambda values: values >= 5,
+    "Hold": lambda values: (values > -5) & (values < 5),
+    "Sell": lambda values: values <= -5
+}
+
+def format_age(seconds):
+    if seconds is None or pd.isna(seconds):
+        return "N/A"
+    if seconds < 60:
+        return f"{seconds:.0f}s"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f}m"
+    return f"{seconds / 3600:.1f}h"
+
+def states_table(scan, ages=None):
+    """One row per scanned symbol, in scan order, with scores, labels and data age
+    
+    Columns are results_frame's for a single portfolio (symbol, total_trend,
+    signal flags and <timeframe>_get/_set/_go/_total with their labels) plus
+    ``age``, the seconds since the symbol's oldest frame was fetched.
+    """
+    table = results_frame({None: scan})
+    if table.empty:
+        table = pd.DataFrame(columns=[column for column in sort_columns().values() if column is not None])
+    table = table.drop(columns='portfolio', errors='ignore')
+    # An unnamed index so 'symbol' can still be sorted on as a column
+    table.index = pd.Index(table['symbol'].to_numpy())
+    table['age'] = pd.Series(ages or {}, dtype=float).reindex(table.index)
+    return table
+
+def replace_rows(table, rows):
+    """A states_table with some symbols' rows swapped for newer ones, in the same order"""
+    return pd.concat([table.drop(rows.index), rows]).reindex(table.index)
+
+def sort_columns(timeframes=SCAN_TIMEFRAMES):
+    """Display name -> states_table column for each way the table can be sorted
+    
+    None keeps the portfolio order.
+    """
+    columns = {"Portfolio order": None, "Total Trend": "total_trend", "Symbol": "symbol",
+               "Data Age": "age"}
+    for tf_name in timeframes:
+        prefix = tf_name.lower()
+        for field in FIELDS:
+            columns[f"{tf_name} {field}"] = f"{prefix}_{'total' if field == 'Trend' else field.lower()}"
+    return columns
+
+def filter_columns(timeframes=SCAN_TIMEFRAMES):
+    """Display name -> states_table column whose Buy/Hold/Sell state can be filtered on"""
+    return {"Total Trend": "total_trend",
+            **{f"{tf_name} Trend": f"{tf_name.lower()}_total" for tf_name in timeframes}}
+
+def select_rows(table, sort_by=None, ascending=False, state=None, state_column='total_trend',
+                page=1, page_size=100):
+    """Filter, sort and page a states_table
+    
+    ``state`` is a STATE_FILTERS key applied to ``state_column``; symbols
+    without a value there are dropped by any filter and sort last. Returns
+    (rows of the page, number of matching rows, number of pages); ``page``
+    is clamped to the pages there are.
+    """
+    if state is not None:
+        table = table[STATE_FILTERS[state](table[state_column])]
+    if sort_by is not None:
+        table = table.sort_values(sort_by, ascending=ascending, na_position='last', kind='stable')
+    pages = max(1, -(-len(table) // page_size))
+    page = min(max(page, 1), pages)
+    return table.iloc[(page - 1) * page_size:page * page_size], len(table), pages
+
+def _cells(text, color):
+    # One <td> per row from aligned text and color Series
+    return "<td class='value' style='color:" + color + ";'>" + text + "</td>"
+
+def _score_cells(scores, labels):
+    color = np.select([scores > 0, scores < 0], ["green", "red"], "white")
+    return _cells(labels.fillna("N/A"), pd.Series(color, index=scores.index))
+
+def _trend_cells(values, decimals):
+    text = np.select([values >= 5, values <= -5], ["Buy", "Sell"], "Hold")
+    color = np.select([values >= 5, values <= -5], ["green", "red"], "gray")
+    missing = values.isna()
+    text = pd.Series(text, index=values.index) + " (" + values.map(
+        lambda value: f"{value:.{decimals}f}", na_action='ignore'
+    ) + ")"
+    color = pd.Series(color, index=values.index)
+    return _cells(text.mask(missing, "N/A"), color.mask(missing, "white"))
+
+def table_html(rows, last_update_times, timeframes=SCAN_TIMEFRAMES):
+    """HTML for states_table rows, built a column at a time rather than per cell"""
+    html_table = "<table>"
+    
+    html_table += "<tr><th></th><th></th><th></th>"
+    for tf in timeframes:
+        last_update = last_update_times.get(tf, "N/A")
+        if isinstance(last_update, pd.Timestamp):
+            last_update_str = last_update.strftime("%Y-%m-%d %H:%M:%S")
+        else:
+            last_update_str = str(last_update)
+        html_table += f"<th colspan='4' class='last-update'>Last Update: {last_update_str}</th>"
+    html_table += "</tr>"
+    
+    html_table += "<tr><th></th><th class='timeframe'>Total Trend</th><th class='timeframe'>Data Age</th>"
+    for tf in timeframes:
+        html_table += f"<th colspan='4' class='timeframe'>{tf}</th>"
+    html_table += "</tr>"
+    
+    html_table += "<tr><th class='symbol'>Symbol</th><th class='value'></th><th class='value'></th>"
+    for _ in timeframes:
+        html_table += "".join(f"<th class='value'>{field}</th>" for field in FIELDS)
+    html_table += "</tr>"
+    
+    if len(rows):
+        # Tickers such as M&M.NS carry HTML metacharacters
+        symbols = pd.Series(rows.index, index=rows.index).map(html.escape)
+        body = "<tr><td class='symbol'>" + symbols + "</td>"
+        body += _trend_cells(rows['total_trend'].astype(float), 1)
+        body += "<td class='last-update'>" + rows['age'].map(format_age) + "</td>"
+        for tf in timeframes:
+            prefix = tf.lower()
+            for field in ['get', 'set', 'go']:
+                body += _score_cells(rows[f'{prefix}_{field}'].astype(float), rows[f'{prefix}_{field}_label'])
+            body += _trend_cells(rows[f'{prefix}_total'].astype(float), 0)
+        html_table += "".join(body + "</tr>")
+    
+    html_table += "</table>"
+    return html_table
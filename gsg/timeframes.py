@@ -0,0 +1,213 @@
+"""Timeframes resampled from a download of another interval, for many symbols at once"""
+import threading
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+
+from .config import INDEX_MARKETS, MARKET_SESSIONS, OHLCV_COLUMNS, TIMEFRAME_RULES
+from .diagnostics import count
+
+_DAY = pd.Timedelta(days=1).value
+
+# market -> [(open, close)] in nanoseconds after midnight
+_SESSIONS = {
+    market: [(pd.Timedelta(f"{open_}:00").value, pd.Timedelta(f"{close}:00").value)
+             for open_, close in sessions]
+    for market, sessions in MARKET_SESSIONS.items()
+}
+_MARKETS = list(MARKET_SESSIONS)
+
+# timeframe -> offset of its resample rule
+_OFFSETS = {timeframe: to_offset(rule) for timeframe, rule in TIMEFRAME_RULES.items() if rule}
+
+def symbol_market(symbol):
+    """MARKET_SESSIONS key whose hours a symbol trades, None if it has none
+    
+    "HK" for Hong Kong listings, "US" for tickers without a suffix and the
+    indices INDEX_MARKETS names; None for the rest (^N225, CL=F...).
+    """
+    if symbol in INDEX_MARKETS:
+        return INDEX_MARKETS[symbol]
+    if symbol.endswith(".HK"):
+        return "HK"
+    return None if any(char in symbol for char in ".=^") else "US"
+
+def _market_code(symbol):
+    # Index into _MARKETS, -1 (no sessions) for clock-aligned symbols
+    market = symbol_market(symbol)
+    return _MARKETS.index(market) if market is not None else -1
+
+def _intraday_labels(times, freq, markets):
+    # Each bar goes to the ``freq`` slot of its session that it starts in,
+    # slots counted from the session's open so none spans a break; bars
+    # outside the sessions, or of symbols without any, fall back to slots
+    # counted from midnight
+    labels = times // freq * freq
+    day = times // _DAY * _DAY
+    clock = times - day
+    for code, market in enumerate(_MARKETS):
+        in_market = markets == code
+        for open_, close in _SESSIONS[market]:
+            inside = in_market & (clock >= open_) & (clock < close)
+            labels = np.where(inside, day + open_ + (clock - open_) // freq * freq, labels)
+    return labels
+
+def _calendar_labels(times, offset):
+    # Labelled like resample's right-closed, right-labelled bins: a bar's day
+    # rolled forward to the end of its week, month...
+    return (pd.DatetimeIndex(times // _DAY * _DAY) + offset * 0).asi8
+
+def _is_intraday(offset):
+    return isinstance(offset, pd.offsets.Tick)
+
+def bucket_labels(times, timeframe, markets):
+    """Label of the ``timeframe`` bar each bar time falls in
+    
+    ``times`` are naive exchange-time nanoseconds and ``markets`` each
+    time's index into MARKET_SESSIONS, -1 for none. Intraday rules label a bar with its
+    start, as downloads do; calendar rules (weeks, months) with the day
+    that ends it, as resample does.
+    """
+    offset = _OFFSETS[timeframe]
+    if _is_intraday(offset):
+        return _intraday_labels(times, offset.nanos, markets)
+    return _calendar_labels(times, offset)
+
+def bucket_label(timestamp, timeframe, symbol=""):
+    """The label bucket_labels gives one bar time of a symbol; native timeframes keep it
+    
+    Worked out without arrays, as live updates label one bar at a time.
+    """
+    offset = _OFFSETS.get(timeframe)
+    if offset is None:
+        return timestamp
+    timestamp = pd.Timestamp(timestamp)
+    if not _is_intraday(offset):
+        return timestamp.normalize() + offset * 0
+    value, freq = timestamp.value, offset.nanos
+    day = value // _DAY * _DAY
+    clock = value - day
+    for open_, close in _SESSIONS.get(symbol_market(symbol), []):
+        if open_ <= clock < close:
+            return pd.Timestamp(day + open_ + (clock - open_) // freq * freq)
+    return pd.Timestamp(value // freq * freq)
+
+def _bars_key(times, values):
+    return len(times), hash(times.tobytes()), hash(values.tobytes())
+
+class ResampleCache:
+    """Resampled frames per (symbol, timeframe), reused while the bars they came from are unchanged
+    
+    One frame is kept per key, so memory is bounded by the symbols scanned.
+    Frames handed out are shared and must not be modified.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._frames = {}  # (symbol, timeframe) -> (key of the source bars, resampled frame)
+        self._counters = {'hits': 0, 'misses': 0}
+    
+    def get(self, symbol, timeframe, bars_key):
+        with self._lock:
+            cached = self._frames.get((symbol, timeframe))
+            hit = cached is not None and cached[0] == bars_key
+            self._counters['hits' if hit else 'misses'] += 1
+            return cached[1] if hit else None
+    
+    def put(self, symbol, timeframe, bars_key, frame):
+        with self._lock:
+            self._frames[(symbol, timeframe)] = (bars_key, frame)
+    
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+    
+    def stats(self):
+        """Hit and miss counts and the frames held"""
+        with self._lock:
+            return {**self._counters, 'entries': len(self._frames)}
+
+# Shared by every scan in the process
+RESAMPLE_CACHE = ResampleCache()
+
+def resample_frames(bars, timeframe, cache=RESAMPLE_CACHE, timings=None):
+    """Build a timeframe's bars for many symbols from their download interval's bars
+    
+    ``bars`` maps symbol to OHLCV frames in exchange time. Every symbol not
+    in ``cache`` is aggregated in one pass over the concatenated bars:
+    first Open, highest High, lowest Low, last Close, summed Volume, NaNs
+    skipped as resample does. Calendar rules keep resample's empty bars
+    for weeks or months without trading; intraday ones only have bars
+    for the slots that traded. Returns {symbol: frame} in ``bars`` order;
+    symbols without bars keep what they were given.
+    """
+    rule = TIMEFRAME_RULES[timeframe]
+    if rule is None:
+        return dict(bars)
+    
+    resampled = {}
+    pending = []  # (symbol, times, values, bars key, source frame)
+    for symbol, frame in bars.items():
+        if frame is None or frame.empty:
+            resampled[symbol] = frame
+            continue
+        index = frame.index.tz_localize(None) if frame.index.tz is not None else frame.index
+        times = index.as_unit('ns').asi8
+        if list(frame.columns) != OHLCV_COLUMNS:
+            frame = frame.reindex(columns=OHLCV_COLUMNS)
+        values = frame.to_numpy(dtype=float)
+        bars_key = _bars_key(times, values)
+        cached = cache.get(symbol, timeframe, bars_key) if cache is not None else None
+        if cached is not None:
+            resampled[symbol] = cached
+        else:
+            pending.append((symbol, times, values, bars_key, frame))
+    count(timings, 'resample_cached', len(bars) - len(pending))
+    
+    if pending:
+        lengths = [len(times) for _, times, _, _, _ in pending]
+        rows = np.repeat(np.arange(len(pending)), lengths)
+        times = np.concatenate([times for _, times, _, _, _ in pending])
+        values = np.concatenate([values for _, _, values, _, _ in pending])
+        markets = np.array([_market_code(symbol) for symbol, *_ in pending])[rows]
+        labels = bucket_labels(times, timeframe, markets)
+        
+        order = np.lexsort((times, labels, rows))
+        rows, labels, values = rows[order], labels[order], values[order]
+        starts = np.flatnonzero(np.r_[True, (rows[1:] != rows[:-1]) | (labels[1:] != labels[:-1])])
+        
+        positions = np.arange(len(rows))
+        open_, high, low, close, volume = values.T
+        first = np.minimum.reduceat(np.where(np.isnan(open_), len(rows), positions), starts)
+        last = np.maximum.reduceat(np.where(np.isnan(close), -1, positions), starts)
+        aggregated = np.column_stack([
+            np.where(first < len(rows), open_[np.minimum(first, len(rows) - 1)], np.nan),
+            np.fmax.reduceat(high, starts),
+            np.fmin.reduceat(low, starts),
+            np.where(last >= 0, close[last], np.nan),
+            np.add.reduceat(np.nan_to_num(volume), starts)
+        ])
+        
+        group_rows, group_labels = rows[starts], labels[starts]
+        bounds = np.r_[np.searchsorted(group_rows, np.arange(len(pending))), len(starts)]
+        gapped = set()
+        offset = _OFFSETS[timeframe]
+        if not _is_intraday(offset):
+            # Symbols with a week or month between two bars that never traded
+            following = (pd.DatetimeIndex(group_labels) + offset).asi8
+            gaps = (group_rows[1:] == group_rows[:-1]) & (group_labels[1:] != following[:-1])
+            gapped = set(group_rows[1:][gaps].tolist())
+        for i, (symbol, _, _, bars_key, source) in enumerate(pending):
+            index = pd.DatetimeIndex(group_labels[bounds[i]:bounds[i + 1]],
+                                     name=source.index.name).as_unit(source.index.unit)
+            frame = pd.DataFrame(aggregated[bounds[i]:bounds[i + 1]], index=index, columns=OHLCV_COLUMNS)
+            if i in gapped:
+                frame = frame.reindex(pd.date_range(index[0], index[-1], freq=rule, name=index.name,
+                                                     unit=index.unit))
+                frame['Volume'] = frame['Volume'].fillna(0)
+            if cache is not None:
+                cache.put(symbol, timeframe, bars_key, frame)
+            resampled[symbol] = frame
+    
+    return {symbol: resampled[symbol] for symbol in bars}
@@ -0,0 +1,105 @@
+"""FrameCache byte budget, LRU eviction and stale-while-revalidate refreshes"""
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from gsg.cache import FrameCache
+from gsg.synthetic import synthetic_bars
+
+DAILY = {"Daily": "1d"}
+
+class SameBars:
+    """Gives every symbol the same bars, so cached frames share one index; counts calls"""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, symbols, start, end, interval):
+        self.release.wait(10)
+        self.calls += 1
+        bars = synthetic_bars("AAPL", interval, start, end)
+        return pd.concat({symbol: bars for symbol in symbols}, axis=1)
+
+class Clock:
+    def __init__(self):
+        self.now = 1e9
+
+    def __call__(self):
+        return self.now
+
+def _cache(max_bytes=2 ** 30, downloader=None, clock=None):
+    return FrameCache(downloader=downloader or SameBars(), max_bytes=max_bytes, clock=clock or Clock())
+
+def _cached(cache):
+    return [symbol for symbol, _ in cache._entries]
+
+def _frame_bytes(cache, symbol):
+    # float32 OHLC and int64 volume per bar, without the shared index
+    frame = cache.view([symbol], DAILY)[0]["Daily"][symbol]
+    return len(frame) * (4 * 4 + 8)
+
+def test_bytes_count_float32_columns_and_one_shared_index():
+    cache = _cache()
+    data, _, _ = cache.get(["A", "B", "C"], DAILY)
+    frame = data["Daily"]["A"]
+    assert frame['Close'].dtype == np.float32 and frame['Volume'].dtype == np.int64
+    assert cache.stats()['shared_indexes'] == 1
+    assert cache.stats()['bytes'] == 3 * _frame_bytes(cache, "A") + len(frame) * 8
+
+    cache.invalidate(["A", "B", "C"])
+    assert cache.stats()['bytes'] == 0
+    assert cache.stats()['shared_indexes'] == 0
+
+def test_least_recently_used_series_are_evicted_past_the_budget():
+    probe = _cache()
+    probe.get(["A"], DAILY)
+    per_symbol = _frame_bytes(probe, "A")
+    index_bytes = probe.stats()['bytes'] - per_symbol
+
+    # Room for three symbols' frames and their shared index
+    cache = _cache(max_bytes=index_bytes + 3 * per_symbol)
+    cache.get(["A", "B", "C"], DAILY)
+    cache.get(["A"], DAILY)  # A is now the most recently used
+    cache.get(["D"], DAILY)
+    assert _cached(cache) == ["C", "A", "D"]
+    assert cache.stats()['evictions'] == 1
+    cache.get(["E", "F"], DAILY)
+    assert _cached(cache) == ["D", "E", "F"]
+    assert cache.stats()['bytes'] == index_bytes + 3 * per_symbol
+
+    # Evicted series load again on their next get
+    calls = cache.downloader.calls
+    data, _, _ = cache.get(["A"], DAILY)
+    assert "A" in data["Daily"] and cache.downloader.calls == calls + 1
+    cache.invalidate(["A", "D", "E", "F"])
+    assert cache.stats()['bytes'] == 0
+
+def test_stale_read_serves_the_old_frame_and_refreshes_once():
+    clock = Clock()
+    downloader = SameBars()
+    cache = _cache(downloader=downloader, clock=clock)
+    first, _, _ = cache.get(["A", "B"], DAILY)
+    assert downloader.calls == 1
+
+    clock.now += cache.ttls["1d"] + 1
+    downloader.release.clear()
+    stale, _, _ = cache.get(["A", "B"], DAILY)
+    again, _, _ = cache.get(["A", "B"], DAILY)
+    assert stale["Daily"]["A"] is first["Daily"]["A"]
+    assert again["Daily"]["A"] is first["Daily"]["A"]
+    assert cache.refreshing == 2
+    assert cache.stats()['stale_hits'] == 4
+
+    downloader.release.set()
+    deadline = time.time() + 10
+    while cache.refreshing and time.time() < deadline:
+        time.sleep(0.01)
+    assert cache.refreshing == 0
+    assert downloader.calls == 2
+    fresh, _, _ = cache.get(["A", "B"], DAILY)
+    assert fresh["Daily"]["A"] is not first["Daily"]["A"]
+    assert cache.stats()['hits'] == 2
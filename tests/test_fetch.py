@@ -0,0 +1,99 @@
+"""Downloads: retries of failed calls and of tickers a call came back without"""
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from gsg import fetch
+from gsg.fetch import ResilientDownloader, download_bars
+
+def _bars(symbols):
+    index = pd.date_range("2025-01-06", periods=5, freq="D")
+    return pd.concat({
+        symbol: pd.DataFrame({'Open': 1.0, 'High': 2.0, 'Low': 0.5, 'Close': 1.5, 'Volume': 10.0},
+                             index=index)
+        for symbol in symbols
+    }, axis=1)
+
+class FlakyDownloader:
+    """Returns empty columns for ``throttled`` tickers on their first ``times`` requests"""
+    
+    def __init__(self, throttled=(), times=1, errors=0):
+        self.throttled = {symbol: times for symbol in throttled}
+        self.errors = errors
+        self.calls = []
+    
+    def __call__(self, symbols, start, end, interval):
+        self.calls.append(list(symbols))
+        if self.errors:
+            self.errors -= 1
+            raise ConnectionError("connection reset")
+        frame = _bars(symbols)
+        for symbol in symbols:
+            if self.throttled.get(symbol, 0) > 0:
+                self.throttled[symbol] -= 1
+                frame[symbol] = float('nan')
+        return frame
+
+def _resilient(downloader, **kwargs):
+    return ResilientDownloader(downloader, sleep=lambda seconds: None, **kwargs)
+
+def test_retries_only_the_missing_tickers():
+    downloader = FlakyDownloader(throttled=["BBB"], times=2)
+    bars, failures = download_bars(["AAA", "BBB", "CCC"], "1d", None, None, _resilient(downloader))
+    assert failures == {}
+    assert sorted(bars) == ["AAA", "BBB", "CCC"]
+    assert downloader.calls == [["AAA", "BBB", "CCC"], ["BBB"], ["BBB"]]
+
+def test_tickers_missing_after_every_retry_have_no_data():
+    downloader = FlakyDownloader(throttled=["BBB"], times=10)
+    bars, failures = download_bars(["AAA", "BBB"], "1d", None, None, _resilient(downloader, retries=2))
+    assert list(bars) == ["AAA"]
+    assert failures == {"BBB": "no data"}
+    assert len(downloader.calls) == 3
+
+def test_failed_calls_are_retried_then_raised():
+    downloader = FlakyDownloader(errors=1)
+    bars, failures = download_bars(["AAA"], "1d", None, None, _resilient(downloader))
+    assert list(bars) == ["AAA"] and failures == {}
+    
+    downloader = FlakyDownloader(errors=10)
+    with pytest.raises(ConnectionError):
+        _resilient(downloader, retries=2)(["AAA"], None, None, "1d")
+    assert len(downloader.calls) == 3
+
+def test_timed_out_call_does_not_block_its_retry(monkeypatch):
+    release = threading.Event()
+    calls = []
+    
+    def download(symbols, **kwargs):
+        calls.append(symbols)
+        if len(calls) == 1:
+            release.wait(5)
+        return _bars(symbols)
+    
+    monkeypatch.setattr(fetch.yf, "download", download)
+    started = time.monotonic()
+    frame = _resilient(fetch.yf_download, timeout=0.2)(["AAA"], None, None, "1d")
+    release.set()
+    assert list(frame.columns.get_level_values(0).unique()) == ["AAA"]
+    assert time.monotonic() - started < 2
+
+@pytest.mark.skipif(fetch._YF_SHARED_STATE, reason="installed yfinance serializes downloads")
+def test_yf_downloads_overlap(monkeypatch):
+    running = []
+    peak = []
+    
+    def download(symbols, **kwargs):
+        running.append(1)
+        peak.append(len(running))
+        time.sleep(0.1)
+        running.pop()
+        return _bars(symbols)
+    
+    monkeypatch.setattr(fetch.yf, "download", download)
+    bars, _ = download_bars([f"S{i}" for i in range(8)], "1d", None, None, fetch.yf_download,
+                            batch_size=2, max_workers=4)
+    assert len(bars) == 8
+    assert max(peak) > 1
@@ -0,0 +1,79 @@
+"""Vectorized indicators against the per-bar loops they replaced"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from gsg.indicators import calculate_dmi, calculate_macd, pine_ema, rma
+
+def reference_rma(series, length):
+    # The original TradingView ta.rma loop
+    alpha = 1.0 / length
+    result = pd.Series(0.0, index=series.index)
+    first_valid_idx = series.first_valid_index()
+    if first_valid_idx is None:
+        return result
+    result.loc[first_valid_idx] = series.loc[first_valid_idx]
+    for i in range(series.index.get_loc(first_valid_idx) + 1, len(series)):
+        if pd.isna(series.iloc[i]):
+            result.iloc[i] = result.iloc[i - 1]
+        else:
+            result.iloc[i] = alpha * series.iloc[i] + (1 - alpha) * result.iloc[i - 1]
+    return result
+
+def reference_pine_ema(series, length, alpha_adj=19):
+    # The original pine_ema loop: sum := na(sum[1]) ? src : alpha * src + (1 - alpha) * nz(sum[1])
+    alpha = 2.0 / (length + alpha_adj)
+    result = pd.Series(np.nan, index=series.index)
+    result.iloc[0] = series.iloc[0]
+    for i in range(1, len(series)):
+        prev_sum = result.iloc[i - 1]
+        if pd.isna(prev_sum):
+            result.iloc[i] = series.iloc[i]
+        else:
+            result.iloc[i] = alpha * series.iloc[i] + (1 - alpha) * prev_sum
+    return result
+
+def _series(values):
+    return pd.Series(values, index=pd.date_range("2024-01-01", periods=len(values), freq="D"), dtype=float)
+
+_RANDOM = np.random.default_rng(7).normal(100, 5, 300)
+
+CASES = {
+    'random': _RANDOM,
+    'leading_nans': np.r_[[np.nan] * 20, _RANDOM[:200]],
+    'gaps': np.where(np.arange(300) % 37 < 3, np.nan, _RANDOM),
+    'trailing_nans': np.r_[_RANDOM[:100], [np.nan] * 5],
+    'constant': np.full(120, 42.0),
+    'all_nan': np.full(30, np.nan),
+    'single': np.array([3.0])
+}
+
+def assert_parity(actual, expected):
+    assert actual.index.equals(expected.index)
+    np.testing.assert_allclose(actual.to_numpy(), expected.to_numpy(), rtol=1e-12, atol=1e-12)
+
+@pytest.mark.parametrize("case", CASES)
+@pytest.mark.parametrize("length", [1, 9, 14])
+def test_rma_matches_loop(case, length):
+    series = _series(CASES[case])
+    assert_parity(rma(series, length), reference_rma(series, length))
+
+@pytest.mark.parametrize("case", CASES)
+@pytest.mark.parametrize("length", [9, 12, 26])
+def test_pine_ema_matches_loop(case, length):
+    series = _series(CASES[case])
+    assert_parity(pine_ema(series, length), reference_pine_ema(series, length))
+
+def _ohlc(close):
+    close = _series(close)
+    return pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close, 'Volume': 1.0})
+
+@pytest.mark.parametrize("case", ['random', 'leading_nans', 'gaps', 'constant'])
+def test_dmi_and_macd_match_loops(case, monkeypatch):
+    df = _ohlc(CASES[case])
+    actual = calculate_dmi(df) + calculate_macd(df)
+    monkeypatch.setattr("gsg.indicators.rma", reference_rma)
+    monkeypatch.setattr("gsg.indicators.pine_ema", reference_pine_ema)
+    expected = calculate_dmi(df) + calculate_macd(df)
+    for a, e in zip(actual, expected):
+        assert_parity(a, e)
@@ -0,0 +1,72 @@
+"""Replayed live bars: bucketing into each timeframe and parity with a batch scan"""
+import pandas as pd
+import pytest
+
+from gsg.config import TIMEFRAMES
+from gsg.fetch import clean_bars
+from gsg.live import LiveScanner, ReplaySource, bar_label, replay_split
+from gsg.states import analyze_symbol
+from gsg.synthetic import synthetic_bars
+from gsg.timeframes import resample_frames
+
+SYMBOLS = ["0700.HK", "AAPL", "0005.HK", "MSFT"]
+AGGREGATION = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+
+def _timeframes(hourly):
+    # Daily bars are the days of the Hourly ones, as the live feed builds them
+    daily = {symbol: frame.groupby(frame.index.normalize()).agg(AGGREGATION) for symbol, frame in hourly.items()}
+    return {
+        "Weekly": resample_frames(daily, "1wk", cache=None),
+        "Daily": daily,
+        "Hourly": dict(hourly)
+    }
+
+def _batch(hourly, cutoff):
+    data = _timeframes({symbol: frame[frame.index < cutoff] for symbol, frame in hourly.items()})
+    return {symbol: {tf_name: analyze_symbol(clean_bars(data[tf_name][symbol].copy())) for tf_name in TIMEFRAMES}
+            for symbol in hourly}
+
+@pytest.fixture(scope="module")
+def hourly():
+    return {symbol: synthetic_bars(symbol, "1h", "2023-06-01", "2024-03-09", nan_rate=0) for symbol in SYMBOLS}
+
+@pytest.mark.parametrize("timeframe, timestamp, symbol, label", [
+    ("Hourly", "2024-03-06 14:30", "AAPL", "2024-03-06 14:30"),
+    ("Daily", "2024-03-06 14:30", "AAPL", "2024-03-06"),
+    ("Weekly", "2024-03-06 14:30", "AAPL", "2024-03-08"),
+    ("Weekly", "2024-03-08 15:30", "0700.HK", "2024-03-08"),
+    ("Weekly", "2024-03-11 09:30", "0700.HK", "2024-03-15"),
+    ("2-Hour", "2024-03-06 11:30", "0700.HK", "2024-03-06 11:30"),  # the slot before lunch
+    ("2-Hour", "2024-03-06 14:00", "0700.HK", "2024-03-06 13:00"),
+    ("2-Hour", "2024-03-06 10:30", "AAPL", "2024-03-06 09:30"),
+])
+def test_bar_labels(timeframe, timestamp, symbol, label):
+    assert bar_label(timeframe, pd.Timestamp(timestamp), symbol) == pd.Timestamp(label)
+
+@pytest.mark.parametrize("steps", [1, 3])
+def test_replay_matches_batch_scan_at_every_cutoff(hourly, steps):
+    history, replay = replay_split(_timeframes(hourly), days=4)
+    live = LiveScanner(history, SYMBOLS, TIMEFRAMES)
+    start = min(frame.index[0] for frame in replay.values())
+    assert live.analyses == _batch(hourly, start.normalize())
+
+    checked = 0
+    day = None
+    for update in ReplaySource(replay, steps=steps):
+        if update.timestamp.normalize() != day:
+            # Every bar before this day has been sent in full
+            if day is not None:
+                assert live.analyses == _batch(hourly, update.timestamp.normalize()), day
+                checked += 1
+            day = update.timestamp.normalize()
+        live.apply(update)
+    assert live.analyses == _batch(hourly, pd.Timestamp.max)
+    assert checked >= 3
+
+    last = max(frame.index[-1] for frame in hourly.values())
+    assert live.last_update_times["Hourly"] == last
+    assert live.last_update_times["Daily"] == last.normalize()
+    assert live.last_update_times["Weekly"] == bar_label("Weekly", last)
+    scan = live.scan()
+    for symbol in SYMBOLS:
+        assert symbol in scan.total_trends
@@ -0,0 +1,37 @@
+"""analyze_parallel on a spawned process pool against the in-process analysis"""
+import glob
+import os
+import tempfile
+
+import pytest
+
+from gsg.config import TIMEFRAMES
+from gsg.parallel import analysis_pool, analyze_parallel
+from gsg.scanner import fetch_timeframes
+from gsg.states import analyze_indicators, symbol_indicators
+from gsg.synthetic import synthetic_download, synthetic_symbols
+
+@pytest.fixture(scope="module")
+def pool():
+    with analysis_pool(2) as pool:
+        yield pool
+
+def _leftover_files():
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return set(glob.glob(os.path.join(directory, 'gsg-bars-*')))
+
+def test_pool_results_match_analyze_indicators(pool):
+    symbols = synthetic_symbols(8)
+    data, _ = fetch_timeframes([symbols], TIMEFRAMES, downloader=synthetic_download)
+    frames = {(symbol, tf_name): frames[symbol] for tf_name, frames in data.items() for symbol in symbols}
+    frames[("SHORT", "Daily")] = data["Daily"][symbols[0]].iloc[:20]
+    frames[("NONE", "Daily")] = None
+    before = _leftover_files()
+
+    results = analyze_parallel(frames, pool, chunk_size=5)
+
+    expected = {key: analyze_indicators(*symbol_indicators(frame))
+                for key, frame in frames.items() if symbol_indicators(frame)}
+    assert list(results) == list(expected)
+    assert results == expected
+    assert _leftover_files() == before
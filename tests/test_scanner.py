@@ -0,0 +1,109 @@
+"""run_scan across portfolios sharing symbols, with and without the signal log"""
+import pytest
+
+from gsg.config import TIMEFRAME_NAMES, TIMEFRAMES
+from gsg.scanner import SIGNAL_TYPES, ScanResult, fetch_timeframes, run_scan, scan_portfolio
+from gsg.signals import SignalLog
+from gsg.states import AnalysisResult, analyze_frames, analyze_symbol, total_trend_bounds
+from gsg.synthetic import synthetic_download, synthetic_symbols
+
+SYMBOLS = synthetic_symbols(12)
+
+def _scan(portfolios, timeframes=TIMEFRAMES, **kwargs):
+    results, _ = run_scan(portfolios, downloader=synthetic_download, timeframes=timeframes, **kwargs)
+    return results
+
+@pytest.fixture(scope="module")
+def trending():
+    # A symbol whose Hourly total is past +-5, so a neutral previous state fires a Total Trend signal
+    scan = _scan({"All": SYMBOLS})["All"]
+    return next(symbol for symbol in SYMBOLS if abs(scan.analyses[symbol]['Hourly'].total) >= 5)
+
+def _neutral(symbol, timeframes=TIMEFRAMES):
+    neutral = AnalysisResult(0, "N/A", 0, "N/A", 0, "N/A", 0)
+    return {symbol: {tf_name: neutral for tf_name in timeframes}}
+
+def _log(path, states):
+    log = SignalLog(str(path))
+    log.record(ScanResult(list(states), states, {}, {signal: [] for signal in SIGNAL_TYPES}, {}, {}))
+    return log
+
+def _signalled(results, symbol):
+    return {name: [signal for signal in SIGNAL_TYPES if symbol in result.signals[signal]]
+            for name, result in results.items()}
+
+def test_shared_symbol_signals_in_every_portfolio(trending, tmp_path):
+    others = [symbol for symbol in SYMBOLS if symbol != trending]
+    portfolios = {"First": [trending, others[0]], "Second": [others[1], trending]}
+    
+    in_memory = _scan(portfolios, last_states=_neutral(trending))
+    fired = _signalled(in_memory, trending)
+    assert fired["First"] and fired["First"] == fired["Second"]
+    
+    log = SignalLog(str(tmp_path / "signals.sqlite"))
+    log.record(ScanResult([trending], _neutral(trending), {}, {signal: [] for signal in SIGNAL_TYPES}, {}, {}))
+    logged = _scan(portfolios, log=log)
+    assert _signalled(logged, trending) == fired
+    
+    # One event per signal, and the new states are what the next scan compares against
+    assert len(log.events(symbol=trending)) == len(fired["First"])
+    stored = log.load_states([trending])[trending]
+    assert stored['Hourly'] == logged["First"].analyses[trending]['Hourly']
+    assert _signalled(_scan(portfolios, log=log), trending) == {"First": [], "Second": []}
+
+def test_in_memory_states_update_after_every_portfolio(trending):
+    last_states = _neutral(trending)
+    _scan({"First": [trending], "Second": [trending]}, last_states=last_states)
+    assert last_states[trending]['Hourly'].total != 0
+
+def test_screening_keeps_every_symbol_that_can_signal(tmp_path):
+    # Previous Hourly Gets of both signs, so 3 Gets can fire either way
+    states = {}
+    for i, symbol in enumerate(SYMBOLS):
+        states.update(_neutral(symbol))
+        states[symbol]['Hourly'] = AnalysisResult(1 - 2 * (i % 2), "N/A", 0, "N/A", 0, "N/A", 0)
+    full = _scan({"All": SYMBOLS}, log=_log(tmp_path / "full.sqlite", states))["All"]
+    screened = _scan({"All": SYMBOLS}, log=_log(tmp_path / "screened.sqlite", states), screening=True)["All"]
+    
+    candidates = [symbol for symbol in SYMBOLS if 'Hourly' in screened.analyses[symbol]]
+    assert 0 < len(candidates) < len(SYMBOLS)
+    # Every Buy/Sell Total Trend and 3 Gets signal survives; Total Trend
+    # signals need the Hourly total, so they only come from the candidates
+    assert {symbol: total for symbol, total in full.total_trends.items() if abs(total) >= 5} == \
+        {symbol: total for symbol, total in screened.total_trends.items() if abs(total) >= 5}
+    for signal_type in SIGNAL_TYPES:
+        expected = full.signals[signal_type]
+        if signal_type.startswith('trend'):
+            expected = [symbol for symbol in expected if symbol in candidates]
+        assert screened.signals[signal_type] == expected
+    assert any(screened.signals.values())
+
+def test_screened_out_symbols_lose_their_fine_states(tmp_path):
+    # A symbol whose Weekly and Daily totals cannot reach a Buy/Sell Total Trend
+    analyses = _scan({"All": SYMBOLS})["All"].analyses
+    bounds = {symbol: total_trend_bounds(analyses[symbol]['Weekly'].total, analyses[symbol]['Daily'].total)
+              for symbol in SYMBOLS}
+    quiet = next(symbol for symbol, (low, high) in bounds.items() if -5 < low and high < 5)
+    
+    # Hourly and 2-Hour states left from an older scan are dropped, and the
+    # next scan has no Hourly total to see a crossing against
+    timeframes = {name: TIMEFRAME_NAMES[name] for name in [*TIMEFRAMES, "2-Hour"]}
+    log = _log(tmp_path / "signals.sqlite", _neutral(quiet, [*TIMEFRAMES, "2-Hour"]))
+    result = _scan({"All": [quiet]}, log=log, screening=True, timeframes=timeframes)["All"]
+    assert set(result.analyses[quiet]) == {"Weekly", "Daily"}
+    assert set(log.load_states([quiet])[quiet]) == {"Weekly", "Daily"}
+    result = _scan({"All": [quiet]}, log=log)["All"]
+    assert 'Hourly' in result.analyses[quiet]
+    assert not any(result.signals[signal_type] for signal_type in ['trend_buy', 'trend_sell'])
+
+def test_batched_scan_matches_each_symbol():
+    data, _ = fetch_timeframes([SYMBOLS], TIMEFRAMES, downloader=synthetic_download)
+    # Ragged frames: a late listing, and one too short to analyse
+    data['Daily'][SYMBOLS[0]] = data['Daily'][SYMBOLS[0]].iloc[100:]
+    data['Hourly'][SYMBOLS[1]] = data['Hourly'][SYMBOLS[1]].iloc[:20]
+    scan = scan_portfolio(SYMBOLS, data, timeframes=TIMEFRAMES)
+    for tf_name, frames in data.items():
+        assert analyze_frames(frames) == {symbol: analyze_symbol(frame) for symbol, frame in frames.items()}
+        for symbol, frame in frames.items():
+            assert scan.analyses[symbol].get(tf_name) == analyze_symbol(frame), (symbol, tf_name)
+    assert 'Hourly' not in scan.analyses[SYMBOLS[1]]
@@ -0,0 +1,89 @@
+"""ScanService single-flight reuse, coalescing and retries"""
+import threading
+
+import pytest
+
+from gsg.service import ScanService
+
+class Scan:
+    """A compute() that counts its runs and can be held until released"""
+
+    def __init__(self, fail=False):
+        self.runs = 0
+        self.fail = fail
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.runs += 1
+        self.started.set()
+        assert self.release.wait(10)
+        if self.fail:
+            self.fail = False
+            raise RuntimeError("download failed")
+        return {'scan': self.runs}, 1
+
+def test_concurrent_callers_share_one_scan():
+    service, scan = ScanService(), Scan()
+    results = []
+    waiting = threading.Barrier(4)
+
+    def run():
+        results.append(service.run("HK", lambda: 1, scan, on_wait=waiting.wait))
+
+    leader = threading.Thread(target=run)
+    leader.start()
+    assert scan.started.wait(10)
+    followers = [threading.Thread(target=run) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    waiting.wait(10)  # every follower is about to block on the leader's scan
+    scan.release.set()
+    for thread in [leader, *followers]:
+        thread.join(10)
+
+    assert scan.runs == 1
+    assert sorted(how for _, how in results) == ['coalesced'] * 3 + ['scanned']
+    assert all(result is results[0][0] for result, _ in results)
+    assert service.run("HK", lambda: 1, scan) == (results[0][0], 'reused')
+    # A new data version scans again
+    assert service.run("HK", lambda: 2, scan)[1] == 'scanned'
+    assert scan.runs == 2
+    assert service.stats()['coalesced'] == 3
+
+def test_failed_scan_is_not_cached_and_the_next_call_retries():
+    service, scan = ScanService(), Scan(fail=True)
+    scan.release.set()
+    with pytest.raises(RuntimeError):
+        service.run("HK", lambda: 1, scan)
+    assert service.stats()['results'] == 0 and service.stats()['in_flight'] == 0
+
+    result, how = service.run("HK", lambda: 1, scan)
+    assert (result, how) == ({'scan': 2}, 'scanned')
+
+def test_waiting_caller_retries_when_the_leader_fails():
+    service, scan = ScanService(), Scan(fail=True)
+    errors, results = [], []
+
+    def lead():
+        try:
+            service.run("HK", lambda: 1, scan)
+        except RuntimeError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=lead)
+    leader.start()
+    assert scan.started.wait(10)
+    waiting = threading.Event()
+    follower = threading.Thread(target=lambda: results.append(
+        service.run("HK", lambda: 1, scan, on_wait=waiting.set)
+    ))
+    follower.start()
+    assert waiting.wait(10)
+    scan.release.set()
+    leader.join(10)
+    follower.join(10)
+
+    assert len(errors) == 1
+    assert results == [({'scan': 2}, 'scanned')]
+    assert service.stats()['retried'] == 1
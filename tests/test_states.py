@@ -0,0 +1,69 @@
+"""Vectorized state series against the last-bar classification of analyze_symbol"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from gsg.indicators import align_ohlc, calculate_indicators_batch
+from gsg.states import analyze_history, analyze_symbol, get_state_series
+
+def _frame(close):
+    close = pd.Series(close, index=pd.date_range("2024-01-01", periods=len(close), freq="D"), dtype=float)
+    return pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close, 'Volume': 1.0})
+
+_WALK = 100 * np.exp(np.cumsum(np.random.default_rng(3).normal(0, 0.02, 90)))
+
+def _flat():
+    frame = _frame(np.full(90, 50.0))
+    frame['High'] = frame['Low'] = frame['Close']
+    return frame
+
+def _suspended():
+    # A halted stretch: cleaned bars repeat the last close with no range
+    frame = _frame(_WALK)
+    frame.iloc[40:60, :4] = frame['Close'].iloc[39]
+    return frame
+
+def _late_start():
+    # Flat from the first bar until it starts trading, so +DI/-DI begin NaN
+    frame = _frame(np.r_[np.full(35, 20.0), _WALK[:55]])
+    frame.iloc[:35, 1:3] = 20.0
+    return frame
+
+def _gapped():
+    frame = _frame(_WALK)
+    frame.iloc[[45, 46, 70]] = np.nan
+    return frame
+
+CASES = {'walk': lambda: _frame(_WALK), 'flat': _flat, 'suspended': _suspended,
+         'late_start': _late_start, 'gapped': _gapped}
+
+@pytest.mark.parametrize("case", CASES)
+def test_history_matches_analyze_symbol(case):
+    data = CASES[case]()
+    history = analyze_history(data)
+    for end in range(30, len(data) + 1):
+        result = analyze_symbol(data.iloc[:end])
+        row = history.iloc[end - 1]
+        assert (row['get_score'], row['get_label']) == (result.get_score, result.get_label), end
+        assert (row['set_score'], row['set_label']) == (result.set_score, result.set_label), end
+        assert (row['go_score'], row['go_label']) == (result.go_score, result.go_label), end
+        assert row['total'] == result.total
+
+def test_flat_series_is_bearish_not_na():
+    history = analyze_history(_flat())
+    assert (history['get_score'].iloc[1:] == -3).all()
+    assert (history['get_label'].iloc[1:] == "Bearish-").all()
+    assert history['get_label'].iloc[0] == "N/A"
+
+def test_aligned_frame_matches_each_symbol():
+    frames = {'walk': _frame(_WALK), 'late': _late_start().iloc[10:], 'suspended': _suspended()}
+    frames['holes'] = _frame(_WALK).drop(_frame(_WALK).index[[20, 21, 50]])
+    ohlc = align_ohlc(frames)
+    batch = calculate_indicators_batch(ohlc['High'], ohlc['Low'], ohlc['Close'])
+    scores, labels = get_state_series(batch['plus_di'], batch['minus_di'], batch['adx'])
+    for symbol, frame in frames.items():
+        history = analyze_history(frame)
+        assert (scores[symbol].loc[frame.index] == history['get_score']).all(), symbol
+        assert (labels[symbol].loc[frame.index] == history['get_label']).all(), symbol
+        off_bars = ~ohlc['Close'].index.isin(frame.index)
+        assert (labels[symbol][off_bars] == "N/A").all()
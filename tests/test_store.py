@@ -0,0 +1,72 @@
+"""Incremental refresh of the SQLite bar store"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from gsg.config import OHLCV_COLUMNS
+from gsg.store import OHLCVStore, iter_refresh_bars
+
+def _history(nan_at=()):
+    index = pd.bdate_range(end=datetime.now().date(), periods=80)
+    close = pd.Series(np.linspace(100, 120, len(index)), index=index)
+    close.iloc[list(nan_at)] = np.nan
+    return pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close,
+                         'Volume': 1000.0}, index=index)
+
+class FixedDownloader:
+    """Serves slices of fixed histories and records each request's start"""
+    
+    def __init__(self, histories):
+        self.histories = histories
+        self.starts = []
+    
+    def __call__(self, symbols, start, end, interval):
+        self.starts.append(pd.Timestamp(start))
+        frames = {symbol: self.histories[symbol].loc[start:end] for symbol in symbols}
+        return pd.concat(frames, axis=1)
+
+def _refresh(symbols, store, downloader):
+    failures = {}
+    for _, batch_failures in iter_refresh_bars(symbols, "1d", 60, store, downloader):
+        failures.update(batch_failures)
+    return failures
+
+def test_refresh_twice_with_nan_close_anchor(tmp_path):
+    store = OHLCVStore(str(tmp_path / "bars.sqlite"))
+    history = _history(nan_at=[-2])
+    downloader = FixedDownloader({"AAA": history})
+    
+    assert _refresh(["AAA"], store, downloader) == {}
+    stored = store.read("AAA", "1d")
+    assert np.isnan(stored['Close'].iloc[-2])
+    
+    # The NULL close is skipped: the refresh anchors on the bar before it
+    assert _refresh(["AAA"], store, downloader) == {}
+    assert downloader.starts[-1] == history.index[-3]
+    assert len(downloader.starts) == 2
+    assert _refresh(["AAA"], store, downloader) == {}
+    assert len(downloader.starts) == 3
+    
+    pd.testing.assert_frame_equal(store.read("AAA", "1d"), stored)
+
+def test_refresh_with_nan_downloaded_anchor_keeps_history(tmp_path):
+    store = OHLCVStore(str(tmp_path / "bars.sqlite"))
+    _refresh(["AAA"], store, FixedDownloader({"AAA": _history()}))
+    
+    # A missing close in the overlap is not taken for a split
+    downloader = FixedDownloader({"AAA": _history(nan_at=[-2])})
+    assert _refresh(["AAA"], store, downloader) == {}
+    assert downloader.starts == [_history().index[-2]]
+
+def test_refresh_detects_readjusted_history(tmp_path):
+    store = OHLCVStore(str(tmp_path / "bars.sqlite"))
+    _refresh(["AAA"], store, FixedDownloader({"AAA": _history()}))
+    
+    split = _history()
+    split[OHLCV_COLUMNS[:4]] /= 2
+    downloader = FixedDownloader({"AAA": split})
+    assert _refresh(["AAA"], store, downloader) == {}
+    assert len(downloader.starts) == 2
+    stored = store.read("AAA", "1d")
+    np.testing.assert_allclose(stored['Close'], split['Close'].iloc[-len(stored):])
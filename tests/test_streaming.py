@@ -0,0 +1,46 @@
+"""Incremental analysis through IndicatorStream against the batch path"""
+import pandas as pd
+import pytest
+
+from gsg.fetch import clean_bars
+from gsg.states import analyze_symbol
+from gsg.streaming import IndicatorStream, stream_analysis
+from gsg.synthetic import synthetic_bars, synthetic_symbols
+
+START, END = pd.Timestamp("2024-01-01"), pd.Timestamp("2024-02-20")
+
+@pytest.fixture(scope="module", params=synthetic_symbols(6))
+def hourly(request):
+    return request.param, synthetic_bars(request.param, "1h", START, END)
+
+def _windows(bars, days, step, steps):
+    # Windows of ``days`` whose end moves ``step`` forward each time, like refreshed downloads
+    end = START + pd.Timedelta(days=days)
+    for _ in range(steps):
+        yield clean_bars(bars[(bars.index >= end - pd.Timedelta(days=days)) & (bars.index < end)].copy())
+        end += step
+
+@pytest.mark.parametrize("days, step", [(20, pd.Timedelta(hours=3)), (20, pd.Timedelta(days=1))])
+def test_sliding_window_matches_batch(hourly, days, step):
+    symbol, bars = hourly
+    streams = {}
+    for frame in _windows(bars, days, step, 80 if step < pd.Timedelta(days=1) else 25):
+        assert stream_analysis(streams, (symbol, "Hourly"), frame) == analyze_symbol(frame)
+
+def test_growing_history_syncs_incrementally(hourly):
+    symbol, bars = hourly
+    bars = clean_bars(bars.copy())
+    streams = {}
+    stream_analysis(streams, (symbol, "Hourly"), bars.iloc[:200])
+    stream = streams[(symbol, "Hourly")]
+    for end in range(201, 260, 7):
+        result = stream_analysis(streams, (symbol, "Hourly"), bars.iloc[:end])
+        assert streams[(symbol, "Hourly")] is stream
+        assert result == analyze_symbol(bars.iloc[:end])
+
+def test_window_starting_later_does_not_sync(hourly):
+    _, bars = hourly
+    bars = clean_bars(bars.copy())
+    stream = IndicatorStream.from_history(bars.iloc[:200])
+    assert not stream.sync(bars.iloc[5:210])
+    assert IndicatorStream.restore(stream.snapshot()).sync(bars.iloc[:210])
@@ -0,0 +1,46 @@
+"""Synthetic bars agree across windows, so the store refreshes them incrementally"""
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from gsg.store import OHLCVStore, iter_refresh_bars
+from gsg.synthetic import synthetic_bars, synthetic_download, synthetic_symbols
+
+@pytest.mark.parametrize("symbol", ["AAPL", "0700.HK"])
+@pytest.mark.parametrize("interval, windows", [
+    ("1d", [("2023-11-20", "2025-06-01"), ("2025-04-01", "2025-05-15"), ("2024-12-31", "2026-10-17")]),
+    ("1h", [("2025-04-20", "2025-05-10 12:00"), ("2025-04-30", "2025-06-01"), ("2024-12-25", "2025-05-02")])
+])
+def test_overlapping_windows_agree(symbol, interval, windows):
+    frames = [synthetic_bars(symbol, interval, start, end) for start, end in windows]
+    common = frames[0].index
+    for frame in frames[1:]:
+        common = common.intersection(frame.index)
+    assert len(common) > 5
+    for frame in frames[1:]:
+        pd.testing.assert_frame_equal(frame.loc[common], frames[0].loc[common])
+
+def test_windows_cover_every_bar_of_their_span():
+    whole = synthetic_bars("AAPL", "1h", "2024-12-20", "2025-01-10")
+    parts = pd.concat([synthetic_bars("AAPL", "1h", "2024-12-20", "2024-12-31 23:00"),
+                       synthetic_bars("AAPL", "1h", "2025-01-01", "2025-01-10")])
+    pd.testing.assert_frame_equal(parts, whole)
+
+@pytest.mark.parametrize("interval, days", [("1d", 400), ("1h", 30)])
+def test_store_refresh_stays_incremental(tmp_path, interval, days):
+    store = OHLCVStore(str(tmp_path / "bars.sqlite"))
+    starts = []
+    
+    def downloader(symbols, start, end, interval):
+        starts.append(pd.Timestamp(start))
+        return synthetic_download(symbols, start, end, interval)
+    
+    symbols = synthetic_symbols(12)
+    for _ in iter_refresh_bars(symbols, interval, days, store, downloader):
+        pass
+    starts.clear()
+    for _ in iter_refresh_bars(symbols, interval, days, store, downloader):
+        pass
+    # Only the bars from each symbol's anchor on, no re-download of a whole window
+    assert starts and min(starts) > datetime.now() - timedelta(days=days // 2)
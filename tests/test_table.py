@@ -0,0 +1,66 @@
+"""states_table paging, state filters and HTML"""
+import pandas as pd
+import pytest
+
+from gsg.config import TIMEFRAMES
+from gsg.scanner import SIGNAL_TYPES, ScanResult
+from gsg.states import AnalysisResult
+from gsg.table import select_rows, states_table, table_html
+
+def _scan(symbols, totals):
+    hold = AnalysisResult(3, "Bullish-", 1, "Bullish-", -1, "Bearish-", 3)
+    return ScanResult(
+        list(symbols),
+        {symbol: {tf_name: hold for tf_name in TIMEFRAMES} for symbol in symbols},
+        {symbol: total for symbol, total in zip(symbols, totals) if total is not None},
+        {signal_type: [] for signal_type in SIGNAL_TYPES},
+        {}, {}
+    )
+
+def _table(count):
+    symbols = [f"S{i:03d}" for i in range(count)]
+    # Totals cycle through Sell, Hold and Buy, with every seventh missing
+    totals = [None if i % 7 == 0 else [-6.0, 0.5, 6.0][i % 3] for i in range(count)]
+    return states_table(_scan(symbols, totals))
+
+@pytest.mark.parametrize("count, page, rows, pages, first", [
+    (250, 1, 100, 3, "S000"),
+    (250, 3, 50, 3, "S200"),
+    (250, 9, 50, 3, "S200"),  # clamped to the last page
+    (250, 0, 100, 3, "S000"),
+    (200, 2, 100, 2, "S100"),
+    (100, 1, 100, 1, "S000"),
+    (101, 2, 1, 2, "S100"),
+])
+def test_page_boundaries(count, page, rows, pages, first):
+    selected, total, page_count = select_rows(_table(count), page=page, page_size=100)
+    assert (len(selected), total, page_count) == (rows, count, pages)
+    assert selected.index[0] == first
+
+def test_filters_drop_missing_values_and_sorting_puts_them_last():
+    table = _table(30)
+    buys, total, pages = select_rows(table, state="Buy")
+    assert total == len(buys) == sum(1 for i in range(30) if i % 7 and i % 3 == 2)
+    assert (buys['total_trend'] >= 5).all()
+    ordered, _, _ = select_rows(table, sort_by='total_trend')
+    assert ordered['total_trend'].iloc[:-5].notna().all() and ordered['total_trend'].iloc[-5:].isna().all()
+    assert list(ordered['total_trend'].dropna()) == sorted(table['total_trend'].dropna(), reverse=True)
+
+def test_empty_filter_result():
+    table = states_table(_scan(["A", "B"], [0.5, -1.0]))
+    rows, total, pages = select_rows(table, state="Buy", page=3)
+    assert (len(rows), total, pages) == (0, 0, 1)
+    html = table_html(rows, {}, TIMEFRAMES)
+    assert "<td" not in html and html.endswith("</table>")
+
+    empty = states_table(_scan([], []))
+    assert select_rows(empty, sort_by='total_trend')[1:] == (0, 1)
+
+def test_html_escapes_symbols_and_formats_cells():
+    table = states_table(_scan(["M&M.NS", "<b>X</b>"], [6.25, None]), {"M&M.NS": 90.0})
+    html = table_html(table, {"Daily": pd.Timestamp("2024-03-08 16:00")}, TIMEFRAMES)
+    assert "M&amp;M.NS" in html and "&lt;b&gt;X&lt;/b&gt;" in html
+    assert "<b>" not in html
+    assert "Buy (6.2)" in html and ">N/A</td>" in html and ">2m</td>" in html
+    assert "Last Update: 2024-03-08 16:00:00" in html
+    assert html.count("<tr>") == 5
@@ -0,0 +1,64 @@
+"""Resampled timeframes: market sessions, and the downloads the extra timeframes share"""
+import pandas as pd
+import pytest
+
+from gsg.config import HISTORY_WINDOWS, MIN_BARS, TIMEFRAME_NAMES, TIMEFRAMES
+from gsg.lookback import adaptive_windows
+from gsg.plan import plan_fetches
+from gsg.synthetic import synthetic_bars
+from gsg.timeframes import bucket_label, resample_frames, symbol_market
+
+AGGREGATION = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+
+def _hourly(start, end, hours):
+    index = pd.date_range(start, end, freq="1h")
+    index = index[index.hour.isin(hours)]
+    close = pd.Series(range(len(index)), index=index, dtype=float) + 100
+    return pd.DataFrame({'Open': close - 0.5, 'High': close + 1, 'Low': close - 1, 'Close': close,
+                         'Volume': 1000.0})
+
+@pytest.mark.parametrize("symbol, market", [
+    ("0700.HK", "HK"), ("^HSI", "HK"), ("AAPL", "US"), ("BRK-B", "US"), ("^SPX", "US"),
+    ("^N225", None), ("^GDAXI", None), ("CL=F", None), ("DX-Y.NYB", None), ("BTC=F", None)
+])
+def test_symbol_market(symbol, market):
+    assert symbol_market(symbol) == market
+
+@pytest.mark.parametrize("symbol, hours", [
+    ("CL=F", range(24)),  # nearly round the clock
+    ("^GDAXI", range(9, 18)),
+    ("^N225", [9, 10, 11, 12, 13, 14])
+])
+@pytest.mark.parametrize("timeframe", ["2h", "4h"])
+def test_symbols_without_sessions_use_clock_buckets(symbol, hours, timeframe):
+    bars = _hourly("2024-03-04", "2024-03-09", hours)
+    resampled = resample_frames({symbol: bars}, timeframe, cache=None)[symbol]
+    expected = bars.resample(timeframe).agg(AGGREGATION).dropna(subset=['Close'])
+    pd.testing.assert_frame_equal(resampled, expected, check_freq=False)
+    assert [bucket_label(ts, timeframe, symbol) for ts in bars.index] == \
+        [ts.floor(timeframe) for ts in bars.index]
+
+def test_us_buckets_start_at_the_open():
+    bars = _hourly("2024-03-04 09:30", "2024-03-04 16:00", range(9, 16))
+    resampled = resample_frames({"AAPL": bars}, "2h", cache=None)["AAPL"]
+    assert [ts.strftime("%H:%M") for ts in resampled.index] == ["09:30", "11:30", "13:30", "15:30"]
+
+def _downloads(timeframes, windows):
+    plan = plan_fetches([(["AAPL", "0700.HK"], list(timeframes.values()))], windows)
+    return {fetch.interval: fetch.days for fetch in plan}
+
+def test_extra_timeframes_share_the_downloads():
+    # Only 4-Hour needs a few more days of hourly bars than Hourly
+    fixed, every = _downloads(TIMEFRAMES, HISTORY_WINDOWS), _downloads(TIMEFRAME_NAMES, HISTORY_WINDOWS)
+    assert every == {"1d": fixed["1d"], "1h": HISTORY_WINDOWS["4h"][1]}
+    # Under adaptive lookback they are capped at the TIMEFRAMES windows
+    windows = adaptive_windows()
+    assert _downloads(TIMEFRAME_NAMES, windows) == _downloads(TIMEFRAMES, windows)
+
+@pytest.mark.parametrize("symbol", ["0700.HK", "AAPL"])
+@pytest.mark.parametrize("timeframe", ["1mo", "4h", "2h"])
+def test_extra_timeframe_windows_reach_min_bars(symbol, timeframe):
+    interval, days = HISTORY_WINDOWS[timeframe]
+    end = pd.Timestamp("2024-03-08")
+    bars = synthetic_bars(symbol, interval, end - pd.Timedelta(days=days), end)
+    assert len(resample_frames({symbol: bars}, timeframe, cache=None)[symbol]) >= MIN_BARS